@@ -9,6 +9,7 @@ from shared_libraries.logger import get_logger
 # Assuming specific analyzer is used
 # from tools.batcuclinhso_analysis.number_analyzer import analyze_number_string
 from tools.batcuclinhso_analysis.cccd_analyzer import cccd_analyzer # Tên hàm chính xác
+from tools.batcuclinhso_analysis.result_cache import thaw
 # No direct data import needed if only using analyzer
 
 class CCCDAgent:
@@ -46,7 +47,8 @@ class CCCDAgent:
         
         # Use the specific cccd analyzer tool
         # analysis_result = analyze_number_string(last_digits) <-- OLD
-        analysis_result = cccd_analyzer(last_digits) # <-- Sử dụng tên hàm chính xác
+        # Kết quả từ cache là bất biến (list -> tuple), tạo bản sao có thể sửa trước khi bổ sung các trường
+        analysis_result = thaw(cccd_analyzer(last_digits)) # <-- Sử dụng tên hàm chính xác
         
         # Thêm các trường cần thiết để tương thích với kết quả mong đợi
         if "analysis" in analysis_result:
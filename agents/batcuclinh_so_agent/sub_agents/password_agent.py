@@ -8,7 +8,10 @@ from typing import Any, Dict, List
 
 from shared_libraries.models import PasswordRequest
 from shared_libraries.logger import get_logger
+from tools.batcuclinhso_analysis.breach_filter import breached_passwords
 from tools.batcuclinhso_analysis.password_analyzer import password_analyzer
+from tools.batcuclinhso_analysis.password_generator import generate_passwords
+from tools.batcuclinhso_analysis.result_cache import thaw
 from tools.batcuclinhso_analysis.fengshui_data import NUMBER_PAIRS_MEANING, SINGLE_NUMBER_MEANING
 
 class PasswordAgent:
@@ -26,12 +29,22 @@ class PasswordAgent:
         
         # Tạo mật khẩu dựa trên yêu cầu
         min_length = max(8, request.min_length)
-        password = self._generate_password_simple(
-            min_length, 
-            request.require_special_chars, 
-            request.require_numbers,
-            request.purpose
-        )
+        if request.energy_number:
+            # Dựng trực tiếp mật khẩu mang năng lượng số mong muốn, không cần tạo lại và kiểm tra
+            password = generate_passwords(
+                1,
+                request.energy_number,
+                min_length,
+                request.require_special_chars,
+                request.require_numbers
+            )[0]
+        else:
+            password = self._generate_password_simple(
+                min_length, 
+                request.require_special_chars, 
+                request.require_numbers,
+                request.purpose
+            )
         
         # Phân tích mật khẩu
         strength_analysis = self._evaluate_password_strength(password)
@@ -49,8 +62,8 @@ class PasswordAgent:
         """
         Phân tích mật khẩu theo phong thủy (sử dụng password_analyzer tool).
         """
-        # Sử dụng hàm password_analyzer
-        result = password_analyzer(password)
+        # Sử dụng hàm password_analyzer (kết quả từ cache là bất biến, trả về bản sao có thể sửa)
+        result = thaw(password_analyzer(password))
         
         # Định dạng lại kết quả nếu cần
         if isinstance(result, dict) and "analysis" in result:
@@ -148,6 +161,9 @@ class PasswordAgent:
         if password.lower() in ["password", "123456", "qwerty"]:
              strength = "Rất yếu"
              feedback.append("Mật khẩu rất phổ biến.")
+        elif breached_passwords.check(password):
+             strength = "Rất yếu"
+             feedback.append("Mật khẩu đã xuất hiện trong các vụ rò rỉ dữ liệu.")
 
         return {
             "score": score,
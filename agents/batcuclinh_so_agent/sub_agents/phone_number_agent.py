@@ -1,26 +1,61 @@
 """
 Phone Number Sub-Agent for BatCucLinhSoAgent sử dụng Model Context Protocol (MCP)
+
+Agent có hai chế độ thực thi, chọn qua biến môi trường PHONE_ANALYSIS_MODE:
+- "in_process" (mặc định): gọi trực tiếp PhoneAnalyzer trong cùng tiến trình
+- "mcp": gọi qua MCP server (tiến trình con stdio), giống cách các client bên ngoài sử dụng.
+  Nếu lifespan đã khởi tạo pool MCP dùng chung (shared_libraries.mcp_pool), agent gửi yêu cầu
+  qua pool thay vì tự tạo tiến trình con riêng.
 """
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import asyncio
+import functools
 import logging
+import os
 from contextlib import AsyncExitStack
 
 from shared_libraries.models import PhoneAnalysisRequest
 from shared_libraries.logger import get_logger
+from shared_libraries.mcp_pool import PHONE_ANALYZER_POOL, PHONE_ANALYZER_SERVER_ARGS, get_pool
+from shared_libraries.process_pool import analysis_pool
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+from tools.batcuclinhso_analysis.result_cache import thaw
 
 # Import MCP tools
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
 
+# Chế độ thực thi
+MODE_IN_PROCESS = "in_process"
+MODE_MCP = "mcp"
+PHONE_ANALYSIS_MODE = os.environ.get("PHONE_ANALYSIS_MODE", MODE_IN_PROCESS)
+
+# Các công cụ của MCP server phân tích số điện thoại và hàm tương ứng khi chạy trong tiến trình
+LOCAL_TOOLS: Dict[str, Callable[..., Any]] = {
+    "analyze_phone_number": PhoneAnalyzer.analyze_phone_number,
+    "analyze_phone_full": PhoneAnalyzer.analyze_phone_full,
+    "analyze_last_three_digits": PhoneAnalyzer.analyze_last_three_digits,
+    "analyze_last_five_digits": PhoneAnalyzer.analyze_last_five_digits,
+    "get_phone_recommendations": PhoneAnalyzer.get_phone_recommendations,
+    "suggest_phone_numbers": PhoneAnalyzer.suggest_phone_numbers,
+}
+# Công cụ chỉ đọc dữ liệu truyền vào, đủ nhẹ để chạy ngay trên event loop
+INLINE_TOOLS = {"get_phone_recommendations"}
+# Công cụ tìm kiếm nặng về CPU, luôn chuyển sang pool tiến trình phân tích
+POOL_TOOLS = {"suggest_phone_numbers"}
+
 class PhoneNumberAgent:
     """
     Xử lý phân tích và đề xuất liên quan đến số điện thoại 
-    sử dụng MCP tools từ thư mục batcuclinhso_analysis
+    sử dụng PhoneAnalyzer trực tiếp hoặc MCP tools từ thư mục batcuclinhso_analysis
     """
-    def __init__(self):
+    def __init__(self, mode: Optional[str] = None):
         self.logger = get_logger(self.__class__.__name__)
+        self.mode = (mode or PHONE_ANALYSIS_MODE).lower()
+        if self.mode not in (MODE_IN_PROCESS, MODE_MCP):
+            raise ValueError(f"Chế độ phân tích không hợp lệ: {self.mode}")
         self.mcp_tools = None
+        self.pool = None
         self.exit_stack = None
         self.initialized = False
         
@@ -35,9 +70,7 @@ class PhoneNumberAgent:
         tools, exit_stack = await MCPToolset.from_server(
             connection_params=StdioServerParameters(
                 command='python',
-                args=[
-                    '-m', 'tools.batcuclinhso_analysis.phone_analyzer', 
-                ],
+                args=PHONE_ANALYZER_SERVER_ARGS,
             )
         )
         
@@ -52,6 +85,19 @@ class PhoneNumberAgent:
         if self.initialized:
             self.logger.info("MCP tools đã được khởi tạo trước đó")
             return
+        
+        if self.mode == MODE_IN_PROCESS:
+            # Không cần MCP server, các công cụ được gọi trực tiếp
+            self.initialized = True
+            self.logger.info("Sử dụng PhoneAnalyzer trong tiến trình, bỏ qua MCP server")
+            return
+        
+        self.pool = get_pool(PHONE_ANALYZER_POOL)
+        if self.pool is not None:
+            # Dùng pool MCP dùng chung, không tạo tiến trình con riêng
+            self.initialized = True
+            self.logger.info(f"Sử dụng pool MCP dùng chung: {self.pool.stats()}")
+            return
             
         try:
             # Tạo mới exit stack
@@ -87,6 +133,38 @@ class PhoneNumberAgent:
             self.mcp_tools = None
             self.initialized = False
             self.logger.info("Đã đóng kết nối MCP server thành công")
+        # Pool dùng chung do lifespan quản lý, agent chỉ bỏ tham chiếu
+        self.pool = None
+        self.initialized = False
+
+    def _get_tool(self, name: str) -> Optional[Callable[..., Awaitable[Any]]]:
+        """
+        Trả về hàm bất đồng bộ gọi công cụ `name` theo chế độ hiện tại, None nếu không có
+        """
+        if self.mode == MODE_IN_PROCESS:
+            function = LOCAL_TOOLS.get(name)
+            if function is None:
+                return None
+            
+            # Các phương thức phân tích chạy ngoài event loop để không chặn các request khác
+            if name in INLINE_TOOLS:
+                async def invoke(**kwargs):
+                    return function(**kwargs)
+            elif name in POOL_TOOLS:
+                async def invoke(**kwargs):
+                    return await analysis_pool.run(
+                        functools.partial(function, **kwargs), size=analysis_pool.offload_threshold
+                    )
+            else:
+                async def invoke(**kwargs):
+                    return await asyncio.to_thread(function, **kwargs)
+            return invoke
+        
+        if self.pool is not None:
+            return functools.partial(self.pool.call, name) if self.pool.has_tool(name) else None
+        
+        tool = next((tool for tool in self.mcp_tools or [] if tool.name == name), None)
+        return tool.invoke if tool else None
 
     async def analyze_phone(self, request: PhoneAnalysisRequest) -> Dict[str, Any]:
         """
@@ -105,45 +183,25 @@ class PhoneNumberAgent:
         if not self.initialized:
             await self.initialize()
             
-        if not self.mcp_tools:
+        if self.mode == MODE_MCP and not (self.mcp_tools or self.pool):
             self.logger.error("MCP tools chưa được khởi tạo thành công")
             return self._get_default_analysis(phone_number)
         
         try:
-            # Tìm công cụ phân tích số điện thoại trong danh sách MCP tools
-            phone_analyzer_tool = next(
-                (tool for tool in self.mcp_tools if tool.name == "analyze_phone_number"), 
-                None
-            )
-            
-            if not phone_analyzer_tool:
-                self.logger.error("Không tìm thấy công cụ analyze_phone_number trong MCP tools")
-                return self._get_default_analysis(phone_number)
-                
-            # Gọi công cụ MCP để phân tích số điện thoại
-            analysis_result = await phone_analyzer_tool.invoke(phone_number=phone_number)
+            # Ưu tiên công cụ tổng hợp nếu server cung cấp: một lượt gọi thay vì bốn
+            full_analysis_tool = self._get_tool("analyze_phone_full")
             
-            # Xử lý phân tích 3 số cuối sử dụng MCP tool nếu có
-            last_three_digits_tool = next(
-                (tool for tool in self.mcp_tools if tool.name == "analyze_last_three_digits"), 
-                None
-            )
-            
-            if last_three_digits_tool:
-                last_three_analysis = await last_three_digits_tool.invoke(phone_number=phone_number)
+            if full_analysis_tool:
+                analysis_result = await full_analysis_tool(phone_number=phone_number)
+                last_three_analysis = analysis_result.get("last_three_digit_analysis")
+                last_five_analysis = analysis_result.get("last_five_digit_analysis")
             else:
-                last_three_analysis = "Chưa có phân tích chi tiết cho 3 số cuối"
-                
-            # Xử lý phân tích 5 số cuối sử dụng MCP tool nếu có  
-            last_five_digits_tool = next(
-                (tool for tool in self.mcp_tools if tool.name == "analyze_last_five_digits"), 
-                None
-            )
+                analysis_result, last_three_analysis, last_five_analysis = await self._analyze_with_single_tools(phone_number)
+                if analysis_result is None:
+                    return self._get_default_analysis(phone_number)
             
-            if last_five_digits_tool:
-                last_five_analysis = await last_five_digits_tool.invoke(phone_number=phone_number)
-            else:
-                last_five_analysis = "Chưa có phân tích chi tiết cho 5 số cuối"
+            # Kết quả trong tiến trình lấy từ cache là bất biến, tạo bản sao trước khi bổ sung các trường
+            analysis_result = thaw(analysis_result)
             
             # Đảm bảo các trường cần thiết tồn tại
             if "total_score" not in analysis_result:
@@ -166,14 +224,13 @@ class PhoneNumberAgent:
                     else:
                         pair_item["pair"] = "N/A"  # Giá trị mặc định nếu không có thông tin
             
-            # Lấy khuyến nghị từ MCP tool nếu có
-            recommendation_tool = next(
-                (tool for tool in self.mcp_tools if tool.name == "get_phone_recommendations"), 
-                None
-            )
+            # Lấy khuyến nghị nếu có công cụ (công cụ tổng hợp đã trả về sẵn)
+            recommendation_tool = self._get_tool("get_phone_recommendations")
             
-            if recommendation_tool:
-                recommendations = await recommendation_tool.invoke(
+            if analysis_result.get("recommendations") is not None:
+                recommendations = analysis_result["recommendations"]
+            elif recommendation_tool:
+                recommendations = await recommendation_tool(
                     score=analysis_result.get("total_score", 7.5),
                     pairs_analysis=analysis_result.get("pairs_analysis", [])
                 )
@@ -199,6 +256,41 @@ class PhoneNumberAgent:
             # Trả về giá trị mặc định nếu có lỗi
             return self._get_default_analysis(phone_number)
 
+    async def _analyze_with_single_tools(self, phone_number: str) -> Tuple[Optional[Dict[str, Any]], str, str]:
+        """
+        Phân tích bằng các công cụ riêng lẻ (cho server chưa có analyze_phone_full)
+        
+        Returns:
+            Tuple: (kết quả analyze_phone_number hoặc None nếu không có công cụ, phân tích 3 số cuối, phân tích 5 số cuối)
+        """
+        # Tìm công cụ phân tích số điện thoại
+        phone_analyzer_tool = self._get_tool("analyze_phone_number")
+        
+        if not phone_analyzer_tool:
+            self.logger.error("Không tìm thấy công cụ analyze_phone_number trong MCP tools")
+            return None, "", ""
+            
+        # Gọi công cụ để phân tích số điện thoại
+        analysis_result = await phone_analyzer_tool(phone_number=phone_number)
+        
+        # Xử lý phân tích 3 số cuối nếu có công cụ
+        last_three_digits_tool = self._get_tool("analyze_last_three_digits")
+        
+        if last_three_digits_tool:
+            last_three_analysis = await last_three_digits_tool(phone_number=phone_number)
+        else:
+            last_three_analysis = "Chưa có phân tích chi tiết cho 3 số cuối"
+            
+        # Xử lý phân tích 5 số cuối nếu có công cụ
+        last_five_digits_tool = self._get_tool("analyze_last_five_digits")
+        
+        if last_five_digits_tool:
+            last_five_analysis = await last_five_digits_tool(phone_number=phone_number)
+        else:
+            last_five_analysis = "Chưa có phân tích chi tiết cho 5 số cuối"
+        
+        return analysis_result, last_three_analysis, last_five_analysis
+
     def _get_default_analysis(self, phone_number: str) -> Dict[str, Any]:
         """Trả về phân tích mặc định nếu có lỗi"""
         return {
@@ -228,28 +320,28 @@ class PhoneNumberAgent:
         if not self.initialized:
             await self.initialize()
             
-        if not self.mcp_tools:
+        if self.mode == MODE_MCP and not (self.mcp_tools or self.pool):
             self.logger.error("MCP tools chưa được khởi tạo thành công")
             return self._get_default_suggestions()
         
         try:
-            # Tìm công cụ đề xuất số điện thoại trong danh sách MCP tools
-            suggest_phone_tool = next(
-                (tool for tool in self.mcp_tools if tool.name == "suggest_phone_numbers"), 
-                None
-            )
+            # Tìm công cụ đề xuất số điện thoại
+            suggest_phone_tool = self._get_tool("suggest_phone_numbers")
             
             if not suggest_phone_tool:
                 self.logger.error("Không tìm thấy công cụ suggest_phone_numbers trong MCP tools")
                 return self._get_default_suggestions()
             
-            # Gọi công cụ MCP để đề xuất số điện thoại
-            suggestions = await suggest_phone_tool.invoke(
+            # Gọi công cụ để đề xuất số điện thoại
+            result = await suggest_phone_tool(
                 purpose=purpose,
                 preferred_digits=preferred_digits if preferred_digits else []
             )
             
-            return suggestions[:5]  # Trả về 5 đề xuất tốt nhất
+            if not result.get("complete", True):
+                self.logger.warning(f"Tìm kiếm đề xuất cho mục đích {purpose} dừng do hết ngân sách, kết quả có thể chưa tối ưu")
+            
+            return result["numbers"][:5]  # Trả về 5 đề xuất tốt nhất
             
         except Exception as e:
             self.logger.error(f"Lỗi khi đề xuất số điện thoại: {str(e)}")
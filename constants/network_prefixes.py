@@ -0,0 +1,15 @@
+"""
+Đầu số (3 chữ số đầu) của các nhà mạng di động Việt Nam
+"""
+
+NETWORK_PREFIXES = {
+    "Viettel": ["086", "096", "097", "098", "032", "033", "034", "035", "036", "037", "038", "039"],
+    "Mobifone": ["089", "090", "093", "070", "076", "077", "078", "079"],
+    "Vinaphone": ["088", "091", "094", "081", "082", "083", "084", "085"],
+    "Vietnamobile": ["092", "056", "058"],
+    "Gmobile": ["099", "059"],
+    "Itelecom": ["087"],
+}
+
+# Danh sách phẳng tất cả các đầu số
+ALL_NETWORK_PREFIXES = [prefix for prefixes in NETWORK_PREFIXES.values() for prefix in prefixes]
@@ -7,6 +7,7 @@ This module initializes a simple FastAPI application for Phong Thuy So
 import json
 import logging
 import os
+import sys
 import uuid
 import asyncio
 from datetime import datetime
@@ -17,10 +18,12 @@ from contextlib import asynccontextmanager
 from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, Query, Request, UploadFile, Depends, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 # Khởi tạo các biến môi trường
 env_mode = os.environ.get("ENV_MODE", "dev")
@@ -155,11 +158,71 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Lỗi khi khởi tạo kết nối MongoDB: {e}")
     
+    # Memory-map bảng điểm tính sẵn (nếu đã build offline) để tra cứu không cần phân tích lại
+    try:
+        from tools.batcuclinhso_analysis.score_table import DEFAULT_SCORE_TABLE_DIR, score_tables
+        loaded_prefixes = score_tables.load(DEFAULT_SCORE_TABLE_DIR)
+        logger.info(
+            f"Đã memory-map bảng điểm cho {loaded_prefixes} đầu số, "
+            f"phân phối điểm cho {len(score_tables.distribution_prefixes)} đầu số"
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"Lỗi khi load bảng điểm tính sẵn: {e}")
+    
+    # Memory-map bộ lọc mật khẩu đã lộ (nếu đã build offline), kiểm tra không cần gọi mạng
+    try:
+        from tools.batcuclinhso_analysis.breach_filter import DEFAULT_BREACH_FILTER_PATH, breached_passwords
+        if breached_passwords.load(DEFAULT_BREACH_FILTER_PATH):
+            logger.info(f"Đã memory-map bộ lọc {breached_passwords.item_count} mật khẩu đã lộ")
+    except (OSError, ValueError) as e:
+        logger.error(f"Lỗi khi load bộ lọc mật khẩu đã lộ: {e}")
+    
+    # Pool tiến trình MCP phân tích số điện thoại (chỉ dùng ở chế độ mcp)
+    phone_pool = None
+    pool_size = int(os.environ.get("PHONE_MCP_POOL_SIZE", 4))
+    if os.environ.get("PHONE_ANALYSIS_MODE", "in_process").lower() == "mcp" and pool_size > 0:
+        from shared_libraries.mcp_pool import (
+            PHONE_ANALYZER_POOL,
+            PHONE_ANALYZER_SERVER_ARGS,
+            MCPWorkerPool,
+            register_pool,
+            stdio_session_factory,
+        )
+        try:
+            phone_pool = MCPWorkerPool(
+                PHONE_ANALYZER_POOL,
+                stdio_session_factory(sys.executable, PHONE_ANALYZER_SERVER_ARGS),
+                size=pool_size,
+            )
+            await phone_pool.start()
+            register_pool(phone_pool)
+        except Exception as e:
+            phone_pool = None
+            logger.error(f"Lỗi khi khởi tạo pool MCP phân tích số điện thoại: {e}")
+    
+    # Pool tiến trình cho các tác vụ phân tích nặng (ANALYSIS_POOL_WORKERS=0 để tắt)
+    from shared_libraries.process_pool import analysis_pool
+    analysis_workers = int(os.environ.get("ANALYSIS_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+    if analysis_workers > 0:
+        try:
+            analysis_pool.start(max_workers=analysis_workers)
+        except (OSError, ValueError) as e:
+            logger.error(f"Lỗi khi khởi tạo pool tiến trình phân tích: {e}")
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Phong Thuy API")
     
+    # Hủy các chunk phân tích chưa chạy và đóng pool tiến trình
+    await analysis_pool.close()
+    
+    # Chờ các yêu cầu đang xử lý trong pool MCP hoàn tất rồi đóng các tiến trình con
+    if phone_pool is not None:
+        from shared_libraries.mcp_pool import unregister_pool
+        unregister_pool(phone_pool.name)
+        await phone_pool.drain()
+    
     # Đóng kết nối MongoDB
     try:
         from shared_libraries.database.mongodb import close_connection
@@ -167,6 +230,11 @@ async def lifespan(app: FastAPI):
         logger.info("Đã đóng kết nối MongoDB thành công")
     except Exception as e:
         logger.error(f"Lỗi khi đóng kết nối MongoDB: {e}")
+    
+    from tools.batcuclinhso_analysis.score_table import score_tables
+    score_tables.close()
+    from tools.batcuclinhso_analysis.breach_filter import breached_passwords
+    breached_passwords.close()
 
 # Khởi tạo ứng dụng FastAPI
 app = FastAPI(
@@ -241,6 +309,34 @@ class ChatResponse(BaseModel):
     is_final: bool = True
 
 
+class WhatIfRequest(BaseModel):
+    """Request model for re-scoring a phone number after a single-digit edit."""
+    
+    position: int = Field(..., ge=0, le=9, description="Vị trí chữ số cần sửa (0-9)")
+    digit: str = Field(..., pattern=r"^[0-9]$", description="Chữ số mới")
+    state: Optional[Dict[str, Any]] = Field(None, description="Trạng thái trả về từ lần gọi trước")
+    phone_number: Optional[str] = Field(None, description="Số điện thoại ban đầu (khi chưa có trạng thái)")
+
+
+class PasswordBatchRequest(BaseModel):
+    """Request model for generating passwords with a target energy number in bulk."""
+    
+    count: int = Field(..., ge=1, le=10000, description="Số mật khẩu cần tạo")
+    energy_number: int = Field(..., ge=1, le=9, description="Năng lượng số mong muốn (1-9)")
+    min_length: int = Field(8, ge=8, le=128, description="Độ dài tối thiểu của mật khẩu")
+    require_special_chars: bool = Field(True, description="Yêu cầu ký tự đặc biệt")
+    require_numbers: bool = Field(True, description="Yêu cầu chữ số")
+
+
+class BreachCheckRequest(BaseModel):
+    """Request model for auditing passwords against the local breached-password filter."""
+    
+    passwords: List[str] = Field(default_factory=list, max_length=10000, description="Mật khẩu cần kiểm tra")
+    sha1_hashes: List[str] = Field(
+        default_factory=list, max_length=10000, description="Mã SHA-1 (hex) của mật khẩu cần kiểm tra"
+    )
+
+
 # User Models
 class UserBase(BaseModel):
     """Base user model."""
@@ -503,6 +599,13 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     return current_user
 
 
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    """Check if user is an admin."""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Chỉ quản trị viên mới được thực hiện thao tác này")
+    return current_user
+
+
 async def validate_api_key(api_key: str = Header(..., convert_underscores=False)) -> Dict[str, Any]:
     """Validate API key."""
     try:
@@ -777,6 +880,12 @@ async def health_check():
     return {"status": "healthy", "version": app.version}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(current_user: User = Depends(get_current_admin_user)):
+    """Metrics Prometheus (pool MCP, pool tiến trình, cache, ...), chỉ dành cho quản trị viên."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/agents")
 async def get_agents():
     """Get the list of available agents."""
@@ -1544,6 +1653,462 @@ async def analyze_phone(
             detail=f"Lỗi không xác định: {str(e)}"
         ) 
 
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse được phép đọc thân request trong lúc ghi kết quả.
+    
+    Với ASGI spec < 2.4, StreamingResponse chạy kèm một task chờ http.disconnect bằng receive(),
+    task này tranh mất các message http.request mà request.stream() đang đọc. Ở đây ngắt kết nối
+    được phát hiện qua chính request.stream() (ClientDisconnect) hoặc lỗi khi gửi dữ liệu.
+    Body iterator luôn được đóng ngay khi luồng dừng, để khối finally của generator (ví dụ lưu
+    quota) chạy cả khi client ngắt kết nối giữa chừng.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        finally:
+            if hasattr(self.body_iterator, "aclose"):
+                await self.body_iterator.aclose()
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/api/batcuclinh_so/analyze_bulk")
+async def analyze_bulk(
+    request: Request,
+    output: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Định dạng kết quả: ndjson hoặc csv"),
+    offset: int = Query(0, ge=0, description="Bỏ qua các bản ghi trước vị trí này (chạy tiếp công việc)"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=100000, description="Số bản ghi mỗi chunk (1 lượt quota)"),
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Phân tích hàng loạt số điện thoại dạng luồng.
+    
+    Thân request là CSV (text/csv), NDJSON (application/x-ndjson) hoặc mỗi dòng một số, được đọc dần
+    theo từng chunk và không bao giờ giữ toàn bộ trong bộ nhớ. Mỗi chunk tính một lượt quota; khi hết
+    quota luồng kết thúc với bản ghi trạng thái chứa `next_offset` để chạy tiếp.
+    """
+    from shared_libraries.process_pool import analysis_pool
+    from tools.batcuclinhso_analysis import bulk_stream
+    from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+    
+    # Kiểm tra xác thực - hoặc thông qua current_user hoặc api_key
+    user = current_user
+    if not user and api_key:
+        user = await validate_api_key(api_key)
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Bạn cần đăng nhập hoặc cung cấp API key"
+        )
+    metered = 'remainingQuestions' in user and not user.get('isPremium', False)
+    if metered and user['remainingQuestions'] <= 0:
+        raise HTTPException(
+            status_code=402,
+            detail="Bạn đã hết số lần phân tích. Vui lòng nâng cấp tài khoản."
+        )
+    
+    input_format = bulk_stream.input_format_for(request.headers.get("content-type"))
+    chunk_size = chunk_size or bulk_stream.BULK_CHUNK_SIZE
+    
+    async def results():
+        next_offset = offset
+        processed = 0
+        charged = 0
+        status, detail = bulk_stream.STATUS_COMPLETE, ""
+        numbers = bulk_stream.iter_numbers(request.stream(), input_format)
+        try:
+            try:
+                async for chunk_offset, chunk in bulk_stream.iter_chunks(numbers, chunk_size, offset):
+                    if metered and user['remainingQuestions'] <= 0:
+                        status = bulk_stream.STATUS_QUOTA_EXCEEDED
+                        break
+                    batch = await analysis_pool.run(analyze_phone_numbers_batch, chunk, size=len(chunk))
+                    if metered:
+                        user['remainingQuestions'] -= 1
+                        charged += 1
+                    rows = bulk_stream.result_rows(chunk_offset, chunk, batch)
+                    yield bulk_stream.format_rows(rows, output, header=output == "csv" and processed == 0)
+                    processed += len(chunk)
+                    next_offset = chunk_offset + len(chunk)
+            except ValueError as e:
+                status, detail = bulk_stream.STATUS_ERROR, str(e)
+            yield bulk_stream.format_trailer(status, next_offset, processed, output, detail)
+        finally:
+            # Cập nhật quota trong database một lần khi luồng dừng vì bất kỳ lý do nào: kết thúc
+            # bình thường, lỗi giữa chừng hoặc client ngắt kết nối
+            if charged:
+                await update_user_quota(user_id=user.get("id"), remaining_questions=user['remainingQuestions'])
+    
+    return DuplexStreamingResponse(results(), media_type=bulk_stream.OUTPUT_MEDIA_TYPES[output])
+
+
+async def _authenticated_user(current_user: Optional[User], api_key: Optional[str]) -> User:
+    """Người dùng đăng nhập hoặc chủ của API key, 401 nếu không có"""
+    user = current_user
+    if not user and api_key:
+        user = await validate_api_key(api_key)
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Bạn cần đăng nhập hoặc cung cấp API key"
+        )
+    return user
+
+
+async def _metered_user(current_user: Optional[User], api_key: Optional[str]) -> User:
+    """Như _authenticated_user, thêm kiểm tra quota (402 nếu đã hết lượt phân tích)"""
+    user = await _authenticated_user(current_user, api_key)
+    if 'remainingQuestions' in user and user['remainingQuestions'] <= 0 and not user.get('isPremium', False):
+        raise HTTPException(
+            status_code=402,
+            detail="Bạn đã hết số lần phân tích. Vui lòng nâng cấp tài khoản."
+        )
+    return user
+
+
+async def _charge_quota(user: User) -> None:
+    """Trừ một lượt quota của người dùng (không áp dụng cho tài khoản premium) và lưu vào database"""
+    if 'remainingQuestions' in user and not user.get('isPremium', False):
+        user['remainingQuestions'] -= 1
+        await update_user_quota(user_id=user.get("id"), remaining_questions=user['remainingQuestions'])
+
+
+async def _inventory_owner(current_user: Optional[User], api_key: Optional[str]) -> str:
+    """Chủ sở hữu kho số (đại lý) từ người dùng đăng nhập hoặc API key"""
+    user = await _authenticated_user(current_user, api_key)
+    return str(user.get("id"))
+
+
+def _split_keys(value: Optional[str]) -> List[str]:
+    return [key for key in (value or "").split(",") if key.strip()]
+
+
+@app.put("/api/batcuclinh_so/inventory")
+async def upload_inventory(
+    request: Request,
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Tải lên và đánh chỉ mục kho số của đại lý (thay thế kho hiện có).
+
+    Thân request có cùng định dạng với analyze_bulk (CSV, NDJSON hoặc mỗi dòng một số).
+    """
+    from shared_libraries.process_pool import analysis_pool
+    from tools.batcuclinhso_analysis import bulk_stream
+    from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+    from tools.batcuclinhso_analysis.inventory_index import INGEST_CHUNK_SIZE, InventoryBuilder, inventory_store
+
+    owner = await _inventory_owner(current_user, api_key)
+    input_format = bulk_stream.input_format_for(request.headers.get("content-type"))
+    builder = InventoryBuilder()
+    try:
+        numbers = bulk_stream.iter_numbers(request.stream(), input_format)
+        async for _, chunk in bulk_stream.iter_chunks(numbers, INGEST_CHUNK_SIZE):
+            builder.add_batch(await analysis_pool.run(analyze_phone_numbers_batch, chunk, size=len(chunk)))
+        index = await asyncio.to_thread(builder.build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Ghi kho số vào thư mục dùng chung để mọi worker đều thấy
+    await asyncio.to_thread(inventory_store.put, owner, index)
+    return {**index.stats(), "invalid": builder.invalid}
+
+
+@app.get("/api/batcuclinh_so/inventory/search")
+async def search_inventory(
+    ending: Optional[str] = Query(None, description="Chuỗi sao của các cặp cuối, ví dụ SINH_KHI,THIEN_Y"),
+    starting: Optional[str] = Query(None, description="Chuỗi sao của các cặp đầu"),
+    include: Optional[str] = Query(None, description="Các sao phải xuất hiện"),
+    exclude: Optional[str] = Query(None, description="Các sao không được xuất hiện, ví dụ TUYET_MENH"),
+    combinations: Optional[str] = Query(None, description="Các tổ hợp sao phải xuất hiện, ví dụ SINH_KHI_THIEN_Y"),
+    min_score: Optional[float] = Query(None, ge=0, le=10, description="Điểm tối thiểu"),
+    max_score: Optional[float] = Query(None, ge=0, le=10, description="Điểm tối đa"),
+    purpose: Optional[str] = Query(None, description="Xếp hạng theo mục đích sử dụng (kinh doanh, cá nhân, tài lộc, ...)"),
+    limit: int = Query(20, description="Số lượng kết quả tối đa", ge=1, le=1000),
+    offset: int = Query(0, description="Số lượng kết quả bỏ qua", ge=0, le=10000),
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Tìm các số trong kho của đại lý theo chuỗi sao, tổ hợp và khoảng điểm (điều kiện AND).
+
+    Nếu có mục đích, kết quả được xếp theo điểm tổng hợp kèm điểm phù hợp của mọi mục đích.
+    """
+    from tools.batcuclinhso_analysis.inventory_index import inventory_store
+
+    owner = await _inventory_owner(current_user, api_key)
+    index = await asyncio.to_thread(inventory_store.get, owner)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Chưa có kho số, cần tải lên trước")
+    try:
+        # Truy vấn trên kho lớn (hàng triệu số) có thể mất hàng trăm mili giây, chạy ngoài event loop
+        return await asyncio.to_thread(
+            index.search,
+            limit=limit,
+            offset=offset,
+            purpose=purpose,
+            ending=_split_keys(ending),
+            starting=_split_keys(starting),
+            include_stars=_split_keys(include),
+            exclude_stars=_split_keys(exclude),
+            combinations=_split_keys(combinations),
+            min_score=min_score,
+            max_score=max_score
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/api/batcuclinh_so/inventory")
+async def delete_inventory(
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Xóa kho số của đại lý."""
+    from tools.batcuclinhso_analysis.inventory_index import inventory_store
+
+    owner = await _inventory_owner(current_user, api_key)
+    if not await asyncio.to_thread(inventory_store.remove, owner):
+        raise HTTPException(status_code=404, detail="Chưa có kho số")
+    return {"deleted": True}
+
+
+@app.get("/api/batcuclinh_so/score/{phone_number}")
+async def get_precomputed_score(
+    phone_number: str,
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Tra cứu điểm phong thủy của số điện thoại từ bảng điểm tính sẵn."""
+    from tools.batcuclinhso_analysis.score_table import score_tables
+    
+    await _authenticated_user(current_user, api_key)
+    try:
+        result = score_tables.lookup(phone_number)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Chưa có bảng điểm tính sẵn cho đầu số này"
+        )
+    return result
+
+
+@app.get("/api/batcuclinh_so/percentile/{phone_number}")
+async def get_score_percentile(phone_number: str):
+    """So sánh điểm phong thủy của số điện thoại với mọi số thuê bao cùng đầu số (bảng phân phối tính sẵn)."""
+    from tools.batcuclinhso_analysis.score_table import score_tables
+    
+    try:
+        result = score_tables.percentile_rank(phone_number)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Chưa có bảng phân phối điểm cho đầu số này"
+        )
+    return result
+
+
+@app.post("/api/batcuclinh_so/what_if")
+async def what_if_phone(request: WhatIfRequest):
+    """Tính lại điểm số điện thoại sau khi sửa một chữ số, không qua agent/LLM.
+    
+    Lần gọi đầu gửi phone_number, các lần sau gửi lại `state` từ phản hồi trước.
+    """
+    from tools.batcuclinhso_analysis.what_if import what_if
+    
+    if request.state is None and not request.phone_number:
+        raise HTTPException(status_code=400, detail="Cần cung cấp state hoặc phone_number")
+    try:
+        return what_if(
+            request.position,
+            request.digit,
+            state=request.state,
+            phone_number=request.phone_number
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/batcuclinh_so/best_numbers")
+async def get_best_numbers(
+    prefix: str = Query(..., description="Đầu số nhà mạng (3 chữ số)", min_length=3, max_length=3),
+    limit: int = Query(10, description="Số lượng kết quả tối đa", ge=1, le=100),
+    offset: int = Query(0, description="Số lượng kết quả bỏ qua", ge=0, le=10000),
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Lấy các số điện thoại có điểm phong thủy cao nhất của một đầu số từ bảng điểm tính sẵn."""
+    from tools.batcuclinhso_analysis.score_table import score_tables
+    
+    await _authenticated_user(current_user, api_key)
+    if not score_tables.has_prefix(prefix):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Chưa có bảng điểm tính sẵn cho đầu số {prefix}"
+        )
+    return {
+        "prefix": prefix,
+        "offset": offset,
+        # Quét bảng 10^7 số của đầu số, chạy ngoài event loop
+        "numbers": await asyncio.to_thread(score_tables.best_numbers, prefix, limit, offset)
+    }
+
+
+@app.post("/api/batcuclinh_so/passwords/generate")
+async def generate_passwords_bulk(
+    request: PasswordBatchRequest,
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Tạo hàng loạt mật khẩu mang đúng năng lượng số mong muốn (dựng trực tiếp, không tạo lại)."""
+    from tools.batcuclinhso_analysis.password_generator import generate_passwords
+    
+    user = current_user
+    if not user and api_key:
+        user = await validate_api_key(api_key)
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Bạn cần đăng nhập hoặc cung cấp API key"
+        )
+    try:
+        passwords = await asyncio.to_thread(
+            generate_passwords,
+            request.count,
+            request.energy_number,
+            request.min_length,
+            request.require_special_chars,
+            request.require_numbers
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "energy_number": request.energy_number,
+        "count": len(passwords),
+        "passwords": passwords
+    }
+
+
+@app.post("/api/admin/breached_passwords/check")
+async def check_breached_passwords(
+    request: BreachCheckRequest,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Kiểm tra hàng loạt mật khẩu (hoặc mã SHA-1) với bộ lọc mật khẩu đã lộ cục bộ (dành cho quản trị viên).
+    
+    Kết quả `breached` theo đúng thứ tự đầu vào: mật khẩu trước, mã SHA-1 sau. Có thể có dương tính giả
+    với tỉ lệ `false_positive_rate` của bộ lọc, không có âm tính giả.
+    """
+    from tools.batcuclinhso_analysis.breach_filter import breached_passwords, password_digest
+    
+    if not breached_passwords.loaded:
+        raise HTTPException(status_code=503, detail="Chưa có bộ lọc mật khẩu đã lộ")
+    try:
+        digests = [password_digest(password) for password in request.passwords]
+        digests += [bytes.fromhex(value) for value in request.sha1_hashes]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Mã SHA-1 không hợp lệ")
+    if any(len(digest) != 20 for digest in digests[len(request.passwords):]):
+        raise HTTPException(status_code=400, detail="Mã SHA-1 phải gồm 40 ký tự hex")
+    
+    breached = breached_passwords.check_many(digests)
+    return {
+        "checked": len(digests),
+        "breached_count": int(breached.sum()),
+        "breached": breached.tolist(),
+        "filter": breached_passwords.stats()
+    }
+
+
+# Ngân sách tối đa của một lượt tìm kiếm nhánh cận qua API (pool tiến trình dùng chung với analyze_bulk)
+SEARCH_MAX_TIME_BUDGET_MS = 200
+SEARCH_MAX_NODE_BUDGET = 200_000
+
+
+@app.get("/api/batcuclinh_so/pattern_search")
+async def pattern_search(
+    pattern: str = Query(..., description="Mẫu số có ký tự đại diện, ví dụ 09xx68xx88", min_length=10, max_length=10),
+    k: int = Query(10, description="Số lượng kết quả tối đa", ge=1, le=100),
+    offset: int = Query(0, description="Số lượng kết quả bỏ qua", ge=0, le=1000),
+    purpose: Optional[str] = Query(None, description="Mục đích sử dụng (kinh doanh, cá nhân, tài lộc, ...)"),
+    time_budget_ms: float = Query(
+        SEARCH_MAX_TIME_BUDGET_MS, description="Ngân sách thời gian tìm kiếm (mili giây)", gt=0, le=SEARCH_MAX_TIME_BUDGET_MS
+    ),
+    node_budget: int = Query(
+        SEARCH_MAX_NODE_BUDGET, description="Ngân sách số node duyệt", ge=1, le=SEARCH_MAX_NODE_BUDGET
+    ),
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Tìm các số điểm cao nhất khớp mẫu có ký tự đại diện (x, X, *, ?), không qua agent/LLM.
+
+    Mỗi lượt tìm kiếm thành công tính một lượt quota.
+    """
+    from shared_libraries.process_pool import analysis_pool
+    from tools.batcuclinhso_analysis.number_search import WILDCARDS
+    from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+    user = await _metered_user(current_user, api_key)
+    # Kích thước tác vụ ước lượng theo số cách điền ký tự đại diện (giới hạn bởi ngân sách node)
+    size = min(10 ** sum(1 for char in pattern if char in WILDCARDS), node_budget)
+    try:
+        result = await analysis_pool.run(
+            PhoneAnalyzer.search_pattern, pattern, k, offset, purpose, time_budget_ms, node_budget, size=size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await _charge_quota(user)
+    return result
+
+
+@app.get("/api/batcuclinh_so/improve/{phone_number}")
+async def improve_phone(
+    phone_number: str,
+    max_edits: int = Query(2, description="Số chữ số tối đa được thay đổi", ge=1, le=4),
+    k: int = Query(10, description="Số lượng kết quả tối đa", ge=1, le=100),
+    purpose: Optional[str] = Query(None, description="Mục đích sử dụng (kinh doanh, cá nhân, tài lộc, ...)"),
+    keep_prefix: int = Query(3, description="Số chữ số đầu giữ nguyên", ge=0, le=10),
+    time_budget_ms: float = Query(
+        SEARCH_MAX_TIME_BUDGET_MS, description="Ngân sách thời gian tìm kiếm (mili giây)", gt=0, le=SEARCH_MAX_TIME_BUDGET_MS
+    ),
+    node_budget: int = Query(
+        SEARCH_MAX_NODE_BUDGET, description="Ngân sách số node duyệt", ge=1, le=SEARCH_MAX_NODE_BUDGET
+    ),
+    current_user: Optional[User] = Depends(get_current_user),
+    api_key: Optional[str] = Header(None, convert_underscores=False)
+):
+    """Tìm các số điểm cao hơn khi thay đổi tối đa `max_edits` chữ số của số hiện tại.
+
+    Mỗi lượt tìm kiếm thành công tính một lượt quota.
+    """
+    from math import comb
+    from shared_libraries.process_pool import analysis_pool
+    from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+    user = await _metered_user(current_user, api_key)
+    # Kích thước tác vụ ước lượng theo số lượng số trong bán kính thay đổi
+    free = max(0, 10 - keep_prefix)
+    size = min(sum(comb(free, edits) * 9 ** edits for edits in range(min(max_edits, free) + 1)), node_budget)
+    try:
+        result = await analysis_pool.run(
+            PhoneAnalyzer.improve_phone_number,
+            phone_number, max_edits, k, purpose, keep_prefix, time_budget_ms, node_budget,
+            size=size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await _charge_quota(user)
+    return result
+
+
 # Hàm cập nhật quota người dùng
 async def update_user_quota(user_id: str, remaining_questions: int = None):
     """Cập nhật số lượng câu hỏi còn lại của người dùng."""
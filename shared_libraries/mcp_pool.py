@@ -0,0 +1,384 @@
+"""
+MCP Worker Pool Module
+
+Quản lý một nhóm N tiến trình con MCP server (stdio) cho cùng một bộ công cụ:
+- Điều phối theo số yêu cầu đang xử lý ít nhất (least outstanding requests)
+- Kiểm tra sức khỏe định kỳ: worker rảnh được ping (có timeout), worker crash, treo hoặc có
+  tiến trình con đã chết được khởi động lại
+- Dừng nhận yêu cầu mới và chờ các yêu cầu đang chạy hoàn tất khi tắt (drain)
+- Số worker, độ sâu hàng đợi và độ trễ từng lượt gọi được xuất dưới dạng metrics Prometheus
+
+Mỗi worker giữ phiên MCP trong một task riêng (vào và thoát exit stack trên cùng một task,
+theo yêu cầu của anyio), nên có thể khởi động lại worker từ bất kỳ task nào.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from shared_libraries.logger import get_logger
+
+logger = get_logger(__name__)
+
+ToolCaller = Callable[..., Awaitable[Any]]
+# Hàm tạo phiên: async context manager trả về {tên công cụ: hàm gọi bất đồng bộ}
+SessionFactory = Callable[[], Any]
+# Khóa dành riêng trong dict của phiên: hàm bất đồng bộ không tham số để kiểm tra tiến trình con
+# còn phản hồi (lỗi hoặc quá thời gian nghĩa là worker hỏng). Không được coi là một công cụ.
+PING = "__ping__"
+
+POOL_WORKERS = Gauge("mcp_pool_workers", "Số worker MCP đang hoạt động", ["pool"])
+POOL_QUEUE_DEPTH = Gauge("mcp_pool_queue_depth", "Số yêu cầu đang chờ worker rảnh", ["pool"])
+POOL_OUTSTANDING = Gauge("mcp_pool_outstanding", "Số yêu cầu đang được worker xử lý", ["pool"])
+POOL_CALL_LATENCY = Histogram(
+    "mcp_pool_call_latency_seconds", "Độ trễ từng lượt gọi công cụ MCP", ["pool", "tool"]
+)
+POOL_RESTARTS = Counter("mcp_pool_restarts_total", "Số lần khởi động lại worker MCP", ["pool"])
+
+
+class PoolClosedError(RuntimeError):
+    """Pool đang drain hoặc đã đóng, không nhận yêu cầu mới"""
+
+
+class PoolBusyError(RuntimeError):
+    """Hàng đợi của pool đã đầy"""
+
+
+class ToolCallError(RuntimeError):
+    """Công cụ MCP trả về lỗi (worker vẫn hoạt động bình thường)"""
+
+
+def _decode_tool_result(response: Any) -> Any:
+    """Chuyển CallToolResult của MCP thành giá trị Python (JSON nếu parse được)"""
+    content = getattr(response, "content", None)
+    if content is None:
+        return response
+    if getattr(response, "isError", False):
+        raise ToolCallError(" ".join(getattr(item, "text", "") for item in content))
+    text = "".join(getattr(item, "text", "") for item in content)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def stdio_session_factory(command: str, args: List[str]) -> SessionFactory:
+    """Tạo hàm mở phiên MCP tới một server stdio bằng MCPToolset của google-adk"""
+
+    @asynccontextmanager
+    async def open_session() -> AsyncIterator[Dict[str, ToolCaller]]:
+        from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+
+        tools, exit_stack = await MCPToolset.from_server(
+            connection_params=StdioServerParameters(command=command, args=args)
+        )
+        async with exit_stack:
+            callers = {}
+            if tools:
+                # Các công cụ dùng chung một phiên MCP: ping của giao thức đi qua stdio tới tiến trình con
+                callers[PING] = tools[0].mcp_session.send_ping
+            for tool in tools:
+                async def call(_tool=tool, **kwargs):
+                    return _decode_tool_result(await _tool.run_async(args=kwargs, tool_context=None))
+                callers[tool.name] = call
+            yield callers
+
+    return open_session
+
+
+class MCPWorker:
+    """Một tiến trình con MCP server và phiên kết nối tới nó"""
+
+    def __init__(self, worker_id: int, open_session: SessionFactory):
+        self.worker_id = worker_id
+        self._open_session = open_session
+        self.tools: Dict[str, ToolCaller] = {}
+        self._ping: Optional[ToolCaller] = None
+        self.outstanding = 0
+        self.healthy = False
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self.healthy and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float) -> None:
+        """Khởi động tiến trình con và chờ phiên MCP sẵn sàng"""
+        self._ready.clear()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run(), name=f"mcp-worker-{self.worker_id}")
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        if not self.healthy:
+            raise RuntimeError(f"Không khởi động được MCP worker {self.worker_id}")
+
+    async def _run(self) -> None:
+        try:
+            async with self._open_session() as tools:
+                self.tools = dict(tools)
+                self._ping = self.tools.pop(PING, None)
+                self.healthy = True
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            logger.error(f"MCP worker {self.worker_id} dừng do lỗi: {e}")
+        finally:
+            self.healthy = False
+            self.tools = {}
+            self._ping = None
+            self._ready.set()
+
+    async def stop(self) -> None:
+        """Đóng phiên MCP và tiến trình con"""
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def probe(self, timeout: float) -> bool:
+        """Ping tiến trình con (nếu phiên hỗ trợ), đánh dấu worker lỗi nếu không phản hồi kịp"""
+        if not self.alive:
+            return False
+        if self._ping is None:
+            return True
+        try:
+            await asyncio.wait_for(self._ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP worker {self.worker_id} không phản hồi ping: {e!r}")
+            self.healthy = False
+            return False
+
+    async def call(self, tool_name: str, **kwargs) -> Any:
+        caller = self.tools.get(tool_name)
+        if caller is None:
+            raise KeyError(f"MCP worker không có công cụ {tool_name}")
+        try:
+            return await caller(**kwargs)
+        except ToolCallError:
+            raise
+        except Exception:
+            # Lỗi kết nối/tiến trình con: đánh dấu để health check khởi động lại
+            self.healthy = False
+            raise
+
+
+class MCPWorkerPool:
+    """Pool N worker MCP với điều phối least-outstanding-requests"""
+
+    def __init__(
+        self,
+        name: str,
+        open_session: SessionFactory,
+        size: int = 4,
+        max_in_flight: int = 1,
+        max_queue_depth: int = 256,
+        health_interval: float = 5.0,
+        start_timeout: float = 30.0,
+        probe_timeout: float = 2.0,
+    ):
+        """
+        Args:
+            name: Tên pool (nhãn của metrics)
+            open_session: Hàm mở phiên MCP cho một worker (xem stdio_session_factory)
+            size: Số tiến trình con
+            max_in_flight: Số yêu cầu đồng thời tối đa trên mỗi worker
+            max_queue_depth: Số yêu cầu chờ tối đa khi mọi worker đều bận
+            health_interval: Chu kỳ kiểm tra sức khỏe (giây)
+            start_timeout: Thời gian chờ tối đa khi khởi động một worker (giây)
+            probe_timeout: Thời gian chờ tối đa phản hồi ping của worker rảnh (giây)
+        """
+        if size < 1:
+            raise ValueError("Kích thước pool phải lớn hơn 0")
+        self.name = name
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.health_interval = health_interval
+        self.start_timeout = start_timeout
+        self.probe_timeout = probe_timeout
+        self.workers = [MCPWorker(i, open_session) for i in range(size)]
+        self.waiting = 0
+        self.restarts = 0
+        self._available = asyncio.Condition()
+        self._health_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self) -> None:
+        """Khởi động toàn bộ worker và vòng kiểm tra sức khỏe"""
+        results = await asyncio.gather(
+            *(worker.start(self.start_timeout) for worker in self.workers), return_exceptions=True
+        )
+        for worker, result in zip(self.workers, results):
+            if isinstance(result, Exception):
+                logger.error(f"Pool {self.name}: worker {worker.worker_id} lỗi khi khởi động: {result}")
+        self._update_gauges()
+        if not any(worker.alive for worker in self.workers):
+            await self.close()
+            raise RuntimeError(f"Pool {self.name}: không có worker nào khởi động được")
+        self._health_task = asyncio.create_task(self._health_loop(), name=f"mcp-pool-{self.name}-health")
+        logger.info(f"Pool {self.name}: {self.alive_count()}/{self.size} worker sẵn sàng")
+
+    def alive_count(self) -> int:
+        return sum(1 for worker in self.workers if worker.alive)
+
+    def has_tool(self, tool_name: str) -> bool:
+        """Pool có worker nào cung cấp công cụ `tool_name` hay không"""
+        return any(worker.alive and tool_name in worker.tools for worker in self.workers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool": self.name,
+            "size": self.size,
+            "alive": self.alive_count(),
+            "outstanding": sum(worker.outstanding for worker in self.workers),
+            "queue_depth": self.waiting,
+            "restarts": self.restarts,
+            "closing": self._closing,
+        }
+
+    def _update_gauges(self) -> None:
+        POOL_WORKERS.labels(self.name).set(self.alive_count())
+        POOL_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        POOL_OUTSTANDING.labels(self.name).set(sum(worker.outstanding for worker in self.workers))
+
+    def _pick_worker(self, tool_name: str) -> Optional[MCPWorker]:
+        candidates = [
+            worker for worker in self.workers
+            if worker.alive and tool_name in worker.tools and worker.outstanding < self.max_in_flight
+        ]
+        return min(candidates, key=lambda worker: worker.outstanding, default=None)
+
+    async def _acquire(self, tool_name: str) -> MCPWorker:
+        async with self._available:
+            worker = self._pick_worker(tool_name)
+            if worker is None:
+                if self.waiting >= self.max_queue_depth:
+                    raise PoolBusyError(f"Pool {self.name}: hàng đợi đã đầy ({self.waiting})")
+                self.waiting += 1
+                self._update_gauges()
+                try:
+                    while worker is None:
+                        if self._closing:
+                            raise PoolClosedError(f"Pool {self.name} đang đóng")
+                        if not self.has_tool(tool_name):
+                            raise KeyError(f"Pool {self.name} không có công cụ {tool_name}")
+                        await self._available.wait()
+                        worker = self._pick_worker(tool_name)
+                finally:
+                    self.waiting -= 1
+            worker.outstanding += 1
+            self._update_gauges()
+            return worker
+
+    async def _release(self, worker: MCPWorker) -> None:
+        async with self._available:
+            worker.outstanding -= 1
+            self._update_gauges()
+            self._available.notify_all()
+
+    async def call(self, tool_name: str, **kwargs) -> Any:
+        """Gọi công cụ trên worker đang xử lý ít yêu cầu nhất"""
+        if self._closing:
+            raise PoolClosedError(f"Pool {self.name} đang đóng")
+        worker = await self._acquire(tool_name)
+        start = time.perf_counter()
+        try:
+            return await worker.call(tool_name, **kwargs)
+        finally:
+            POOL_CALL_LATENCY.labels(self.name, tool_name).observe(time.perf_counter() - start)
+            await self._release(worker)
+
+    async def _restart(self, worker: MCPWorker) -> None:
+        logger.warning(f"Pool {self.name}: khởi động lại worker {worker.worker_id}")
+        await worker.stop()
+        self.restarts += 1
+        POOL_RESTARTS.labels(self.name).inc()
+        try:
+            await worker.start(self.start_timeout)
+        except Exception as e:
+            logger.error(f"Pool {self.name}: không khởi động lại được worker {worker.worker_id}: {e}")
+        async with self._available:
+            self._update_gauges()
+            self._available.notify_all()
+
+    async def check_health(self) -> None:
+        """Ping các worker đang rảnh, khởi động lại worker đã crash, bị đánh dấu lỗi hoặc không phản hồi
+
+        Worker đang xử lý yêu cầu không bị ping hay khởi động lại; lỗi kết nối trong lượt gọi sẽ
+        đánh dấu worker để lần kiểm tra sau xử lý.
+        """
+        idle = [worker for worker in self.workers if worker.outstanding == 0]
+        # Ping đồng thời để một lượt kiểm tra tốn tối đa một probe_timeout thay vì N lần
+        results = await asyncio.gather(*(worker.probe(self.probe_timeout) for worker in idle))
+        for worker, healthy in zip(idle, results):
+            if self._closing:
+                return
+            # Yêu cầu mới có thể đã nhận worker trong lúc chờ ping
+            if not healthy and worker.outstanding == 0:
+                await self._restart(worker)
+
+    async def _health_loop(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"Pool {self.name}: lỗi khi kiểm tra sức khỏe: {e}")
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """Ngừng nhận yêu cầu mới, chờ các yêu cầu đang xử lý hoàn tất (tối đa `timeout` giây) rồi đóng pool"""
+        self._closing = True
+        async with self._available:
+            self._available.notify_all()
+            try:
+                await asyncio.wait_for(
+                    self._available.wait_for(lambda: all(w.outstanding == 0 for w in self.workers)),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Pool {self.name}: hết thời gian drain, đóng các yêu cầu còn dở")
+        await self.close()
+
+    async def close(self) -> None:
+        """Đóng ngay toàn bộ worker"""
+        self._closing = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(*(worker.stop() for worker in self.workers), return_exceptions=True)
+        self._update_gauges()
+        logger.info(f"Pool {self.name} đã đóng")
+
+
+# Pool MCP server phân tích số điện thoại (khởi tạo trong lifespan khi PHONE_ANALYSIS_MODE=mcp)
+PHONE_ANALYZER_POOL = "phone_analyzer"
+PHONE_ANALYZER_SERVER_ARGS = ["-m", "tools.batcuclinhso_analysis.phone_analyzer"]
+
+
+# Các pool dùng chung trong tiến trình (ví dụ pool phân tích số điện thoại khởi tạo trong lifespan)
+_pools: Dict[str, MCPWorkerPool] = {}
+
+
+def register_pool(pool: MCPWorkerPool) -> None:
+    _pools[pool.name] = pool
+
+
+def unregister_pool(name: str) -> Optional[MCPWorkerPool]:
+    return _pools.pop(name, None)
+
+
+def get_pool(name: str) -> Optional[MCPWorkerPool]:
+    return _pools.get(name)
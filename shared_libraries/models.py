@@ -95,6 +95,7 @@ class PasswordRequest(BatCucLinhSoRequest):
     min_length: Optional[int] = Field(8, description="Độ dài tối thiểu của mật khẩu")
     require_special_chars: Optional[bool] = Field(True, description="Yêu cầu ký tự đặc biệt")
     require_numbers: Optional[bool] = Field(True, description="Yêu cầu chữ số")
+    energy_number: Optional[int] = Field(None, ge=1, le=9, description="Năng lượng số mong muốn 1-9 (không bắt buộc)")
     request_type: ServiceType = ServiceType.PASSWORD_GENERATION
 
 
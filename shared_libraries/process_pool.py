@@ -0,0 +1,191 @@
+"""
+Analysis Process Pool Module
+
+Đưa các tác vụ phân tích nặng về CPU (phân tích hàng loạt, tìm kiếm số đề xuất, ...) ra khỏi
+event loop của FastAPI sang một pool tiến trình được quản lý trong lifespan:
+- Tác vụ nhỏ hơn ngưỡng (`offload_threshold`) chạy trực tiếp, tránh chi phí pickle/IPC
+- Tác vụ lớn được chia thành các chunk, số chunk đang chạy được giới hạn theo số worker
+- Kết quả trả về dần theo thứ tự chunk hoàn thành (`map_chunks` là async iterator)
+- Dừng đọc kết quả (đóng iterator) hoặc hủy task sẽ hủy các chunk chưa bắt đầu
+- Số chunk đang chạy và số tác vụ theo chế độ được xuất dưới dạng metrics Prometheus
+
+Khi pool chưa được khởi động (CLI, test), tác vụ lớn chạy trên thread pool mặc định của
+event loop: không song song hóa được CPU nhưng event loop vẫn không bị chặn.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from shared_libraries.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Số phần tử tối thiểu để chuyển tác vụ sang pool tiến trình và kích thước chunk mặc định
+OFFLOAD_THRESHOLD = int(os.environ.get("ANALYSIS_OFFLOAD_THRESHOLD", 5000))
+CHUNK_SIZE = int(os.environ.get("ANALYSIS_CHUNK_SIZE", 20000))
+# "spawn" an toàn khi tiến trình cha đã có nhiều thread (uvicorn, MongoDB client, ...)
+START_METHOD = os.environ.get("ANALYSIS_POOL_START_METHOD", "spawn")
+
+POOL_IN_FLIGHT = Gauge("analysis_pool_in_flight_chunks", "Số chunk phân tích đang chạy trong pool tiến trình")
+POOL_JOBS = Counter("analysis_pool_jobs_total", "Số tác vụ phân tích theo chế độ chạy", ["mode"])
+POOL_CANCELLED = Counter("analysis_pool_cancelled_chunks_total", "Số chunk bị hủy trước khi có kết quả")
+
+
+class ChunkResult(NamedTuple):
+    """Kết quả của một chunk: chỉ số chunk, vị trí phần tử đầu tiên trong đầu vào và kết quả"""
+    index: int
+    offset: int
+    result: Any
+
+
+class AnalysisProcessPool:
+    """Pool tiến trình cho các tác vụ phân tích nặng, khởi động/đóng trong lifespan của ứng dụng"""
+
+    def __init__(self, offload_threshold: int = OFFLOAD_THRESHOLD, chunk_size: int = CHUNK_SIZE):
+        """
+        Args:
+            offload_threshold: Số phần tử tối thiểu để tác vụ được chuyển sang pool
+            chunk_size: Số phần tử mỗi chunk mặc định của map_chunks
+        """
+        self.offload_threshold = offload_threshold
+        self.chunk_size = chunk_size
+        self.max_workers = 0
+        self.in_flight = 0
+        self.inline_jobs = 0
+        self.offloaded_jobs = 0
+        self.cancelled_chunks = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self, max_workers: Optional[int] = None, start_method: str = START_METHOD) -> None:
+        """Tạo pool tiến trình (các tiến trình con được tạo dần khi có tác vụ)"""
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context(start_method)
+        )
+        self.max_workers = self._executor._max_workers
+        logger.info(f"Pool tiến trình phân tích: tối đa {self.max_workers} worker ({start_method})")
+
+    async def close(self) -> None:
+        """Hủy các chunk chưa chạy, chờ các chunk đang chạy xong rồi đóng các tiến trình con"""
+        executor, self._executor = self._executor, None
+        self.max_workers = 0
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            logger.info("Pool tiến trình phân tích đã đóng")
+
+    def should_offload(self, size: int) -> bool:
+        return size >= self.offload_threshold
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "inline_jobs": self.inline_jobs,
+            "offloaded_jobs": self.offloaded_jobs,
+            "cancelled_chunks": self.cancelled_chunks,
+            "offload_threshold": self.offload_threshold,
+            "chunk_size": self.chunk_size,
+        }
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        POOL_IN_FLIGHT.inc()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+        finally:
+            self.in_flight -= 1
+            POOL_IN_FLIGHT.dec()
+
+    async def run(self, func: Callable[..., Any], *args: Any, size: int) -> Any:
+        """Chạy `func(*args)`, chuyển sang pool tiến trình nếu kích thước tác vụ đạt ngưỡng
+
+        `func` và các tham số phải pickle được (hàm cấp module) khi tác vụ được chuyển sang pool.
+
+        Args:
+            func: Hàm phân tích
+            size: Kích thước tác vụ (số phần tử, số nút tìm kiếm ước lượng, ...)
+        """
+        if not self.should_offload(size):
+            self.inline_jobs += 1
+            POOL_JOBS.labels("inline").inc()
+            return func(*args)
+        self.offloaded_jobs += 1
+        POOL_JOBS.labels("offloaded").inc()
+        return await self._submit(func, *args)
+
+    async def map_chunks(
+        self,
+        func: Callable[[Sequence[Any]], Any],
+        items: Sequence[Any],
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[ChunkResult]:
+        """Áp dụng `func` lên từng chunk của `items`, trả về kết quả theo thứ tự chunk hoàn thành
+
+        Đầu vào nhỏ hơn ngưỡng được xử lý trong một chunk duy nhất ngay trên event loop. Nên dùng
+        cùng `contextlib.aclosing` để các chunk chưa chạy được hủy ngay khi dừng đọc giữa chừng.
+
+        Args:
+            func: Hàm xử lý một chunk (nhận một lát cắt của `items`)
+            items: Dãy phần tử đầu vào (list, mảng NumPy, ...)
+            chunk_size: Số phần tử mỗi chunk (mặc định self.chunk_size)
+
+        Yields:
+            ChunkResult: (chỉ số chunk, vị trí phần tử đầu, kết quả của func)
+        """
+        total = len(items)
+        if not self.should_offload(total):
+            self.inline_jobs += 1
+            POOL_JOBS.labels("inline").inc()
+            yield ChunkResult(0, 0, func(items))
+            return
+
+        self.offloaded_jobs += 1
+        POOL_JOBS.labels("offloaded").inc()
+        chunk_size = chunk_size or self.chunk_size
+        chunks = enumerate(range(0, total, chunk_size))
+        # Giới hạn số chunk đã gửi đi để có thể hủy phần còn lại và không giữ toàn bộ kết quả trong bộ nhớ
+        window = 2 * max(1, self.max_workers)
+        pending: Dict[asyncio.Future, Tuple[int, int]] = {}
+
+        def fill() -> None:
+            while len(pending) < window:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                index, offset = chunk
+                future = asyncio.ensure_future(self._submit(func, items[offset:offset + chunk_size]))
+                pending[future] = (index, offset)
+
+        try:
+            fill()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    index, offset = pending.pop(future)
+                    result = future.result()
+                    fill()
+                    yield ChunkResult(index, offset, result)
+        finally:
+            for future in pending:
+                future.cancel()
+            if pending:
+                self.cancelled_chunks += len(pending)
+                POOL_CANCELLED.inc(len(pending))
+                await asyncio.gather(*pending, return_exceptions=True)
+
+
+# Pool dùng chung trong tiến trình, khởi động trong lifespan (ANALYSIS_POOL_WORKERS > 0)
+analysis_pool = AnalysisProcessPool()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark phân tích hàng loạt: gọi PhoneAnalyzer.analyze_phone_number từng số
+so với analyze_phone_numbers_batch trên mảng NumPy
+
+Chạy: python testingscript/bench_batch_analysis.py [số lượng số điện thoại]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(42)
+    matrix = rng.integers(0, 10, size=(count, 10), dtype=np.uint8)
+    matrix[:, 0] = 0
+    strings = ["".join(map(str, row)) for row in matrix[:100_000]]
+
+    start = time.perf_counter()
+    for number in strings:
+        PhoneAnalyzer.analyze_phone_number(number)
+    scalar = (time.perf_counter() - start) / len(strings)
+
+    start = time.perf_counter()
+    analyze_phone_numbers_batch(strings)
+    from_strings = (time.perf_counter() - start) / len(strings)
+
+    start = time.perf_counter()
+    analyze_phone_numbers_batch(matrix)
+    from_matrix = (time.perf_counter() - start) / count
+
+    print(f"Từng số (analyze_phone_number):   {scalar * 1e6:8.3f} µs/số")
+    print(f"Batch từ danh sách chuỗi:          {from_strings * 1e6:8.3f} µs/số (x{scalar / from_strings:.0f})")
+    print(f"Batch từ ma trận uint8 ({count} số): {from_matrix * 1e6:8.3f} µs/số (x{scalar / from_matrix:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark nhận diện tổ hợp sao liền kề: ghép chuỗi f"{sao}_{sao}" rồi tra dict COMBINATIONS (cũ)
+so với ma trận tổ hợp theo id sao (mới), cho từng chuỗi sao và cho cả lô bằng phép gather NumPy
+
+Chạy: python testingscript/bench_combinations.py [số lượng chuỗi sao]
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants.combinations import COMBINATIONS
+from tools.batcuclinhso_analysis.rule_tables import (
+    COMBINATION_KEYS,
+    COMBINATION_MATRIX,
+    NO_STAR,
+    STAR_KEYS,
+    adjacent_combinations,
+)
+
+# Chỉ các sao gốc xuất hiện trong phân tích theo cặp 2 chữ số
+BASE_STAR_IDS = [star_id for star_id, key in enumerate(STAR_KEYS) if not key.endswith("_ZERO")]
+
+
+def legacy_combinations(star_keys):
+    """Cách cũ: tạo khóa chuỗi cho mỗi cặp sao liền kề rồi băm vào COMBINATIONS"""
+    found = []
+    for i in range(len(star_keys) - 1):
+        combination_key = f"{star_keys[i]}_{star_keys[i + 1]}"
+        if combination_key in COMBINATIONS:
+            found.append((i, combination_key))
+    return found
+
+
+def _time_per_call(func, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(42)
+    sequences = [[rng.choice(BASE_STAR_IDS) for _ in range(5)] for _ in range(count)]
+    key_sequences = [[STAR_KEYS[star_id] for star_id in sequence] for sequence in sequences]
+
+    for ids, keys in zip(sequences[:1000], key_sequences[:1000]):
+        expected = legacy_combinations(keys)
+        assert [(i, COMBINATION_KEYS[c]) for i, c in adjacent_combinations(ids)] == expected
+
+    legacy = _time_per_call(legacy_combinations, key_sequences)
+    matrix = _time_per_call(adjacent_combinations, sequences)
+
+    matrix_np = np.array(COMBINATION_MATRIX, dtype=np.int8)
+    star_ids = np.array(sequences, dtype=np.uint8)
+    start = time.perf_counter()
+    batch = matrix_np[star_ids[:, :-1], star_ids[:, 1:]]
+    batch_time = (time.perf_counter() - start) / count * 1e6
+    assert batch.shape == (count, 4) and int(batch.max()) < len(COMBINATION_KEYS)
+    assert NO_STAR == matrix_np.shape[0] - 1
+
+    print(f"Nhận diện tổ hợp / chuỗi 5 sao ({count} chuỗi):")
+    print(f"  khóa f-string + dict (cũ): {legacy:8.3f} µs")
+    print(f"  ma trận id sao (mới):      {matrix:8.3f} µs  (x{legacy / matrix:.1f})")
+    print(f"  gather NumPy theo lô:      {batch_time:8.3f} µs  (x{legacy / batch_time:.0f})")
+
+
+if __name__ == "__main__":
+    main()
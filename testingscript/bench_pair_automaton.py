@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark tách cặp số: vòng while lồng nhau ghép chuỗi (cũ) so với máy trạng thái dạng bảng
+trả về khoảng (start, end) cho từng chuỗi, và chạy đồng thời trên cả ma trận chữ số NumPy
+
+Chạy: python testingscript/bench_pair_automaton.py [số lượng số điện thoại]
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.pair_automaton import pair_spans, pair_spans_batch
+from testingscript.test_pair_automaton import legacy_generate_pairs
+
+
+def _throughput(func, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    rng = random.Random(42)
+    numbers = ["0" + "".join(rng.choice("0123456789") for _ in range(9)) for _ in range(count)]
+    matrix = (np.frombuffer("".join(numbers).encode("ascii"), dtype=np.uint8) - ord("0")).reshape(count, 10)
+
+    legacy = _throughput(legacy_generate_pairs, numbers)
+    spans = _throughput(pair_spans, numbers)
+    start = time.perf_counter()
+    rows, _, _ = pair_spans_batch(matrix)
+    batch = count / (time.perf_counter() - start)
+    assert rows.size == sum(len(pair_spans(number)) for number in numbers[:count])
+
+    print(f"Tách cặp số ({count} số điện thoại 10 chữ số):")
+    print(f"  while lồng nhau + ghép chuỗi (cũ): {legacy / 1e6:8.3f} triệu số/s")
+    print(f"  máy trạng thái, khoảng (start, end): {spans / 1e6:8.3f} triệu số/s  (x{spans / legacy:.1f})")
+    print(f"  máy trạng thái theo lô NumPy:        {batch / 1e6:8.3f} triệu số/s  (x{batch / legacy:.0f})")
+
+
+if __name__ == "__main__":
+    main()
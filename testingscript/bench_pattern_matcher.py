@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark tìm nhiều mẫu chữ số: vòng lặp str.find theo từng mẫu và tra tập chuỗi con theo từng
+độ dài (cũ) so với máy Aho–Corasick quét một lần, từng chuỗi và theo lô NumPy
+
+Chạy: python testingscript/bench_pattern_matcher.py [số lượng mẫu] [độ dài chuỗi]
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.pattern_matcher import PatternMatcher, special_pattern_matcher
+
+
+def find_loop(patterns, digits):
+    """Mỗi mẫu một vòng str.find: O(số mẫu x độ dài chuỗi)"""
+    found = 0
+    for pattern in patterns:
+        start = digits.find(pattern)
+        while start >= 0:
+            found += 1
+            start = digits.find(pattern, start + 1)
+    return found
+
+
+def substring_sets(patterns, digits):
+    """Tra tập mẫu theo từng độ dài tại mỗi vị trí: O(số độ dài khác nhau x độ dài chuỗi)"""
+    by_length = {}
+    for pattern in patterns:
+        by_length.setdefault(len(pattern), {}).setdefault(pattern, 0)
+        by_length[len(pattern)][pattern] += 1
+    found = 0
+    for length, counts in by_length.items():
+        for start in range(len(digits) - length + 1):
+            found += counts.get(digits[start:start + length], 0)
+    return found
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    pattern_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    rng = random.Random(42)
+    patterns = ["".join(rng.choice("0123456789") for _ in range(rng.randint(3, 8))) for _ in range(pattern_count)]
+    digits = "".join(rng.choice("0123456789") for _ in range(length))
+
+    matcher, build = _timed(PatternMatcher, patterns)
+    matches, scan = _timed(matcher.find_all, digits)
+    expected, sets = _timed(substring_sets, patterns, digits)
+    assert len(matches) == expected
+    print(f"{pattern_count} mẫu (3-8 chữ số), chuỗi {length} chữ số, {len(matches)} lần xuất hiện:")
+    print(f"  biên dịch Aho–Corasick: {build * 1000:8.1f} ms ({matcher.state_count} trạng thái)")
+    print(f"  Aho–Corasick một lần quét:         {length / scan / 1e6:8.3f} triệu chữ số/s")
+    print(f"  tra tập chuỗi con theo độ dài (cũ): {length / sets / 1e6:8.3f} triệu chữ số/s  (x{sets / scan:.1f})")
+
+    # Vòng str.find theo từng mẫu tỉ lệ với số mẫu, đo trên một phần chuỗi
+    sample = digits[:length // 20]
+    found, loop = _timed(find_loop, patterns, sample)
+    assert found == len(matcher.find_all(sample))
+    print(f"  str.find từng mẫu (cũ):            {len(sample) / loop / 1e6:8.3f} triệu chữ số/s")
+
+    numbers = ["".join(rng.choice("0123456789") for _ in range(10)) for _ in range(100_000)]
+    start = time.perf_counter()
+    for number in numbers:
+        special_pattern_matcher.find_all(number)
+    elapsed = time.perf_counter() - start
+    matrix = (np.frombuffer("".join(numbers).encode("ascii"), dtype=np.uint8) - ord("0")).reshape(len(numbers), 10)
+    rows, batch = _timed(special_pattern_matcher.find_all_batch, matrix)
+    assert rows[0].size == sum(len(special_pattern_matcher.find_all(number)) for number in numbers)
+    print(f"Mẫu đặc biệt từ hằng số ({len(special_pattern_matcher)} mẫu) trên {len(numbers)} số 10 chữ số:")
+    print(f"  từng số:       {len(numbers) / elapsed / 1e6:8.3f} triệu số/s")
+    print(f"  theo lô NumPy: {len(numbers) / batch / 1e6:8.3f} triệu số/s  (x{elapsed / batch:.0f})")
+
+
+if __name__ == "__main__":
+    main()
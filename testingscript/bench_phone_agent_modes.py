@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark độ trễ của PhoneNumberAgent.analyze_phone: chế độ trong tiến trình (gọi trực tiếp
+PhoneAnalyzer) so với chế độ MCP (4 lượt gọi tuần tự qua MCP server stdio)
+
+Chạy: python testingscript/bench_phone_agent_modes.py [số lượt gọi]
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.batcuclinh_so_agent.sub_agents.phone_number_agent import (
+    MODE_IN_PROCESS,
+    MODE_MCP,
+    PhoneNumberAgent,
+)
+from shared_libraries.models import PhoneAnalysisRequest
+
+
+async def _measure(mode: str, numbers):
+    """Trả về danh sách độ trễ (ms) của từng lượt gọi, None nếu không khởi tạo được chế độ"""
+    agent = PhoneNumberAgent(mode=mode)
+    try:
+        await agent.initialize()
+    except Exception as e:
+        print(f"{mode:>10}: không khả dụng ({e})")
+        return None
+    latencies = []
+    try:
+        for number in numbers:
+            start = time.perf_counter()
+            await agent.analyze_phone(PhoneAnalysisRequest(phone_number=number))
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        await agent.cleanup()
+    return latencies
+
+
+def _report(mode: str, latencies) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{mode:>10}: trung vị {statistics.median(ordered):8.3f} ms, p95 {p95:8.3f} ms")
+
+
+async def main(count: int) -> None:
+    rng = random.Random(42)
+    numbers = ["09" + "".join(rng.choice("0123456789") for _ in range(8)) for _ in range(count)]
+    print(f"{count} lượt analyze_phone")
+    results = {}
+    for mode in (MODE_IN_PROCESS, MODE_MCP):
+        latencies = await _measure(mode, numbers)
+        if latencies:
+            results[mode] = latencies
+            _report(mode, latencies)
+    if len(results) == 2:
+        speedup = statistics.median(results[MODE_MCP]) / statistics.median(results[MODE_IN_PROCESS])
+        print(f"Tăng tốc (trung vị): x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark bộ nhớ của chuỗi sao: dict 18 khóa cho mỗi cặp số (cũ) so với StarEntry gọn (mới)
+
+Đo bằng tracemalloc: tổng dung lượng cấp phát cho mỗi lần phân tích và dung lượng còn giữ
+khi lưu kết quả của N số điện thoại.
+
+Chạy: python testingscript/bench_star_entries.py [số lượng số điện thoại]
+"""
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+from tools.batcuclinhso_analysis.rule_tables import lookup_pair
+
+
+def legacy_star_sequence(normalized: str):
+    """Cách dựng chuỗi sao cũ: một dict 18 khóa mới cho mỗi cặp số"""
+    pairs = PhoneAnalyzer._generate_pairs(normalized)
+    zero_count = normalized.count("0")
+    five_count = normalized.count("5")
+    special_attr = ""
+    special_effect = ""
+    if zero_count:
+        special_attr = "zero"
+        special_effect = "Số 0 làm giảm năng lượng của các sao"
+    if five_count:
+        special_attr = f"{special_attr}_five" if special_attr else "five"
+        msg = "Số 5 tăng cường năng lượng của các sao"
+        special_effect = f"{special_effect}, {msg}" if special_effect else msg
+    sequence = []
+    for pair in pairs:
+        zeroes = pair.count("0")
+        fives = pair.count("5")
+        clean = "".join(d for d in pair if d not in ("0", "5"))
+        rule = lookup_pair(clean)
+        star_obj = rule.info if rule else None
+        base_energy = rule.energy if rule else 1
+        energy_level = max(1, base_energy + fives - zeroes)
+        response_factor = rule.response_factor if rule else 1
+        sequence.append({
+            "originalPair": pair,
+            "mappedPair": clean,
+            "star": rule.star_key if rule else "UNKNOWN",
+            "name": star_obj.get("name", "") if star_obj else "",
+            "nature": star_obj.get("nature", "") if star_obj else "",
+            "level": PhoneAnalyzer._get_star_level(energy_level),
+            "energyLevel": energy_level,
+            "baseEnergyLevel": base_energy,
+            "specialAttribute": special_attr,
+            "specialEffect": special_effect,
+            "detailedDescription": star_obj.get("detailedDescription", "") if star_obj else "",
+            "description": star_obj.get("description", "") if star_obj else "",
+            "isZeroVariant": zeroes > 0,
+            "zeroCount": zeroes,
+            "fiveCount": fives,
+            "weightedEnergy": energy_level,
+            "responseFactor": response_factor,
+            "adjustedEnergy": energy_level * response_factor
+        })
+    return sequence
+
+
+def _measure(func, numbers):
+    """Trả về (byte cấp phát đỉnh / lần phân tích, byte còn giữ / số khi giữ toàn bộ kết quả)"""
+    tracemalloc.start()
+    allocated = 0
+    for number in numbers:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func(number)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    start = tracemalloc.get_traced_memory()[0]
+    results = [func(number) for number in numbers]
+    retained = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del results
+    return allocated / len(numbers), retained / len(numbers)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = random.Random(42)
+    numbers = ["0" + "".join(rng.choice("0123456789") for _ in range(9)) for _ in range(count)]
+
+    assert all(legacy_star_sequence(n) == PhoneAnalyzer._map_to_star_sequence(n) for n in numbers[:1000])
+
+    legacy_peak, legacy_retained = _measure(legacy_star_sequence, numbers)
+    compact_peak, compact_retained = _measure(PhoneAnalyzer._star_entries, numbers)
+    print(f"Chuỗi sao / số ({count} số, tracemalloc):")
+    print(f"  dict 18 khóa (cũ): cấp phát {legacy_peak:8.0f} B, giữ lại {legacy_retained:8.0f} B")
+    print(f"  StarEntry (mới):   cấp phát {compact_peak:8.0f} B, giữ lại {compact_retained:8.0f} B"
+          f"  (x{legacy_retained / compact_retained:.1f} nhỏ hơn)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark chi phí phân tích một số điện thoại: tra cứu sao bằng cách duyệt BAT_TINH (cũ)
+so với bảng tra cứu đã biên dịch trong rule_tables (mới)
+
+Chạy: python testingscript/bench_star_lookup.py [số lượng số điện thoại]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants.bat_tinh import BAT_TINH
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+from tools.batcuclinhso_analysis.rule_tables import lookup_pair
+
+
+def legacy_star_sequence(phone_number: str):
+    """Vòng tra cứu cũ: duyệt toàn bộ BAT_TINH cho mỗi cặp số"""
+    analysis = []
+    for i in range(0, 10, 2):
+        number = phone_number[i:i+2]
+        for tinh, info in BAT_TINH.items():
+            if number in info["numbers"]:
+                analysis.append((number, tinh, info["energy"].get(number)))
+                break
+    return analysis
+
+
+def table_star_sequence(phone_number: str):
+    """Vòng tra cứu mới: một phép truy cập bảng cho mỗi cặp số"""
+    analysis = []
+    for i in range(0, 10, 2):
+        number = phone_number[i:i+2]
+        rule = lookup_pair(number)
+        if rule is not None:
+            analysis.append((number, rule.star_key, rule.energy))
+    return analysis
+
+
+def _time_per_call(func, numbers) -> float:
+    start = time.perf_counter()
+    for number in numbers:
+        func(number)
+    return (time.perf_counter() - start) / len(numbers) * 1e6
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+    numbers = ["0" + "".join(rng.choice("0123456789") for _ in range(9)) for _ in range(count)]
+
+    assert all(legacy_star_sequence(n) == table_star_sequence(n) for n in numbers[:1000])
+
+    legacy = _time_per_call(legacy_star_sequence, numbers)
+    table = _time_per_call(table_star_sequence, numbers)
+    print(f"Tra cứu sao / số ({count} số):")
+    print(f"  duyệt BAT_TINH (cũ): {legacy:8.2f} µs")
+    print(f"  bảng biên dịch (mới): {table:8.2f} µs  (x{legacy / table:.1f})")
+
+    full = _time_per_call(PhoneAnalyzer.analyze_phone_number, numbers)
+    sequence = _time_per_call(PhoneAnalyzer._map_to_star_sequence, numbers)
+    print("Phân tích đầy đủ / số (dùng bảng biên dịch):")
+    print(f"  analyze_phone_number:  {full:8.2f} µs")
+    print(f"  _map_to_star_sequence: {sequence:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.bank_account_suggester import bank_account_suggester
+
+
+def test_suggestions_respect_bank_length_and_prefix():
+    result = bank_account_suggester("OCB", prefix="1903", purpose="savings")
+    assert result["complete"]
+    assert len(result["suggestions"]) == 5
+    scores = [s["combinedScore"] for s in result["suggestions"]]
+    assert scores == sorted(scores, reverse=True)
+    for suggestion in result["suggestions"]:
+        assert len(suggestion["accountNumber"]) == 15
+        assert suggestion["accountNumber"].startswith("1903")
+
+
+def test_suggestions_are_reproducible():
+    first = bank_account_suggester("VCB", purpose="business", k=3)
+    assert first == bank_account_suggester("VCB", purpose="business", k=3)
+
+    seeded = bank_account_suggester("VCB", purpose="business", k=3, seed=42)
+    assert seeded == bank_account_suggester("VCB", purpose="business", k=3, seed=42)
+    # seed chỉ đổi thứ tự các số cùng điểm, không làm giảm điểm
+    assert [s["combinedScore"] for s in seeded["suggestions"]] == [s["combinedScore"] for s in first["suggestions"]]
@@ -0,0 +1,59 @@
+"""
+Kiểm tra phân tích hàng loạt bằng NumPy khớp chính xác với PhoneAnalyzer.analyze_phone_number
+"""
+
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.batch_analyzer import (
+    LUCK_INVALID,
+    analyze_phone_numbers_batch,
+    luck_level_names,
+)
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+from tools.batcuclinhso_analysis.rule_tables import COMBINATION_KEYS, NO_STAR, STAR_KEYS
+
+
+def _random_numbers(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return ["0" + "".join(rng.choice("0123456789") for _ in range(9)) for _ in range(count)]
+
+
+def test_batch_matches_scalar():
+    numbers = _random_numbers(3000) + ["1914131914", "+84 91 413 1914", "0905050505"]
+    batch = analyze_phone_numbers_batch(numbers)
+    names = luck_level_names(batch["luck_level"])
+
+    for row, number in enumerate(numbers):
+        scalar = PhoneAnalyzer.analyze_phone_number(number)
+        assert batch["valid"][row]
+        assert batch["total_score"][row] == scalar["total_score"]
+        assert names[row] == scalar["luck_level"]
+
+        stars = [STAR_KEYS[s] for s in batch["star_ids"][row] if s != NO_STAR]
+        assert stars == [item["tinh"] for item in scalar["analysis"]]
+
+        combinations = [COMBINATION_KEYS[c] for c in batch["combination_ids"][row] if c >= 0]
+        assert combinations == [item["combination"] for item in scalar["combinations"]]
+
+
+def test_digit_matrix_input_matches_strings():
+    numbers = _random_numbers(500, seed=11)
+    matrix = np.array([[int(d) for d in number] for number in numbers], dtype=np.uint8)
+    from_strings = analyze_phone_numbers_batch(numbers)
+    from_matrix = analyze_phone_numbers_batch(matrix)
+    for key in ("star_ids", "total_score", "luck_level", "combination_ids"):
+        assert np.array_equal(from_strings[key], from_matrix[key])
+
+
+def test_invalid_rows_are_flagged():
+    batch = analyze_phone_numbers_batch(["0912", "abc", "0914131914"])
+    assert batch["valid"].tolist() == [False, False, True]
+    assert np.isnan(batch["total_score"][:2]).all()
+    assert (batch["luck_level"][:2] == LUCK_INVALID).all()
+    assert (batch["star_ids"][:2] == NO_STAR).all()
@@ -0,0 +1,68 @@
+"""
+Kiểm tra Bloom filter mật khẩu đã lộ: không có âm tính giả, tỉ lệ dương tính giả gần mức cấu hình
+"""
+
+import os
+import random
+import string
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.breach_filter import (
+    FORMAT_SHA1,
+    BreachFilter,
+    breached_passwords,
+    build_breach_filter,
+    password_digest,
+)
+from tools.batcuclinhso_analysis.password_analyzer import password_analyzer
+
+
+def random_passwords(rng, count):
+    return ["".join(rng.choices(string.ascii_letters + string.digits, k=rng.randint(6, 14))) for _ in range(count)]
+
+
+def test_membership_and_false_positive_rate(tmp_path):
+    rng = random.Random(25)
+    leaked = random_passwords(rng, 20000) + ["mậtkhẩu123"]
+    corpus = tmp_path / "leaked.txt"
+    corpus.write_text("\n".join(leaked) + "\n\n", encoding="utf-8")
+    hashed = tmp_path / "leaked-sha1.txt"
+    hashed.write_text("".join(f"{password_digest(p).hex().upper()}:{i}\n" for i, p in enumerate(leaked)))
+
+    stats = build_breach_filter(str(corpus), str(tmp_path / "plain.bloom"), 0.01, chunk_size=3000)
+    assert stats["item_count"] == len(leaked)
+    from_hashes = BreachFilter()
+    build_breach_filter(str(hashed), str(tmp_path / "sha1.bloom"), 0.01, corpus_format=FORMAT_SHA1)
+    assert from_hashes.load(str(tmp_path / "sha1.bloom")) and from_hashes.item_count == len(leaked)
+    assert all(password in from_hashes for password in leaked)
+    from_hashes.close()
+
+    bloom = BreachFilter()
+    assert bloom.check("abc") is None and not bloom.load(str(tmp_path / "missing.bloom"))
+    assert bloom.load(str(tmp_path / "plain.bloom"))
+    assert all(password in bloom for password in leaked)
+
+    leaked_set = set(leaked)
+    others = [p for p in random_passwords(random.Random(26), 20000) if p not in leaked_set]
+    batch = bloom.check_many(password_digest(p) for p in others)
+    assert batch.tolist() == [p in bloom for p in others]
+    assert batch.mean() < 0.02
+    assert bloom.check_many(password_digest(p) for p in leaked).all()
+    bloom.close()
+    assert not bloom.loaded
+
+
+def test_password_analyzer_reports_breach(tmp_path):
+    corpus = tmp_path / "leaked.txt"
+    corpus.write_text("Sunshine2024!\n", encoding="utf-8")
+    build_breach_filter(str(corpus), str(tmp_path / "leaked.bloom"), 0.001)
+    assert password_analyzer("Sunshine2024!")["analysis"]["isBreached"] is None
+    try:
+        breached_passwords.load(str(tmp_path / "leaked.bloom"))
+        analysis = password_analyzer("Sunshine2024!")["analysis"]
+        assert analysis["isBreached"] is True and analysis["isSecure"] is False
+        assert password_analyzer("Tr4ng-Kh0ng-L0")["analysis"]["isBreached"] is False
+    finally:
+        breached_passwords.close()
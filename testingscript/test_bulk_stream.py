@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from tools.batcuclinhso_analysis.bulk_stream import INPUT_CSV, iter_chunks, iter_numbers
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+
+async def _byte_chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_csv_parsing_across_chunk_boundaries():
+    body = "name,phone_number\nAn,0912 345 678\n\nBình,\"+84 968 686 868\"\r\nChi,0123\n".encode("utf-8")
+    numbers = asyncio.run(_collect(iter_numbers(_byte_chunks(body, 3), INPUT_CSV)))
+    assert numbers == ["0912 345 678", "+84 968 686 868", "0123"]
+    chunks = asyncio.run(_collect(iter_chunks(_byte_chunks(b"", 1), 2)))
+    assert chunks == []
+
+
+def test_bulk_endpoint_charges_per_chunk_and_resumes():
+    user = {"id": "bulk-user", "remainingQuestions": 2, "isPremium": False}
+    main.app.dependency_overrides[main.get_current_user] = lambda: user
+    numbers = ["09%08d" % (i * 7919) for i in range(25)] + ["12"]
+    body = "\n".join(json.dumps({"phone_number": n}) for n in numbers).encode()
+    try:
+        with TestClient(main.app) as client:
+            response = client.post(
+                "/api/batcuclinh_so/analyze_bulk?chunk_size=10",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            rows, trailer = lines[:-1], lines[-1]
+            assert [row["offset"] for row in rows] == list(range(20))
+            assert trailer == {"status": "quota_exceeded", "next_offset": 20, "processed": 20}
+            assert user["remainingQuestions"] == 0
+            for row in rows[:5]:
+                assert row["total_score"] == PhoneAnalyzer.analyze_phone_number(row["input"])["total_score"]
+
+            user.update(isPremium=True)
+            response = client.post(
+                f"/api/batcuclinh_so/analyze_bulk?chunk_size=10&offset={trailer['next_offset']}&output=csv",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            lines = response.text.splitlines()
+            assert lines[0].startswith("offset,input,phone_number")
+            assert [line.split(",")[0] for line in lines[1:-1]] == [str(i) for i in range(20, 26)]
+            assert lines[-2].split(",")[3] == "False"
+            assert lines[-1] == "# status=complete next_offset=26 processed=6"
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_quota_is_saved_when_client_disconnects(monkeypatch):
+    user = {"id": "bulk-disconnect", "remainingQuestions": 5, "isPremium": False}
+    main.app.dependency_overrides[main.get_current_user] = lambda: user
+    saved = []
+
+    async def record_quota(user_id, remaining_questions=None):
+        saved.append((user_id, remaining_questions))
+
+    monkeypatch.setattr(main, "update_user_quota", record_quota)
+    body = "\n".join("09%08d" % (i * 7919) for i in range(40)).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/api/batcuclinh_so/analyze_bulk", "raw_path": b"",
+        "root_path": "", "query_string": b"chunk_size=10", "headers": [(b"content-type", b"text/plain")],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            # Client đóng kết nối sau khi nhận chunk kết quả đầu tiên
+            if message["type"] == "http.response.body" and any(m["type"] == "http.response.body" for m in sent):
+                raise OSError("Broken pipe")
+            sent.append(message)
+
+        try:
+            await main.app(scope, receive, send)
+        except Exception:
+            pass
+        return sent
+
+    try:
+        sent = asyncio.run(scenario())
+    finally:
+        main.app.dependency_overrides.clear()
+    assert sent[0]["status"] == 200
+    # Chunk thứ hai đã được phân tích (và trừ quota) trước khi gửi thất bại
+    assert user["remainingQuestions"] == 3
+    assert saved == [("bulk-disconnect", 3)]
@@ -0,0 +1,25 @@
+"""
+Kiểm tra CCCDAgent dùng kết quả cccd_analyzer (từ cache) để đưa ra ý nghĩa tổng thể
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.batcuclinh_so_agent.sub_agents.cccd_agent import CCCDAgent
+from shared_libraries.models import CCCDAnalysisRequest
+from tools.batcuclinhso_analysis.cccd_analyzer import cccd_analyzer
+
+
+def test_overall_meaning_from_cached_analysis():
+    agent = CCCDAgent()
+    for last_digits in ["131468", "131468", "000000", "683986"]:
+        result = asyncio.run(agent.analyze_cccd(CCCDAnalysisRequest(cccd_last_digits=last_digits)))
+        assert isinstance(result["pairs_analysis"], list)
+        assert result["overall_meaning"].startswith("6 số cuối CCCD có phong thủy")
+        assert result["total_score"] == cccd_analyzer(last_digits)["total_score"]
+        # Bản sao trả về không được làm thay đổi kết quả trong cache
+        result["pairs_analysis"][0]["energy"] = -1
+        assert cccd_analyzer(last_digits)["analysis"][0]["energy"] != -1
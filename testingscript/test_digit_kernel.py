@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.bank_account_analyzer import bank_account_analyzer
+from tools.batcuclinhso_analysis.digit_kernel import digit_profile
+from tools.batcuclinhso_analysis.rule_tables import NO_STAR, lookup_pair
+
+
+def test_profile_fields():
+    profile = digit_profile("0968686898")
+    assert profile.pair_codes == (9, 96, 68, 86, 68, 86, 68, 89, 98)
+    assert [profile.pair(i) for i in range(len(profile.pair_codes))][:3] == ["09", "96", "68"]
+    expected = [lookup_pair(profile.pair(i)) for i in range(0, 10, 2)]
+    assert profile.star_ids == tuple(rule.star_id if rule else NO_STAR for rule in expected)
+    assert profile.energies == tuple(rule.energy if rule else 0 for rule in expected)
+    assert profile.histogram == (1, 0, 0, 0, 0, 0, 3, 0, 4, 2)
+    assert profile.digit_sum == 68 and profile.digit_root == 5
+    assert [pair for pair, _, _ in profile.aligned_pairs()] == [
+        pair for pair, rule in zip(("09", "68", "68", "68", "98"), expected) if rule
+    ]
+
+    assert digit_profile("").digit_root == 0 and digit_profile("7").pair_codes == ()
+    with pytest.raises(ValueError):
+        digit_profile("09a1")
+
+
+def test_bank_view_uses_profile():
+    analysis = bank_account_analyzer("1900-6868-9")["analysis"]
+    profile = digit_profile("190068689")
+    assert analysis["energyNumber"] == profile.digit_root
+    assert analysis["digitFrequency"] == {str(d): n for d, n in enumerate(profile.histogram)}
+    assert list(analysis["specialPairs"]) == ["68", "68", "89"]
+    assert analysis["luckyCount"] == 6
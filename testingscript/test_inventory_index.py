@@ -0,0 +1,85 @@
+"""
+Kiểm tra chỉ mục ngược kho số đại lý khớp với lọc trực tiếp trên kết quả phân tích hàng loạt
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+from tools.batcuclinhso_analysis.inventory_index import InventoryIndex, InventoryStore
+from tools.batcuclinhso_analysis.rule_tables import COMBINATION_KEYS, STAR_IDS
+
+
+def test_queries_match_brute_force():
+    rng = np.random.default_rng(17)
+    numbers = sorted({f"09{n:08d}" for n in rng.integers(0, 10 ** 8, size=20000)})
+    index = InventoryIndex.build(numbers + ["0123", numbers[0]], chunk_size=3000)
+    assert len(index) == len(numbers)
+
+    batch = analyze_phone_numbers_batch(numbers)
+    stars, scores = batch["star_ids"], batch["total_score"]
+    sinh_khi, thien_y, tuyet_menh = STAR_IDS["SINH_KHI"], STAR_IDS["THIEN_Y"], STAR_IDS["TUYET_MENH"]
+    combination = COMBINATION_KEYS.index("SINH_KHI_THIEN_Y")
+
+    cases = [
+        (
+            {"ending": ["SINH_KHI", "THIEN_Y"], "exclude_stars": ["TUYET_MENH"], "min_score": 8},
+            (stars[:, 3] == sinh_khi) & (stars[:, 4] == thien_y) & ~(stars == tuyet_menh).any(axis=1) & (scores >= 8),
+        ),
+        (
+            {"combinations": ["SINH_KHI_THIEN_Y"], "include_stars": ["TUYET_MENH"]},
+            (batch["combination_ids"] == combination).any(axis=1) & (stars == tuyet_menh).any(axis=1),
+        ),
+        ({"min_score": 9, "max_score": 9.5}, (scores >= 9) & (scores <= 9.5)),
+        ({"positions": {0: "THIEN_Y"}, "starting": ["SINH_KHI"]}, np.zeros(len(numbers), dtype=bool)),
+    ]
+    for conditions, expected in cases:
+        rows = index.matching_rows(**conditions)
+        assert [f"{n:010d}" for n in index.numbers[rows]] == [n for n, ok in zip(numbers, expected) if ok]
+
+
+def test_search_pagination_order():
+    rng = np.random.default_rng(18)
+    index = InventoryIndex.build(f"09{n:08d}" for n in rng.integers(0, 10 ** 8, size=5000))
+    full = index.search(limit=10000, include_stars=["THIEN_Y"])
+    ranked = [(-item["total_score"], item["phone_number"]) for item in full["numbers"]]
+    assert ranked == sorted(ranked) and full["total"] == len(ranked)
+
+    page = index.search(limit=7, offset=5, include_stars=["THIEN_Y"])
+    assert page["numbers"] == full["numbers"][5:12]
+    try:
+        index.search(ending=["KHONG_CO"])
+        assert False, "Sao không hợp lệ phải báo lỗi"
+    except ValueError:
+        pass
+
+
+def test_store_is_shared_between_workers(tmp_path):
+    numbers = [f"09{n:08d}" for n in range(0, 10 ** 8, 99991)]
+    # Hai store trên cùng thư mục mô phỏng hai worker (hoặc trước/sau khi khởi động lại)
+    first, second = InventoryStore(str(tmp_path)), InventoryStore(str(tmp_path))
+    assert second.get("đại lý/1") is None
+
+    first.put("đại lý/1", InventoryIndex.build(numbers))
+    index = second.get("đại lý/1")
+    assert index is second.get("đại lý/1")
+    assert index.search(ending=["SINH_KHI"]) == first.get("đại lý/1").search(ending=["SINH_KHI"])
+
+    second.put("đại lý/1", InventoryIndex.build(numbers[:10]))
+    assert len(first.get("đại lý/1")) == 10
+    assert InventoryStore(str(tmp_path)).get("đại lý/1").search() == second.get("đại lý/1").search()
+
+    # Kho số ghi với bộ quy tắc cũ được phân tích lại từ cột numbers
+    path = first._path("đại lý/1")
+    with np.load(path) as data:
+        columns = {key: data[key] for key in data.files}
+    with open(path, "wb") as f:
+        np.savez(f, **{**columns, "rules_version": np.array("old"), "score_codes": np.zeros(10, dtype=np.uint8)})
+    assert (InventoryStore(str(tmp_path)).get("đại lý/1").score_codes == columns["score_codes"]).all()
+
+    assert first.remove("đại lý/1") and second.get("đại lý/1") is None
+    assert not second.remove("đại lý/1")
@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_libraries.mcp_pool import PING, MCPWorkerPool, PoolClosedError
+
+
+def fake_session_factory(delay=0.01, fail_first_call_of=None):
+    """Phiên MCP giả: công cụ `echo` trả về id phiên, có thể làm crash một phiên ở lượt gọi đầu"""
+    session_ids = itertools.count()
+
+    @asynccontextmanager
+    async def open_session():
+        session_id = next(session_ids)
+        calls = {"count": 0}
+
+        async def echo(value=None):
+            calls["count"] += 1
+            if session_id == fail_first_call_of and calls["count"] == 1:
+                raise ConnectionError("tiến trình con đã thoát")
+            await asyncio.sleep(delay)
+            return {"session": session_id, "value": value}
+
+        yield {"echo": echo}
+
+    return open_session
+
+
+def process_session_factory(processes, hang_ping=False):
+    """Phiên giả gắn với một tiến trình con thật: ping lỗi khi tiến trình đã chết (hoặc treo nếu hang_ping)"""
+
+    @asynccontextmanager
+    async def open_session():
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", "import sys; sys.stdin.read()", stdin=asyncio.subprocess.PIPE
+        )
+        processes.append(process)
+
+        async def ping():
+            if hang_ping:
+                await asyncio.sleep(3600)
+            if process.returncode is not None:
+                raise ConnectionError(f"tiến trình con đã thoát ({process.returncode})")
+
+        async def echo(value=None):
+            return {"pid": process.pid, "value": value}
+
+        try:
+            yield {"echo": echo, PING: ping}
+        finally:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+
+    return open_session
+
+
+def test_least_outstanding_dispatch():
+    async def scenario():
+        pool = MCPWorkerPool("test_dispatch", fake_session_factory(delay=0.05), size=3, max_in_flight=2)
+        await pool.start()
+        results = await asyncio.gather(*(pool.call("echo", value=i) for i in range(6)))
+        stats = pool.stats()
+        await pool.drain()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    sessions = [result["session"] for result in results]
+    assert sorted(sessions.count(s) for s in set(sessions)) == [2, 2, 2]
+    assert [result["value"] for result in results] == list(range(6))
+    assert stats["alive"] == 3 and stats["outstanding"] == 0
+
+
+def test_crashed_worker_is_restarted():
+    async def scenario():
+        pool = MCPWorkerPool("test_restart", fake_session_factory(fail_first_call_of=0), size=2)
+        await pool.start()
+        with pytest.raises(ConnectionError):
+            await pool.call("echo")
+        assert pool.alive_count() == 1
+        await pool.check_health()
+        stats = pool.stats()
+        await pool.drain()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["alive"] == 2
+    assert stats["restarts"] == 1
+
+
+def test_drain_waits_for_outstanding_calls():
+    async def scenario():
+        pool = MCPWorkerPool("test_drain", fake_session_factory(delay=0.1), size=1)
+        await pool.start()
+        pending = asyncio.create_task(pool.call("echo", value="x"))
+        await asyncio.sleep(0.01)
+        await pool.drain(timeout=5)
+        with pytest.raises(PoolClosedError):
+            await pool.call("echo")
+        return await pending
+
+    assert asyncio.run(scenario())["value"] == "x"
+
+
+def test_killed_idle_worker_is_detected_and_restarted():
+    async def scenario():
+        processes = []
+        pool = MCPWorkerPool("test_probe", process_session_factory(processes), size=2)
+        await pool.start()
+        assert not pool.has_tool(PING)
+        await pool.check_health()
+        assert pool.stats()["restarts"] == 0
+
+        # Tiến trình con của worker rảnh bị kill: worker vẫn "alive" cho tới khi bị ping
+        killed = processes[0]
+        killed.kill()
+        await killed.wait()
+        assert pool.alive_count() == 2
+        await pool.check_health()
+        stats = pool.stats()
+        pids = {(await pool.call("echo"))["pid"] for _ in range(4)}
+        await pool.drain()
+        return stats, pids, killed.pid, len(processes)
+
+    stats, pids, killed_pid, spawned = asyncio.run(scenario())
+    assert stats["alive"] == 2 and stats["restarts"] == 1 and spawned == 3
+    assert killed_pid not in pids
+
+
+def test_unresponsive_worker_is_restarted_after_probe_timeout():
+    async def scenario():
+        pool = MCPWorkerPool("test_probe_timeout", process_session_factory([], hang_ping=True), size=1, probe_timeout=0.05)
+        await pool.start()
+        await pool.check_health()
+        stats = pool.stats()
+        await pool.drain()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["restarts"] == 1
+
+
+def test_idle_workers_are_probed_concurrently():
+    @asynccontextmanager
+    async def hanging_session():
+        async def ping():
+            await asyncio.sleep(3600)
+
+        yield {PING: ping}
+
+    async def scenario():
+        pool = MCPWorkerPool("test_probe_concurrent", hanging_session, size=5, probe_timeout=0.2)
+        await pool.start()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await pool.check_health()
+        elapsed = loop.time() - started
+        stats = pool.stats()
+        await pool.drain()
+        return stats, elapsed
+
+    stats, elapsed = asyncio.run(scenario())
+    assert stats["restarts"] == 5
+    # Ping lần lượt sẽ mất 5 * 0.2 giây
+    assert elapsed < 0.6
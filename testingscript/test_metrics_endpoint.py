@@ -0,0 +1,29 @@
+"""
+Kiểm tra endpoint /metrics chỉ mở cho quản trị viên
+"""
+
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def test_metrics_require_admin():
+    try:
+        with TestClient(main.app) as client:
+            assert client.get("/metrics").status_code == 401
+
+            main.app.dependency_overrides[main.get_current_user] = lambda: {"id": "user", "role": "user"}
+            assert client.get("/metrics").status_code == 403
+
+            main.app.dependency_overrides[main.get_current_user] = lambda: {"id": "admin", "role": "admin"}
+            response = client.get("/metrics")
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/plain")
+            assert "analysis_pool_in_flight_chunks" in response.text
+    finally:
+        main.app.dependency_overrides.clear()
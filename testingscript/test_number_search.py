@@ -0,0 +1,103 @@
+import itertools
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.number_search import (
+    positions_for_prefix,
+    purpose_match_score,
+    search_numbers,
+)
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+from tools.batcuclinhso_analysis.rule_tables import PURPOSE_PROFILES, lookup_pair
+
+
+def _brute_force_keys(prefix, purpose_key, preferred):
+    """Khóa xếp hạng (điểm tổng hợp, số cặp khớp, số chữ số ưa thích) của mọi số trong không gian"""
+    profile = PURPOSE_PROFILES[purpose_key]
+    keys = []
+    for tail in itertools.product("0123456789", repeat=10 - len(prefix)):
+        number = prefix + "".join(tail)
+        analysis = PhoneAnalyzer.analyze_phone_number(number)
+        stars = [rule.star_key for rule in map(lookup_pair, (number[i:i + 2] for i in range(0, 10, 2))) if rule]
+        favor = sum(1 for s in stars if s in profile["favorable_stars"])
+        favor -= sum(1 for s in stars if s in profile["unfavorable_stars"])
+        combined = (analysis["total_score"] + purpose_match_score(favor, len(stars))) / 2
+        keys.append((combined, len(stars), sum(1 for d in number if d in preferred)))
+    return sorted(keys, reverse=True)
+
+
+def test_search_matches_brute_force():
+    prefix = "0913141"
+    expected = _brute_force_keys(prefix, "business", "9")
+    result = search_numbers(positions_for_prefix(prefix, 10), purpose="kinh doanh", preferred_digits="9", k=20)
+
+    assert result.complete
+    assert [(h.combined_score, h.matched_count, h.preferred_count) for h in result.hits] == expected[:20]
+    for hit in result.hits:
+        assert hit.number.startswith(prefix)
+        assert hit.total_score == PhoneAnalyzer.analyze_phone_number(hit.number)["total_score"]
+
+
+def test_pagination_continues_ranking():
+    positions = positions_for_prefix("0983", 10)
+    full = search_numbers(positions, purpose="wealth", k=15).hits
+    page = search_numbers(positions, purpose="wealth", k=5, offset=10).hits
+    assert [h.number for h in page] == [h.number for h in full[10:15]]
+
+
+def test_budget_returns_partial_result():
+    result = search_numbers(positions_for_prefix("09", 10), purpose="personal", k=50, node_budget=500)
+    assert not result.complete
+    assert result.nodes <= 500
+
+
+def test_suggest_phone_numbers_uses_prefix():
+    result = PhoneAnalyzer.suggest_phone_numbers("tài lộc", ["8"], prefix="098", k=3)
+    assert result["prefix"] == "098" and len(result["numbers"]) == 3
+    for suggestion in result["numbers"]:
+        assert suggestion["phone_number"].startswith("098")
+        assert suggestion["feng_shui_score"] == PhoneAnalyzer.analyze_phone_number(suggestion["phone_number"])["total_score"]
+
+
+def test_suggest_phone_numbers_reports_truncation():
+    # Đầu số ngắn không duyệt hết trong ngân sách nhỏ, kết quả phải báo là chưa đầy đủ
+    result = PhoneAnalyzer.suggest_phone_numbers("kinh doanh", ["8"], prefix="0", k=5, time_budget_ms=1)
+    assert not result["complete"]
+    assert len(result["numbers"]) <= 5
+
+
+def test_search_pattern_matches_brute_force():
+    pattern = "09xx68xx88"
+    result = PhoneAnalyzer.search_pattern(pattern, k=10, time_budget_ms=None)
+    assert result["complete"] and result["nodes"] < 10 ** 4
+
+    scores = []
+    for a, b, c, d in itertools.product("0123456789", repeat=4):
+        scores.append(PhoneAnalyzer.analyze_phone_number(f"09{a}{b}68{c}{d}88")["total_score"])
+    scores.sort(reverse=True)
+    assert [item["total_score"] for item in result["numbers"]] == scores[:10]
+    for item in result["numbers"]:
+        number = item["phone_number"]
+        assert number[:2] == "09" and number[4:6] == "68" and number[8:] == "88"
+
+
+def test_improve_phone_number_within_edit_radius():
+    phone_number = "0912345678"
+    result = PhoneAnalyzer.improve_phone_number(phone_number, max_edits=2, k=10, time_budget_ms=None)
+    assert result["complete"] and result["improvements"]
+
+    scores = []
+    for first, second in itertools.combinations(range(3, 10), 2):
+        for a, b in itertools.product("0123456789", repeat=2):
+            digits = list(phone_number)
+            digits[first], digits[second] = a, b
+            scores.append(PhoneAnalyzer.analyze_phone_number("".join(digits))["total_score"])
+    scores.sort(reverse=True)
+    assert [item["total_score"] for item in result["improvements"]] == scores[:len(result["improvements"])]
+
+    for item in result["improvements"]:
+        changed = [i for i, (a, b) in enumerate(zip(phone_number, item["phone_number"])) if a != b]
+        assert item["changed_positions"] == changed and len(changed) <= 2 and min(changed) >= 3
+        assert item["total_score"] > result["total_score"]
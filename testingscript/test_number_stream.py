@@ -0,0 +1,53 @@
+"""
+Kiểm tra phân tích dạng luồng cho chuỗi số dài khớp với analyze_number_string, với mọi cách chia khối
+"""
+
+import io
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.number_analyzer import (
+    NumberStream,
+    analyze_number_stream,
+    analyze_number_string,
+    iter_number_string,
+)
+
+
+def random_chunks(text, rng):
+    """Chia chuỗi tại các vị trí ngẫu nhiên (có cả khối rỗng)"""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 12)))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_stream_matches_full_analysis():
+    rng = random.Random(23)
+    texts = ["", "abc", "7", "-8-", "6868"] + [
+        "".join(rng.choice("0123456789 -.") for _ in range(rng.randint(2, 400))) for _ in range(60)
+    ]
+    for text in texts:
+        expected = analyze_number_string(text)
+        stream = NumberStream()
+        pairs = list(iter_number_string(random_chunks(text, rng), stream=stream))
+        assert pairs == expected["pairs_analysis"]
+
+        summary = stream.summary()
+        assert summary["total_score"] == expected["total_score"]
+        assert summary["luck_level"] == expected["luck_level"]
+        assert summary["pair_counts"] == dict(Counter(pair["pair"] for pair in pairs if len(pair["pair"]) == 2))
+        assert summary["special_pattern_counts"] == dict(
+            Counter(match["pattern"] for match in expected["special_patterns"])
+        )
+
+
+def test_file_source_in_small_chunks():
+    text = "So hop dong: 0903-868-688 / 1368 8386\n" * 500
+    expected = analyze_number_string(text)
+    summary = analyze_number_stream(io.StringIO(text), chunk_size=7)
+    assert summary == analyze_number_stream(io.BytesIO(text.encode("utf-8")), chunk_size=5)
+    assert summary["pair_count"] == len(expected["pairs_analysis"])
+    assert summary["total_score"] == expected["total_score"]
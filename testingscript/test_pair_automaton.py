@@ -0,0 +1,79 @@
+import itertools
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.pair_automaton import pair_spans, pair_spans_batch
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+# Số đầu vào ngẫu nhiên của phép thử tương đương, tăng lên hàng triệu khi cần:
+# PAIR_AUTOMATON_CASES=5000000 python -m pytest testingscript/test_pair_automaton.py
+RANDOM_CASES = int(os.environ.get("PAIR_AUTOMATON_CASES", 50_000))
+
+
+def legacy_generate_pairs(digits):
+    """Cài đặt gốc của PhoneAnalyzer._generate_pairs (vòng while lồng nhau), dùng làm chuẩn đối chiếu"""
+    pairs = []
+    i = 0
+    while i < len(digits) - 1:
+        if digits[i] in ("0", "5"):
+            i += 1
+            continue
+        if digits[i+1] not in ("0", "5"):
+            pairs.append(digits[i:i+2])
+            i += 1
+        else:
+            j = i + 1
+            group = digits[i]
+            while j < len(digits) and digits[j] in ("0", "5"):
+                group += digits[j]
+                j += 1
+            if j < len(digits):
+                group += digits[j]
+                j += 1
+            pairs.append(group)
+            i = j - 1
+    return pairs
+
+
+def _spans_to_pairs(digits, spans):
+    return [digits[start:end] for start, end in spans]
+
+
+def test_matches_legacy_on_every_class_pattern():
+    # Quy tắc chỉ phụ thuộc vào lớp của từng chữ số (0/5 hay không), nên duyệt hết các mẫu lớp
+    # với chữ số đại diện khác nhau là phép thử đầy đủ cho mọi độ dài đến 14
+    for length in range(15):
+        for classes in itertools.product((False, True), repeat=length):
+            digits = "".join(("05"[i % 2] if zero_five else "1234"[i % 4]) for i, zero_five in enumerate(classes))
+            assert _spans_to_pairs(digits, pair_spans(digits)) == legacy_generate_pairs(digits), digits
+
+
+def test_matches_legacy_on_random_inputs():
+    rng = random.Random(2024)
+    alphabets = ("0123456789", "0505051", "0123456789-x")
+    for _ in range(RANDOM_CASES):
+        digits = "".join(rng.choices(rng.choice(alphabets), k=rng.randrange(25)))
+        assert _spans_to_pairs(digits, pair_spans(digits)) == legacy_generate_pairs(digits), digits
+        assert PhoneAnalyzer._generate_pairs(digits) == legacy_generate_pairs(digits)
+
+
+def test_batch_matches_single_string_path():
+    rng = np.random.default_rng(7)
+    digits = rng.integers(0, 10, size=(5000, 16), dtype=np.uint8)
+    digits[rng.random(digits.shape) < 0.3] = 0
+    lengths = rng.integers(0, 17, size=5000)
+    rows, starts, ends = pair_spans_batch(digits, lengths)
+
+    expected = []
+    for row, (values, length) in enumerate(zip(digits, lengths)):
+        text = "".join(map(str, values[:length]))
+        expected.extend((row, start, end) for start, end in pair_spans(text))
+    assert list(zip(rows.tolist(), starts.tolist(), ends.tolist())) == expected
+
+    full_rows, _, _ = pair_spans_batch(digits)
+    assert full_rows.size >= rows.size
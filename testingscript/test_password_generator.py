@@ -0,0 +1,42 @@
+"""
+Kiểm tra mật khẩu dựng trực tiếp có đúng năng lượng số (theo password_analyzer) và các yêu cầu bảo mật
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.password_analyzer import password_analyzer
+from tools.batcuclinhso_analysis.password_generator import SPECIAL_CHARACTERS, generate_passwords
+
+
+def test_every_password_hits_target_energy():
+    for target in range(1, 10):
+        for length, special, numbers in [(8, True, True), (13, False, True), (20, True, False), (5, False, False)]:
+            passwords = generate_passwords(300, target, length, special, numbers)
+            assert len(passwords) == 300
+            for password in passwords:
+                digits = [c for c in password if c.isdigit()]
+                assert len(password) == max(8, length)
+                assert sum(int(d) for d in digits) % 9 == target % 9
+                assert any(c.isupper() for c in password) and any(c.islower() for c in password)
+                assert any(c in SPECIAL_CHARACTERS for c in password) == special
+                assert len(digits) == (max(8, length) // 4 if numbers else 1)
+            for password in passwords[:20]:
+                analysis = password_analyzer(password)["analysis"]
+                assert analysis["energyNumber"] == target and analysis["isSecure"]
+
+
+def test_seeded_generation_is_reproducible():
+    first = generate_passwords(50, 8, rng=np.random.default_rng(24))
+    assert first == generate_passwords(50, 8, rng=np.random.default_rng(24))
+    assert len(set(first)) == 50
+    for bad in [dict(count=1, target_energy=0), dict(count=10 ** 6, target_energy=8), dict(count=1, target_energy=8, min_length=500)]:
+        try:
+            generate_passwords(**bad)
+            assert False, "Tham số không hợp lệ phải báo lỗi"
+        except ValueError:
+            pass
@@ -0,0 +1,81 @@
+"""
+Kiểm tra máy Aho–Corasick khớp với tìm kiếm chuỗi con trực tiếp, kể cả khi quét theo từng khối
+"""
+
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.pattern_matcher import (
+    SPECIAL_PATTERNS,
+    PatternMatch,
+    PatternMatcher,
+    find_special_patterns,
+)
+
+
+def naive_find_all(patterns, digits):
+    """Mọi lần xuất hiện tìm bằng str.startswith tại từng vị trí, sắp theo (end, pattern_id)"""
+    matches = [
+        PatternMatch(start, start + len(pattern), pattern_id)
+        for pattern_id, pattern in enumerate(patterns)
+        for start in range(len(digits) - len(pattern) + 1)
+        if digits.startswith(pattern, start)
+    ]
+    return sorted(matches, key=lambda match: (match.end, match.pattern_id))
+
+
+def test_matches_naive_search():
+    rng = random.Random(20)
+    for _ in range(200):
+        # Bảng chữ cái nhỏ để có nhiều mẫu lồng nhau, chồng lấn và trùng lặp
+        alphabet = rng.choice(["01", "012", "0123456789"])
+        patterns = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 30))]
+        digits = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+        matcher = PatternMatcher(patterns)
+        found = sorted(matcher.find_all(digits), key=lambda match: (match.end, match.pattern_id))
+        assert found == naive_find_all(patterns, digits)
+
+        # Quét theo khối, mang trạng thái qua ranh giới khối
+        cut = rng.randint(0, len(digits))
+        first, state = matcher.scan(digits[:cut])
+        second, _ = matcher.scan(digits[cut:], state, offset=cut)
+        assert first + second == matcher.find_all(digits)
+
+
+def test_special_patterns_from_constants():
+    patterns = {(special.pattern, special.kind) for special in SPECIAL_PATTERNS}
+    assert ("608", "special") in patterns and ("413", "special") in patterns
+    assert ("608", "star_zero") in patterns and ("140", "star_zero") in patterns
+
+    found = find_special_patterns("0960841300")
+    assert [(item["pattern"], item["start"]) for item in found] == [
+        ("960", 1), ("608", 2), ("608", 2), ("413", 5), ("130", 6)
+    ]
+    assert found[-1]["key"] == "THIEN_Y_ZERO"
+    try:
+        PatternMatcher(["12a"])
+        assert False, "Mẫu không hợp lệ phải báo lỗi"
+    except ValueError:
+        pass
+
+
+def test_batch_matches_single_scan():
+    rng = random.Random(21)
+    patterns = ["".join(rng.choice("0123") for _ in range(rng.randint(1, 4))) for _ in range(40)]
+    matcher = PatternMatcher(patterns)
+    numbers = ["".join(rng.choice("0123456789") for _ in range(10)) for _ in range(500)]
+    lengths = np.array([rng.randint(0, 10) for _ in numbers])
+    matrix = np.array([[int(d) for d in number] for number in numbers], dtype=np.uint8)
+
+    rows, starts, ends, ids = matcher.find_all_batch(matrix, lengths)
+    expected = [
+        (row, match.start, match.end, match.pattern_id)
+        for row, number in enumerate(numbers)
+        for match in matcher.find_all(number[:lengths[row]])
+    ]
+    assert list(zip(rows.tolist(), starts.tolist(), ends.tolist(), ids.tolist())) == expected
@@ -0,0 +1,115 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+
+def test_analyze_phone_full_matches_single_tools():
+    phone_number = "+84 913-141-913"
+    full = PhoneAnalyzer.analyze_phone_full(phone_number)
+    single = PhoneAnalyzer.analyze_phone_number(phone_number)
+
+    for key, value in single.items():
+        assert full[key] == value
+    assert full["last_three_digit_analysis"] == PhoneAnalyzer.analyze_last_three_digits(phone_number)
+    assert full["last_five_digit_analysis"] == PhoneAnalyzer.analyze_last_five_digits(phone_number)
+    assert list(full["recommendations"]) == PhoneAnalyzer.get_phone_recommendations(
+        single["total_score"], single["pairs_analysis"]
+    )
+
+
+def test_star_entries_materialize_legacy_shape():
+    entries = PhoneAnalyzer._star_entries("0905131314")
+    legacy = PhoneAnalyzer._map_to_star_sequence("0905131314")
+
+    assert [entry.to_dict() for entry in entries] == legacy
+    assert all(len(item) == 18 for item in legacy)
+    first = legacy[0]
+    assert (first["originalPair"], first["mappedPair"], first["star"]) == ("9051", "91", "DIEN_NIEN")
+    assert (first["zeroCount"], first["fiveCount"], first["specialAttribute"]) == (1, 1, "zero_five")
+    # Mô tả sao được tham chiếu từ BAT_TINH, không chép vào từng phần tử
+    thien_y = next(entry for entry in entries if entry.star_key == "THIEN_Y")
+    assert thien_y.to_dict()["description"] is thien_y.info["description"]
+
+    compatibility = PhoneAnalyzer._analyze_purpose_compatibility(entries, "kinh doanh")
+    assert compatibility["favorable_count"] == sum(1 for e in entries if e.star_key in ("THIEN_Y", "DIEN_NIEN"))
+
+
+def _baseline_analysis(phone_number):
+    """Thuật toán analyze_phone_number của bản gốc (quét BAT_TINH / COMBINATIONS theo khóa chuỗi)
+
+    Khác biệt có chủ đích duy nhất: trường `energy` là năng lượng của chính cặp số thay cho cả
+    dict năng lượng của sao (bản gốc khiến total_score luôn bằng 5.0).
+    """
+    import re
+
+    from constants.bat_tinh import BAT_TINH
+    from constants.combinations import COMBINATIONS
+
+    phone_number = re.sub(r'[^0-9]', '', phone_number)
+    if phone_number.startswith("84") and len(phone_number) > 9:
+        phone_number = "0" + phone_number[2:]
+    analysis = []
+    for number in [phone_number[i:i + 2] for i in range(0, 10, 2)]:
+        for tinh, info in BAT_TINH.items():
+            if number in info["numbers"]:
+                analysis.append({
+                    "number": number,
+                    "tinh": tinh,
+                    "name": info["name"],
+                    "description": info["description"],
+                    "energy": info["energy"].get(number, 1),
+                    "position": info["position"],
+                    "nature": info["nature"]
+                })
+                break
+    combinations = []
+    for current, next_tinh in zip(analysis, analysis[1:]):
+        combination_key = f"{current['tinh']}_{next_tinh['tinh']}"
+        if combination_key in COMBINATIONS:
+            combinations.append({
+                "numbers": f"{current['number']}-{next_tinh['number']}",
+                "combination": combination_key,
+                "description": COMBINATIONS[combination_key]["description"],
+                "detailed_description": COMBINATIONS[combination_key]["detailedDescription"]
+            })
+    total_score = sum(item["energy"] for item in analysis)
+    total_score = min(10, total_score / len(analysis) * 2.5) if total_score > 0 else 5.0
+    if total_score >= 8.5:
+        luck_level = "Rất tốt"
+    elif total_score >= 7:
+        luck_level = "Tốt"
+    elif total_score >= 5:
+        luck_level = "Trung bình"
+    else:
+        luck_level = "Cần cải thiện"
+    return {
+        "phone_number": phone_number,
+        "network_code": phone_number[0:3],
+        "subscriber_number": phone_number[3:10],
+        "analysis": analysis,
+        "pairs_analysis": analysis,
+        "combinations": combinations,
+        "purpose": None,
+        "total_score": total_score,
+        "luck_level": luck_level
+    }
+
+
+def test_analyze_phone_number_matches_baseline():
+    import random
+
+    from tools.batcuclinhso_analysis.pattern_matcher import find_special_patterns
+    from tools.batcuclinhso_analysis.result_cache import thaw
+
+    rng = random.Random(1)
+    numbers = ["0913141913", "+84 905-131-314", "0900000000", "0968686868", "0123456789", "0999999999"]
+    numbers += ["0" + "".join(rng.choice("0123456789") for _ in range(9)) for _ in range(2000)]
+    for phone_number in numbers:
+        result = thaw(PhoneAnalyzer.analyze_phone_number(phone_number))
+        # `special_patterns` là trường bổ sung (mẫu số đặc biệt), mọi trường gốc phải giữ nguyên
+        special_patterns = result.pop("special_patterns")
+        assert result == _baseline_analysis(phone_number)
+        assert special_patterns == find_special_patterns(result["phone_number"])
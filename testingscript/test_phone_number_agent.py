@@ -0,0 +1,54 @@
+"""
+Kiểm tra PhoneNumberAgent chế độ trong tiến trình: công cụ phân tích chạy ngoài event loop
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.batcuclinh_so_agent.sub_agents import phone_number_agent
+from agents.batcuclinh_so_agent.sub_agents.phone_number_agent import MODE_IN_PROCESS, PhoneNumberAgent
+from shared_libraries.models import PhoneAnalysisRequest
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+
+def slow_analyze_phone_full(**kwargs):
+    """Phân tích chậm giả lập một lượt tính toán nặng về CPU"""
+    time.sleep(0.3)
+    return PhoneAnalyzer.analyze_phone_full(**kwargs)
+
+
+def test_in_process_tools_do_not_block_event_loop(monkeypatch):
+    monkeypatch.setitem(phone_number_agent.LOCAL_TOOLS, "analyze_phone_full", slow_analyze_phone_full)
+
+    async def scenario():
+        agent = PhoneNumberAgent(mode=MODE_IN_PROCESS)
+        ticks = 0
+        done = asyncio.Event()
+
+        async def heartbeat():
+            nonlocal ticks
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(heartbeat())
+        try:
+            result = await agent.analyze_phone(PhoneAnalysisRequest(phone_number="0913141913"))
+            suggestions = await agent.suggest_phone("kinh doanh")
+        finally:
+            done.set()
+            await ticker
+        return result, suggestions, ticks
+
+    result, suggestions, ticks = asyncio.run(scenario())
+    expected = PhoneAnalyzer.analyze_phone_full("0913141913")
+    assert result["total_score"] == expected["total_score"]
+    assert [pair["pair"] for pair in result["pairs_analysis"]] == [pair["number"] for pair in expected["pairs_analysis"]]
+    # Kết quả thật từ tìm kiếm (đề xuất mặc định khi lỗi không có luck_level)
+    assert suggestions and all("luck_level" in suggestion for suggestion in suggestions)
+    # Event loop vẫn chạy các coroutine khác trong lúc phân tích (0.3 giây ~ 30 nhịp)
+    assert ticks >= 10
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+import time
+from contextlib import aclosing
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_libraries.process_pool import AnalysisProcessPool
+from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+
+
+def slow_sum(chunk):
+    """Chunk chạy lâu để kiểm tra hủy (hàm cấp module để pickle được sang tiến trình con)"""
+    time.sleep(0.2)
+    return sum(chunk)
+
+
+def test_small_jobs_run_inline_and_large_jobs_stream_chunks():
+    numbers = ["09%08d" % i for i in range(0, 6000, 7)]
+
+    async def scenario():
+        pool = AnalysisProcessPool(offload_threshold=500, chunk_size=200)
+        pool.start(max_workers=2)
+        try:
+            inline = [chunk async for chunk in pool.map_chunks(analyze_phone_numbers_batch, numbers[:100])]
+            chunks = [chunk async for chunk in pool.map_chunks(analyze_phone_numbers_batch, numbers)]
+            total = await pool.run(sum, list(range(1000)), size=1000)
+            return inline, chunks, total, pool.stats()
+        finally:
+            await pool.close()
+
+    inline, chunks, total, stats = asyncio.run(scenario())
+    assert len(inline) == 1 and len(inline[0].result["total_score"]) == 100
+    assert sorted(chunk.offset for chunk in chunks) == list(range(0, len(numbers), 200))
+    expected = analyze_phone_numbers_batch(numbers)["total_score"]
+    for chunk in chunks:
+        scores = chunk.result["total_score"]
+        assert (scores == expected[chunk.offset:chunk.offset + len(scores)]).all()
+    assert total == 499500
+    assert stats["inline_jobs"] == 1 and stats["offloaded_jobs"] == 2 and stats["in_flight"] == 0
+
+
+def test_closing_the_stream_cancels_pending_chunks():
+    async def scenario():
+        pool = AnalysisProcessPool(offload_threshold=10, chunk_size=10)
+        pool.start(max_workers=1)
+        try:
+            async with aclosing(pool.map_chunks(slow_sum, list(range(200)))) as stream:
+                async for first in stream:
+                    break
+            return first, pool.stats()
+        finally:
+            await pool.close()
+
+    first, stats = asyncio.run(scenario())
+    assert first.result == sum(range(first.offset, first.offset + 10))
+    assert stats["cancelled_chunks"] >= 1 and stats["in_flight"] == 0
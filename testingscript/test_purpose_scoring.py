@@ -0,0 +1,65 @@
+"""
+Kiểm tra ma trận mục đích x sao khớp với cách đếm sao thuận lợi / bất lợi theo từng mục đích
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+from tools.batcuclinhso_analysis import inventory_index
+from tools.batcuclinhso_analysis.inventory_index import InventoryIndex
+from tools.batcuclinhso_analysis.number_search import purpose_match_score
+from tools.batcuclinhso_analysis.purpose_scoring import PURPOSE_KEYS, purpose_scores, star_histogram
+from tools.batcuclinhso_analysis.rule_tables import NO_STAR, PURPOSE_PROFILES, STAR_KEYS
+
+
+def naive_counts(star_ids, purpose_key):
+    """(số sao thuận lợi, số sao bất lợi, số cặp khớp sao) đếm trực tiếp theo khóa sao"""
+    profile = PURPOSE_PROFILES[purpose_key]
+    keys = [STAR_KEYS[star_id] for star_id in star_ids if star_id != NO_STAR]
+    favorable = sum(1 for key in keys if key in profile["favorable_stars"])
+    unfavorable = sum(1 for key in keys if key in profile["unfavorable_stars"])
+    return favorable, unfavorable, len(keys)
+
+
+def test_batch_matches_per_purpose_counting():
+    rng = np.random.default_rng(21)
+    numbers = [f"09{n:08d}" for n in rng.integers(0, 10 ** 8, size=3000)]
+    star_ids = analyze_phone_numbers_batch(numbers)["star_ids"]
+
+    batch = purpose_scores(star_histogram(star_ids))
+    assert batch.compatibility.shape == (len(numbers), len(PURPOSE_KEYS))
+    for row in range(0, len(numbers), 37):
+        single = purpose_scores(star_histogram(star_ids[row]))
+        for index, purpose_key in enumerate(PURPOSE_KEYS):
+            favorable, unfavorable, matched = naive_counts(star_ids[row], purpose_key)
+            assert batch.favorable[row, index] == single.favorable[index] == favorable
+            assert batch.unfavorable[row, index] == single.unfavorable[index] == unfavorable
+            assert batch.match_scores[row, index] == purpose_match_score(favorable - unfavorable, matched)
+
+
+def test_inventory_ranks_by_purpose():
+    rng = np.random.default_rng(22)
+    index = InventoryIndex.build(f"09{n:08d}" for n in rng.integers(0, 10 ** 8, size=4000))
+    result = index.search(limit=10000, purpose="tài lộc", min_score=6)
+    ranked = [(-item["combined_score"], item["phone_number"]) for item in result["numbers"]]
+    assert ranked == sorted(ranked) and result["total"] == len(ranked)
+    for item in result["numbers"][:50]:
+        scores = item["purpose_scores"]
+        assert set(scores) == set(PURPOSE_KEYS)
+        assert item["combined_score"] == (item["total_score"] + scores["wealth"]) / 2
+
+
+def test_purpose_ranking_in_chunks_matches_full_sort(monkeypatch):
+    rng = np.random.default_rng(21)
+    index = InventoryIndex.build(f"09{n:08d}" for n in rng.integers(0, 10 ** 8, size=3000))
+    expected = index.search(limit=10000, purpose="kinh doanh")["numbers"]
+    monkeypatch.setattr(inventory_index, "PURPOSE_CHUNK_SIZE", 97)
+    for offset, limit in [(0, 10), (35, 40), (2990, 50), (5000, 5)]:
+        result = index.search(limit=limit, offset=offset, purpose="kinh doanh")
+        assert result["numbers"] == expected[offset:offset + limit]
+        assert result["total"] == len(expected)
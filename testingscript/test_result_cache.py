@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+from tools.batcuclinhso_analysis.result_cache import ResultCache, analysis_cache, thaw
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return {"value": value}
+
+    cache.get_or_compute("t", "a", lambda: compute("a"))
+    cache.get_or_compute("t", "b", lambda: compute("b"))
+    cache.get_or_compute("t", "a", lambda: compute("a"))  # a trở thành mới dùng gần nhất
+    cache.get_or_compute("t", "c", lambda: compute("c"))  # loại b
+    cache.get_or_compute("t", "a", lambda: compute("a"))
+    cache.get_or_compute("t", "b", lambda: compute("b"))
+
+    assert calls == ["a", "b", "c", "b"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (2, 4, 2, 2)
+
+
+def test_cached_results_are_immutable():
+    result = PhoneAnalyzer.analyze_phone_number("0913141913")
+    assert PhoneAnalyzer.analyze_phone_number("+84 913 141 913") is result
+
+    with pytest.raises(TypeError):
+        result["total_score"] = 0
+    with pytest.raises(TypeError):
+        result["analysis"][0]["energy"] = 0
+    with pytest.raises(AttributeError):
+        result["analysis"].append({})
+
+    copy = thaw(result)
+    copy["analysis"][0]["energy"] = 0
+    assert PhoneAnalyzer.analyze_phone_number("0913141913")["analysis"][0]["energy"] != 0
+    assert analysis_cache.stats()["hits"] >= 2
@@ -0,0 +1,96 @@
+"""
+Kiểm tra bảng tra cứu Bát Tinh đã biên dịch khớp với cách duyệt BAT_TINH trực tiếp
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants.bat_tinh import BAT_TINH
+from constants.combinations import COMBINATIONS
+from constants.response_factors import RESPONSE_FACTORS
+from tools.batcuclinhso_analysis.rule_tables import (
+    COMBINATION_INFO,
+    COMBINATION_KEYS,
+    COMBINATION_MATRIX,
+    NO_COMBINATION,
+    NO_STAR,
+    PAIR_ENERGY,
+    PAIR_STAR,
+    STAR_IDS,
+    STAR_KEYS,
+    adjacent_combinations,
+    lookup_pair,
+    lookup_triple,
+)
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+
+def _scan(number: str):
+    """Cách tra cứu cũ: duyệt toàn bộ BAT_TINH"""
+    for tinh, info in BAT_TINH.items():
+        if number in info["numbers"]:
+            return tinh, info
+    return None, None
+
+
+def test_pair_table_matches_scan():
+    for code in range(100):
+        pair = f"{code:02d}"
+        tinh, info = _scan(pair)
+        rule = lookup_pair(pair)
+        if tinh is None:
+            assert rule is None
+            assert PAIR_STAR[code] == NO_STAR
+            continue
+        assert rule.star_key == tinh
+        assert rule.star_id == STAR_IDS[tinh] == PAIR_STAR[code]
+        assert rule.energy == info["energy"][pair] == PAIR_ENERGY[code]
+        assert rule.response_factor == RESPONSE_FACTORS["STAR_RESPONSE_FACTORS"].get(tinh, 1)
+
+
+def test_triple_table_matches_scan():
+    for code in range(1000):
+        triple = f"{code:03d}"
+        tinh, info = _scan(triple)
+        rule = lookup_triple(triple)
+        if tinh is None:
+            assert rule is None
+            continue
+        assert rule.star_key == tinh
+        assert tinh.endswith("_ZERO")
+        assert rule.energy == info["energy"].get(triple, 1)
+
+
+def test_lookup_rejects_invalid_input():
+    assert lookup_pair("1") is None
+    assert lookup_pair("141") is None
+    assert lookup_pair("a1") is None
+    assert lookup_triple("14") is None
+
+
+def test_phone_score_uses_pair_energy():
+    result = PhoneAnalyzer.analyze_phone_number("0914131914")
+    # Cặp 09 không thuộc sao nào, các cặp 14, 13, 19, 14 đều có năng lượng 4 => điểm tối đa
+    assert [item["energy"] for item in result["analysis"]] == [4, 4, 4, 4]
+    assert result["total_score"] == 10
+    assert result["luck_level"] == "Rất tốt"
+
+
+def test_combination_matrix_matches_keys():
+    for first, first_key in enumerate(STAR_KEYS):
+        for second, second_key in enumerate(STAR_KEYS):
+            combination_id = COMBINATION_MATRIX[first][second]
+            key = f"{first_key}_{second_key}"
+            if key in COMBINATIONS:
+                assert COMBINATION_KEYS[combination_id] == key
+                assert COMBINATION_INFO[combination_id] is COMBINATIONS[key]
+            else:
+                assert combination_id == NO_COMBINATION
+    # Biến thể *_ZERO không mượn tổ hợp của sao gốc, NO_STAR không tạo tổ hợp
+    assert COMBINATION_MATRIX[STAR_IDS["SINH_KHI_ZERO"]][STAR_IDS["THIEN_Y"]] == NO_COMBINATION
+    assert all(value == NO_COMBINATION for value in COMBINATION_MATRIX[NO_STAR])
+
+    star_ids = [STAR_IDS["THIEN_Y"], STAR_IDS["THIEN_Y"], STAR_IDS["SINH_KHI"]]
+    assert adjacent_combinations(star_ids) == [(0, COMBINATION_KEYS.index("THIEN_Y_THIEN_Y"))]
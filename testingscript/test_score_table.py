@@ -0,0 +1,113 @@
+"""
+Kiểm tra bảng điểm tính sẵn khớp với phân tích hàng loạt và tra cứu qua memory-map
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+from tools.batcuclinhso_analysis.rule_tables import LUCK_LEVELS
+from tools.batcuclinhso_analysis.score_table import (
+    LUCK_BY_CODE,
+    SCORE_BY_CODE,
+    ScoreTableStore,
+    build_score_distributions,
+    build_score_tables,
+    compute_prefix_codes,
+)
+
+
+def test_prefix_codes_match_batch_analyzer():
+    codes = compute_prefix_codes("098")
+    subscribers = np.random.default_rng(3).integers(0, 10 ** 7, size=20000)
+    numbers = [f"098{s:07d}" for s in subscribers]
+    batch = analyze_phone_numbers_batch(numbers)
+    assert np.array_equal(SCORE_BY_CODE[codes[subscribers]], batch["total_score"])
+    assert np.array_equal(LUCK_BY_CODE[codes[subscribers]], batch["luck_level"])
+
+
+def test_store_lookup_and_best_numbers(tmp_path):
+    build_score_tables(str(tmp_path), ["090"], verify_samples=50)
+    store = ScoreTableStore()
+    assert store.load(str(tmp_path)) == 1
+
+    result = store.lookup("0901413191")
+    assert result == {"phone_number": "0901413191", "total_score": 10.0, "luck_level": LUCK_LEVELS[0]}
+    assert store.lookup("0971413191") is None
+    assert store.percentile("0901413191") == 100.0
+
+    best = store.best_numbers("090", limit=3, offset=2)
+    assert len(best) == 3
+    assert all(item["total_score"] == 10.0 for item in best)
+    assert best == store.best_numbers("090", limit=5)[2:]
+
+
+def test_percentile_from_distribution_table(tmp_path):
+    build_score_tables(str(tmp_path / "full"), ["090"], verify_samples=20)
+    build_score_distributions(str(tmp_path / "dist"), ["090", "098"], verify_samples=20)
+    full, dist = ScoreTableStore(), ScoreTableStore()
+    assert full.load(str(tmp_path / "full")) == 1
+    assert dist.load(str(tmp_path / "dist")) == 0
+    assert dist.distribution_prefixes == ["090", "098"]
+    assert dist.percentile_rank("0971413191") is None
+
+    scores = SCORE_BY_CODE[compute_prefix_codes("098")]
+    for subscriber in np.random.default_rng(4).integers(0, 10 ** 7, size=200):
+        phone_number = f"090{subscriber:07d}"
+        assert dist.percentile_rank(phone_number) == full.percentile_rank(phone_number)
+
+        result = dist.percentile_rank(f"098{subscriber:07d}")
+        score = scores[subscriber]
+        assert result["total_score"] == score
+        assert result["percentile"] == np.count_nonzero(scores <= score) * 100 / 10 ** 7
+        assert result["better_than_percent"] == np.count_nonzero(scores < score) * 100 / 10 ** 7
+        assert result["rank"] == np.count_nonzero(scores > score) + 1
+
+
+def test_score_endpoints_require_auth(tmp_path):
+    from fastapi.testclient import TestClient
+
+    import main
+    from tools.batcuclinhso_analysis.score_table import score_tables
+
+    build_score_tables(str(tmp_path), ["090"], verify_samples=10)
+    try:
+        with TestClient(main.app) as client:
+            score_tables.load(str(tmp_path))
+            assert client.get("/api/batcuclinh_so/score/0901413191").status_code == 401
+            assert client.get("/api/batcuclinh_so/best_numbers?prefix=090").status_code == 401
+
+            main.app.dependency_overrides[main.get_current_user] = lambda: {"id": "score-user"}
+            assert client.get("/api/batcuclinh_so/score/0901413191").json()["total_score"] == 10.0
+            response = client.get("/api/batcuclinh_so/best_numbers?prefix=090&limit=3&offset=2")
+            assert response.json()["numbers"] == score_tables.best_numbers("090", limit=3, offset=2)
+    finally:
+        main.app.dependency_overrides.clear()
+        score_tables.close()
+
+
+def test_incremental_builds_keep_earlier_prefixes(tmp_path):
+    build_score_tables(str(tmp_path), ["090"], verify_samples=0)
+    build_score_tables(str(tmp_path), ["098"], verify_samples=0)
+    store = ScoreTableStore()
+    assert store.load(str(tmp_path)) == 2
+    assert store.prefixes == ["090", "098"]
+    assert store.lookup("0901413191")["total_score"] == 10.0
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_incremental_distributions_keep_earlier_prefixes(tmp_path):
+    build_score_distributions(str(tmp_path), ["090", "098"], verify_samples=0)
+    before = ScoreTableStore()
+    before.load(str(tmp_path))
+    build_score_distributions(str(tmp_path), ["097"], verify_samples=0)
+    build_score_tables(str(tmp_path), ["098"], verify_samples=0)
+    store = ScoreTableStore()
+    store.load(str(tmp_path))
+    assert store.distribution_prefixes == ["090", "097", "098"]
+    assert store.percentile_rank("0901413191") == before.percentile_rank("0901413191")
+    assert store.percentile_rank("0971413191")["population"] == 10 ** 7
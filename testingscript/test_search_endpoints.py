@@ -0,0 +1,66 @@
+"""
+Kiểm tra các endpoint tìm kiếm nhánh cận: yêu cầu xác thực, tính quota và giới hạn ngân sách
+"""
+
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def test_pattern_search_requires_auth_and_charges_quota(monkeypatch):
+    user = {"id": "search-user", "remainingQuestions": 1, "isPremium": False}
+    saved = []
+
+    async def record_quota(user_id, remaining_questions=None):
+        saved.append((user_id, remaining_questions))
+
+    monkeypatch.setattr(main, "update_user_quota", record_quota)
+    url = "/api/batcuclinh_so/pattern_search?pattern=09xx68xx88&k=3"
+    try:
+        with TestClient(main.app) as client:
+            assert client.get(url).status_code == 401
+
+            main.app.dependency_overrides[main.get_current_user] = lambda: user
+            assert client.get(url + "&time_budget_ms=5000").status_code == 422
+            assert client.get(url + "&node_budget=10000000").status_code == 422
+            assert client.get(url.replace("09xx", "09xy")).status_code == 400
+            assert saved == []
+
+            response = client.get(url)
+            assert response.status_code == 200 and len(response.json()["numbers"]) == 3
+            assert saved == [("search-user", 0)]
+            assert client.get(url).status_code == 402
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_improve_requires_auth_and_skips_premium_quota(monkeypatch):
+    user = {"id": "improve-user", "remainingQuestions": 0, "isPremium": True}
+    saved = []
+
+    async def record_quota(user_id, remaining_questions=None):
+        saved.append((user_id, remaining_questions))
+
+    monkeypatch.setattr(main, "update_user_quota", record_quota)
+    url = "/api/batcuclinh_so/improve/0912345678?k=3"
+    try:
+        with TestClient(main.app) as client:
+            assert client.get(url).status_code == 401
+
+            main.app.dependency_overrides[main.get_current_user] = lambda: user
+            assert client.get(url + "&time_budget_ms=1000").status_code == 422
+            assert client.get(url + "&node_budget=200001").status_code == 422
+            response = client.get(url)
+            assert response.status_code == 200 and "complete" in response.json()
+            assert saved == [] and user["remainingQuestions"] == 0
+
+            user.update(isPremium=False, remainingQuestions=2)
+            assert client.get(url).status_code == 200
+            assert saved == [("improve-user", 1)]
+    finally:
+        main.app.dependency_overrides.clear()
@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+from tools.batcuclinhso_analysis.what_if import PhoneState, initial_state, what_if
+
+
+def test_edit_chain_matches_full_analysis():
+    rng = random.Random(11)
+    for _ in range(50):
+        phone_number = "09" + "".join(rng.choice("0123456789") for _ in range(8))
+        state = initial_state(phone_number).to_dict()
+        for _ in range(20):
+            position, digit = rng.randrange(10), rng.choice("0123456789")
+            result = what_if(position, digit, state=state)
+            full = PhoneAnalyzer.analyze_phone_number(result["phone_number"])
+            assert result["total_score"] == full["total_score"]
+            assert result["luck_level"] == full["luck_level"]
+            assert result["state"]["combination_count"] == len(full["combinations"])
+            full_combinations = [c["combination"] for c in full["combinations"]]
+            for combination in result["combinations_added"]:
+                assert combination["combination"] in full_combinations
+            state = result["state"]
+
+
+def test_state_validation_and_rules_version():
+    state = initial_state("0912345678").to_dict()
+    assert PhoneState.from_dict({**state, "rules_version": "old"}) == PhoneState.from_dict(state)
+    with pytest.raises(ValueError):
+        PhoneState.from_dict({**state, "star_ids": [0, 1]})
+    with pytest.raises(ValueError):
+        what_if(10, "1", state=state)
+    with pytest.raises(ValueError):
+        what_if(0, "1")
+
+
+def test_client_state_is_rederived_from_phone_number():
+    state = initial_state("0912345678").to_dict()
+    tampered = [
+        {"energy_sum": 7, "matched_count": 0},
+        {"energy_sum": -3},
+        {"combination_count": -1},
+        {"energies": [9, 9, 9, 9, 9]},
+        {"star_ids": [0, 0, 0, 0, 0]},
+        {"matched_count": "abc"},
+        {"phone_number": "09123"},
+    ]
+    for fields in tampered:
+        with pytest.raises(ValueError):
+            what_if(0, "1", state={**state, **fields})
+
+    # Số sau khi sửa không được chuẩn hóa lại (ví dụ bắt đầu bằng "84")
+    result = what_if(1, "4", state=what_if(0, "8", state=state)["state"])
+    assert result["phone_number"] == "8412345678"
+    assert PhoneState.from_dict(result["state"]).to_dict() == result["state"]
@@ -4,6 +4,9 @@ Tool để phân tích số tài khoản ngân hàng dựa trên phương pháp
 
 from google.adk.tools import FunctionTool
 from typing import Dict, Any, List, Optional
+from tools.batcuclinhso_analysis.digit_kernel import digit_profile
+from tools.batcuclinhso_analysis.pattern_matcher import find_special_patterns
+from tools.batcuclinhso_analysis.result_cache import analysis_cache
 from utils.common import extract_digits
 
 def bank_account_analyzer(account_number: str) -> Dict[str, Any]:
@@ -25,9 +28,21 @@ def bank_account_analyzer(account_number: str) -> Dict[str, Any]:
     if not digits:
         raise ValueError("Số tài khoản phải chứa ít nhất một chữ số")
     
-    # Tính tổng các chữ số
-    digit_sum = sum(int(d) for d in digits)
-    energy_number = digit_sum % 9 or 9
+    # Phần phân tích chỉ phụ thuộc vào các chữ số nên được ghi nhớ theo chuỗi chữ số
+    analysis = analysis_cache.get_or_compute("bank_account", digits, lambda: _analyze_account_digits(digits))
+    
+    # Kết quả phân tích
+    return {
+        "success": True,
+        "accountNumber": account_number,
+        "analysis": analysis
+    }
+
+def _analyze_account_digits(digits: str) -> Dict[str, Any]:
+    """Phân tích chuỗi chữ số của số tài khoản (xem bank_account_analyzer)"""
+    # Tổng, số năng lượng, tần suất chữ số và các cặp liền kề lấy từ lõi phân tích chữ số
+    profile = digit_profile(digits)
+    energy_number = profile.digit_root
     
     # Phân tích ngũ hành
     five_elements_map = {
@@ -43,7 +58,7 @@ def bank_account_analyzer(account_number: str) -> Dict[str, Any]:
     }
     
     # Đếm tần suất các chữ số
-    digit_frequency = {str(i): digits.count(str(i)) for i in range(10)}
+    digit_frequency = {str(i): count for i, count in enumerate(profile.histogram)}
     
     # Xác định các cặp số đặc biệt
     special_pairs = [
@@ -58,9 +73,7 @@ def bank_account_analyzer(account_number: str) -> Dict[str, Any]:
     
     found_pairs = []
     for pair in special_pairs:
-        for i in range(len(digits) - 1):
-            if digits[i] == pair[0] and digits[i+1] == pair[1]:
-                found_pairs.append(f"{pair[0]}{pair[1]}")
+        found_pairs.extend([f"{pair[0]}{pair[1]}"] * profile.pair_codes.count(int(pair[0] + pair[1])))
     
     # Ý nghĩa năng lượng số
     energy_meanings = {
@@ -76,11 +89,11 @@ def bank_account_analyzer(account_number: str) -> Dict[str, Any]:
     }
     
     # Đánh giá mức độ may mắn
-    lucky_numbers = ['6', '8', '9']
-    unlucky_numbers = ['4', '7']
+    lucky_numbers = [6, 8, 9]
+    unlucky_numbers = [4, 7]
     
-    lucky_count = sum(digits.count(d) for d in lucky_numbers)
-    unlucky_count = sum(digits.count(d) for d in unlucky_numbers)
+    lucky_count = sum(profile.histogram[d] for d in lucky_numbers)
+    unlucky_count = sum(profile.histogram[d] for d in unlucky_numbers)
     
     lucky_ratio = lucky_count / len(digits) if len(digits) > 0 else 0
     
@@ -94,21 +107,17 @@ def bank_account_analyzer(account_number: str) -> Dict[str, Any]:
     else:
         prosperity_level = "Ít thuận lợi"
     
-    # Kết quả phân tích
     return {
-        "success": True,
-        "accountNumber": account_number,
-        "analysis": {
-            "energyNumber": energy_number,
-            "element": five_elements_map[energy_number],
-            "energyMeaning": energy_meanings[energy_number],
-            "digitFrequency": digit_frequency,
-            "specialPairs": found_pairs,
-            "prosperityLevel": prosperity_level,
-            "recommendation": f"Số tài khoản này mang năng lượng số {energy_number} ({five_elements_map[energy_number]}), {energy_meanings[energy_number].lower()}.",
-            "luckyCount": lucky_count,
-            "unluckyCount": unlucky_count
-        }
+        "energyNumber": energy_number,
+        "element": five_elements_map[energy_number],
+        "energyMeaning": energy_meanings[energy_number],
+        "digitFrequency": digit_frequency,
+        "specialPairs": found_pairs,
+        "specialPatterns": find_special_patterns(digits),
+        "prosperityLevel": prosperity_level,
+        "recommendation": f"Số tài khoản này mang năng lượng số {energy_number} ({five_elements_map[energy_number]}), {energy_meanings[energy_number].lower()}.",
+        "luckyCount": lucky_count,
+        "unluckyCount": unlucky_count
     }
 
 # Tạo Function Tool
@@ -3,24 +3,43 @@ Tool để gợi ý số tài khoản ngân hàng dựa trên phương pháp Bá
 """
 
 from google.adk.tools import FunctionTool
-from typing import Dict, Any, List, Optional
-import random
+from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
 import re
 
+from tools.batcuclinhso_analysis.number_search import SearchHit, positions_for_prefix, search_numbers
+from tools.batcuclinhso_analysis.rule_tables import LUCK_LEVELS, luck_level_code, resolve_purpose
+
+# Các chữ số may mắn trong phong thủy, ưu tiên khi các số tài khoản cùng điểm
+LUCKY_DIGITS = "689"
+
+# Ngân sách số node cho mỗi lần tìm kiếm
+SEARCH_NODE_BUDGET = 200_000
+
+
 def bank_account_suggester(
     bank_code: str,
     prefix: Optional[str] = None,
     length: Optional[int] = None,
-    purpose: str = "personal"
+    purpose: str = "personal",
+    k: int = 5,
+    seed: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Gợi ý số tài khoản ngân hàng may mắn dựa trên phương pháp Bát Cục Linh Số.
     
+    Tìm top-k số tài khoản có điểm Bát Cục Linh Số cao nhất theo mục đích sử dụng, với độ dài
+    theo ngân hàng và tiền tố cố định. Kết quả là tất định và được cache theo
+    (bank_code, prefix, length, purpose, k, seed).
+    
     Args:
         bank_code (str): Mã ngân hàng (VCB, TCB, ACB, v.v.)
         prefix (str, optional): Tiền tố cố định của số tài khoản
         length (int, optional): Độ dài mong muốn của số tài khoản
         purpose (str): Mục đích sử dụng tài khoản (personal, business, savings, v.v.)
+        k (int): Số lượng gợi ý
+        seed (int, optional): Nếu có, xáo thứ tự các số cùng điểm theo seed để có bộ gợi ý
+            khác nhưng vẫn tái lập được
         
     Returns:
         Dict[str, Any]: Kết quả gợi ý với danh sách các số tài khoản may mắn
@@ -63,86 +82,24 @@ def bank_account_suggester(
     if remaining_length <= 0:
         raise ValueError("Tiền tố đã dài bằng hoặc vượt quá độ dài yêu cầu")
     
-    # Các chữ số may mắn trong phong thủy
-    lucky_digits = ['6', '8', '9']
-    neutral_digits = ['0', '1', '2', '3', '5']
-    unlucky_digits = ['4', '7']
+    # Mục đích không nhận diện được dùng hồ sơ cá nhân
+    purpose_key = resolve_purpose(purpose) or "personal"
     
-    # Các mẫu số tài khoản may mắn
-    lucky_patterns = [
-        "68",  # Tấn Lộc - Vượng Tài
-        "89",  # Tài Lộc - Tài Thành
-        "96",  # Thành Tấn - Công Thành
-        "16",  # Nguyên Tấn - Thủy Sinh Mộc
-        "28",  # Địa Tài - Thổ Sinh Kim
-        "39",  # Sinh Thành - Mộc Sinh Hỏa
-        "168", # Lộc Phát - Phát Tài
-        "688", # Lộc Phát Phát
-        "869", # Tài Lộc Phát
-        "986"  # Cửu Phát Lộc
-    ]
+    hits, complete = _top_accounts(bank_code, prefix, length, purpose_key, k, seed)
     
-    # Xác định số lượng may mắn và trung tính dựa vào mục đích
-    purpose_weights = {
-        "personal": (0.5, 0.4, 0.1),   # (may mắn, trung tính, xui)
-        "business": (0.7, 0.25, 0.05), # Tài khoản kinh doanh cần nhiều số may mắn
-        "savings": (0.6, 0.35, 0.05),  # Tài khoản tiết kiệm
-        "investment": (0.8, 0.15, 0.05) # Tài khoản đầu tư
-    }
-    
-    lucky_weight, neutral_weight, unlucky_weight = purpose_weights.get(purpose.lower(), (0.5, 0.4, 0.1))
-    
-    # Sinh ngẫu nhiên các số tài khoản may mắn
     result_accounts = []
-    for _ in range(5):  # Tạo 5 gợi ý
-        account = prefix
-        
-        # Thêm mẫu may mắn vào giữa
-        if remaining_length > 4:
-            pattern = random.choice(lucky_patterns)
-            if len(pattern) <= remaining_length - 2:
-                # Vị trí chèn mẫu
-                insert_pos = random.randint(0, remaining_length - len(pattern))
-                
-                # Tạo phần còn lại
-                for i in range(remaining_length):
-                    if i == insert_pos:
-                        account += pattern
-                        i += len(pattern) - 1
-                    else:
-                        r = random.random()
-                        if r < lucky_weight:
-                            account += random.choice(lucky_digits)
-                        elif r < lucky_weight + neutral_weight:
-                            account += random.choice(neutral_digits)
-                        else:
-                            account += random.choice(unlucky_digits)
-            else:
-                # Nếu mẫu quá dài, sử dụng cách thông thường
-                for _ in range(remaining_length):
-                    r = random.random()
-                    if r < lucky_weight:
-                        account += random.choice(lucky_digits)
-                    elif r < lucky_weight + neutral_weight:
-                        account += random.choice(neutral_digits)
-                    else:
-                        account += random.choice(unlucky_digits)
-        else:
-            # Nếu số còn lại ngắn, chỉ dùng số may mắn
-            for _ in range(remaining_length):
-                account += random.choice(lucky_digits)
-        
-        # Kiểm tra và cắt nếu vượt quá độ dài
-        if len(account) > length:
-            account = account[:length]
-        
+    for hit in hits:
         # Tính năng lượng số
-        digit_sum = sum(int(d) for d in account)
+        digit_sum = sum(int(d) for d in hit.number)
         energy_number = digit_sum % 9 or 9
         
         result_accounts.append({
-            "accountNumber": account,
-            "energyNumber": energy_number
+            "accountNumber": hit.number,
+            "energyNumber": energy_number,
+            "score": hit.total_score,
+            "purposeScore": hit.purpose_score,
+            "combinedScore": hit.combined_score,
+            "luckLevel": LUCK_LEVELS[luck_level_code(hit.total_score)]
         })
     
     # Kết quả gợi ý
@@ -150,8 +107,36 @@ def bank_account_suggester(
         "success": True,
         "suggestions": result_accounts,
         "bank": bank_code,
-        "purpose": purpose
+        "purpose": purpose,
+        "length": length,
+        "complete": complete
     }
 
+
+@lru_cache(maxsize=256)
+def _top_accounts(
+    bank_code: str,
+    prefix: str,
+    length: int,
+    purpose_key: str,
+    k: int,
+    seed: Optional[int]
+) -> Tuple[Tuple[SearchHit, ...], bool]:
+    """Top-k số tài khoản cho một (ngân hàng, tiền tố, độ dài, mục đích)
+    
+    Ngân sách tìm kiếm tính theo số node (không theo thời gian) nên kết quả luôn tái lập
+    được và có thể cache an toàn.
+    """
+    result = search_numbers(
+        positions_for_prefix(prefix, length),
+        purpose=purpose_key,
+        preferred_digits=LUCKY_DIGITS,
+        k=k,
+        node_budget=SEARCH_NODE_BUDGET,
+        seed=seed
+    )
+    return tuple(result.hits), result.complete
+
+
 # Tạo Function Tool
 bank_account_suggester_tool = FunctionTool(bank_account_suggester) 
\ No newline at end of file
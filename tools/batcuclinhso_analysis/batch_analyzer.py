@@ -0,0 +1,134 @@
+"""
+Batch Analyzer: Phân tích hàng loạt số điện thoại trên mảng NumPy
+
+Cung cấp `analyze_phone_numbers_batch` cho các danh sách lớn (100k - 5M số) từ đối tác
+đại lý SIM. Thay vì tạo dict cho từng cặp số như `PhoneAnalyzer.analyze_phone_number`,
+các vòng lặp theo cặp được thay bằng phép gather trên các bảng trong `rule_tables`
+và kết quả trả về dạng cột (mỗi trường là một mảng NumPy).
+
+Điểm số và cấp độ may mắn khớp chính xác với đường phân tích từng số.
+"""
+
+from typing import Dict, Sequence, Tuple, Union
+
+import numpy as np
+
+from tools.batcuclinhso_analysis.rule_tables import (
+    COMBINATION_MATRIX,
+    DEFAULT_SCORE,
+    LUCK_LEVELS,
+    LUCK_THRESHOLDS,
+    MAX_SCORE,
+    NO_COMBINATION,
+    NO_STAR,
+    PAIR_ENERGY,
+    PAIR_STAR,
+    SCORE_SCALE,
+)
+from utils.common import normalize_phone_number
+
+PHONE_LENGTH = 10
+PAIR_COUNT = PHONE_LENGTH // 2
+
+# Mã cấp độ may mắn cho các dòng không hợp lệ
+LUCK_INVALID = -1
+
+_PAIR_STAR = np.array(PAIR_STAR, dtype=np.uint8)
+_PAIR_ENERGY = np.array(PAIR_ENERGY, dtype=np.float64)
+# Ma trận (sao trước, sao sau) -> id tổ hợp, có hàng/cột lính canh NO_STAR
+_COMBINATION_MATRIX = np.array(COMBINATION_MATRIX, dtype=np.int8)
+
+
+def to_digit_matrix(numbers: Union[np.ndarray, Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Chuyển đầu vào thành ma trận chữ số uint8 (N x 10) và mặt nạ hợp lệ
+
+    Args:
+        numbers: Ma trận chữ số (N x 10) hoặc danh sách chuỗi số điện thoại.
+            Chuỗi được chuẩn hóa giống `PhoneAnalyzer._normalize_phone_number`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (ma trận chữ số, mặt nạ các dòng hợp lệ)
+    """
+    if isinstance(numbers, np.ndarray):
+        if numbers.ndim != 2 or numbers.shape[1] != PHONE_LENGTH:
+            raise ValueError(f"Ma trận chữ số phải có dạng (N, {PHONE_LENGTH})")
+        if numbers.size and (numbers.min() < 0 or numbers.max() > 9):
+            raise ValueError("Ma trận chữ số chỉ được chứa giá trị 0-9")
+        return numbers.astype(np.uint8, copy=False), np.ones(len(numbers), dtype=bool)
+
+    normalized = [normalize_phone_number(number) for number in numbers]
+    valid = np.fromiter(
+        (len(number) == PHONE_LENGTH for number in normalized), dtype=bool, count=len(normalized)
+    )
+    padding = "0" * PHONE_LENGTH
+    joined = "".join(number if ok else padding for number, ok in zip(normalized, valid))
+    matrix = np.frombuffer(joined.encode("ascii"), dtype=np.uint8) - ord("0")
+    return matrix.reshape(len(normalized), PHONE_LENGTH), valid
+
+
+def analyze_phone_numbers_batch(numbers: Union[np.ndarray, Sequence[str]]) -> Dict[str, np.ndarray]:
+    """Phân tích hàng loạt số điện thoại theo phương pháp Bát Cục Linh Số
+
+    Args:
+        numbers: Ma trận chữ số uint8 (N x 10) hoặc danh sách N chuỗi số điện thoại.
+
+    Returns:
+        Dict[str, np.ndarray]: Kết quả dạng cột, mỗi mảng có N dòng:
+            - digits (N x 10, uint8): Các chữ số đã chuẩn hóa
+            - valid (N, bool): Số điện thoại có đúng 10 chữ số hay không
+            - star_ids (N x 5, uint8): Id sao của từng cặp (NO_STAR nếu không thuộc sao nào)
+            - pair_energy (N x 5, float64): Năng lượng từng cặp (0 nếu không thuộc sao nào)
+            - matched_count (N, uint8): Số cặp khớp sao
+            - total_score (N, float64): Điểm tổng, NaN với dòng không hợp lệ
+            - luck_level (N, int8): Mã cấp độ may mắn (chỉ số trong LUCK_LEVELS), -1 nếu không hợp lệ
+            - combination_ids (N x 4, int8): Id tổ hợp giữa các sao khớp liền kề
+              (chỉ số trong COMBINATION_KEYS), -1 nếu không có
+    """
+    digits, valid = to_digit_matrix(numbers)
+
+    # Mã cặp số 00-99 cho 5 cặp (0-1, 2-3, ..., 8-9)
+    codes = digits[:, 0::2].astype(np.intp) * 10 + digits[:, 1::2]
+    star_ids = _PAIR_STAR[codes]
+    pair_energy = _PAIR_ENERGY[codes]
+    matched = star_ids != NO_STAR
+    matched_count = matched.sum(axis=1, dtype=np.uint8)
+
+    # Cùng công thức với rule_tables.phone_score
+    energy_sum = pair_energy.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_score = energy_sum / matched_count * SCORE_SCALE
+    total_score = np.where(energy_sum > 0, np.minimum(MAX_SCORE, average_score), DEFAULT_SCORE)
+    total_score[~valid] = np.nan
+
+    luck_level = np.full(len(digits), len(LUCK_THRESHOLDS), dtype=np.int8)
+    for code in range(len(LUCK_THRESHOLDS) - 1, -1, -1):
+        luck_level[total_score >= LUCK_THRESHOLDS[code]] = code
+    luck_level[~valid] = LUCK_INVALID
+
+    # Tổ hợp được xét giữa các cặp khớp sao liền kề (bỏ qua cặp không thuộc sao nào):
+    # dồn các sao khớp lên đầu dòng, giữ nguyên thứ tự, NO_STAR dồn về cuối
+    order = np.argsort(~matched, axis=1, kind="stable")
+    compact_stars = np.take_along_axis(star_ids, order, axis=1)
+    combination_ids = _COMBINATION_MATRIX[compact_stars[:, :-1], compact_stars[:, 1:]]
+
+    star_ids[~valid] = NO_STAR
+    pair_energy[~valid] = 0
+    matched_count[~valid] = 0
+    combination_ids[~valid] = NO_COMBINATION
+
+    return {
+        "digits": digits,
+        "valid": valid,
+        "star_ids": star_ids,
+        "pair_energy": pair_energy,
+        "matched_count": matched_count,
+        "total_score": total_score,
+        "luck_level": luck_level,
+        "combination_ids": combination_ids,
+    }
+
+
+def luck_level_names(codes: np.ndarray) -> np.ndarray:
+    """Chuyển mã cấp độ may mắn thành tên (chuỗi rỗng với dòng không hợp lệ)"""
+    names = np.array(LUCK_LEVELS + ("",), dtype=object)
+    return names[np.where(codes < 0, len(LUCK_LEVELS), codes)]
@@ -0,0 +1,280 @@
+"""
+Breach Filter: Kiểm tra mật khẩu đã bị lộ bằng Bloom filter cục bộ
+
+Bộ lọc được build offline từ một kho mật khẩu đã bị lộ (mỗi dòng một mật khẩu, hoặc mỗi dòng
+một mã SHA-1 dạng hex như danh sách của Have I Been Pwned, có thể kèm `:số lần`). Mỗi mật khẩu
+được đại diện bởi SHA-1 của nó; 16 byte đầu cho hai giá trị băm 64 bit h1, h2 và k vị trí bit
+là (h1 + i * h2) mod 2^64 mod m với i = 0..k-1 (double hashing).
+
+Với n mật khẩu và tỉ lệ dương tính giả p: m = -n ln p / (ln 2)^2 bit, k = round(m / n * ln 2);
+p = 0.001 tốn khoảng 1.8 byte/mật khẩu. Không có âm tính giả: mật khẩu không bị báo lộ thì chắc
+chắn không có trong kho.
+
+File gồm header 64 byte (magic, phiên bản, k, m, n, p) rồi mảng bit. Service memory-map file
+khi khởi động (chỉ đọc), mỗi lần kiểm tra chỉ tính một SHA-1 và đọc k byte từ vùng nhớ đã map,
+không gọi mạng và không cấp phát mảng.
+
+Build offline:
+    python -m tools.batcuclinhso_analysis.breach_filter --corpus rockyou.txt [--fp-rate 0.001]
+    python -m tools.batcuclinhso_analysis.breach_filter --corpus pwned-passwords-sha1.txt --format sha1
+"""
+
+import argparse
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BREACH_FILTER_PATH = os.environ.get(
+    "BREACH_FILTER_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "breached_passwords.bloom"
+    ),
+)
+DEFAULT_FALSE_POSITIVE_RATE = float(os.environ.get("BREACH_FILTER_FP_RATE", 0.001))
+
+FORMAT_PLAIN = "plain"
+FORMAT_SHA1 = "sha1"
+BUILD_CHUNK_SIZE = 1 << 20
+
+_MAGIC = b"PTBLOOM\x00"
+_VERSION = 1
+# magic, phiên bản, số hàm băm k, số bit m, số mật khẩu n, tỉ lệ dương tính giả p
+_HEADER = struct.Struct("<8sIIQQd")
+_HEADER_SIZE = 64
+_MASK64 = (1 << 64) - 1
+_SHA1_HEX_LENGTH = 40
+
+
+def filter_parameters(item_count: int, false_positive_rate: float) -> Tuple[int, int]:
+    """(số bit m, số hàm băm k) tối ưu cho n mật khẩu và tỉ lệ dương tính giả p"""
+    if not 0 < false_positive_rate < 1:
+        raise ValueError("Tỉ lệ dương tính giả phải nằm trong khoảng (0, 1)")
+    item_count = max(item_count, 1)
+    bit_count = max(64, math.ceil(-item_count * math.log(false_positive_rate) / math.log(2) ** 2))
+    hash_count = max(1, round(bit_count / item_count * math.log(2)))
+    return bit_count, hash_count
+
+
+def password_digest(password: str) -> bytes:
+    """SHA-1 của mật khẩu (UTF-8), cùng dạng với các kho mã băm mật khẩu đã lộ"""
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+
+def _digest_from_line(line: str, corpus_format: str) -> Optional[bytes]:
+    if corpus_format == FORMAT_SHA1:
+        value = line.strip().split(":", 1)[0]
+        if len(value) != _SHA1_HEX_LENGTH:
+            return None
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return None
+    password = line.rstrip("\r\n")
+    return password_digest(password) if password else None
+
+
+def _iter_digest_chunks(lines: Iterable[str], corpus_format: str, chunk_size: int) -> Iterator[bytes]:
+    """Ghép 16 byte đầu của từng SHA-1 thành các khối (tối đa chunk_size mật khẩu mỗi khối)"""
+    chunk: List[bytes] = []
+    for line in lines:
+        digest = _digest_from_line(line, corpus_format)
+        if digest is None:
+            continue
+        chunk.append(digest[:16])
+        if len(chunk) == chunk_size:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _bit_positions(hashes: np.ndarray, bit_count: int, hash_count: int) -> Iterator[np.ndarray]:
+    """Vị trí bit thứ i (i = 0..k-1) của từng mật khẩu; phép toán uint64 tự tràn như mod 2^64"""
+    h1, h2 = hashes[:, 0], hashes[:, 1]
+    with np.errstate(over="ignore"):
+        for i in range(hash_count):
+            yield (h1 + np.uint64(i) * h2) % np.uint64(bit_count)
+
+
+def build_breach_filter(
+    corpus_path: str,
+    output_path: str = DEFAULT_BREACH_FILTER_PATH,
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+    corpus_format: str = FORMAT_PLAIN,
+    chunk_size: int = BUILD_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """Build file Bloom filter từ một kho mật khẩu đã lộ
+
+    Args:
+        corpus_path: File kho mật khẩu (UTF-8), mỗi dòng một mật khẩu hoặc một mã SHA-1 hex
+        output_path: File bộ lọc cần ghi
+        false_positive_rate: Tỉ lệ dương tính giả mong muốn
+        corpus_format: FORMAT_PLAIN (mật khẩu) hoặc FORMAT_SHA1 (mã SHA-1 hex, có thể kèm `:số lần`)
+        chunk_size: Số mật khẩu băm mỗi khối
+
+    Returns:
+        Dict[str, Any]: Thông số của bộ lọc đã build
+    """
+    if corpus_format not in (FORMAT_PLAIN, FORMAT_SHA1):
+        raise ValueError(f"Định dạng kho mật khẩu không hợp lệ: {corpus_format}")
+
+    # Lượt 1 đếm số dòng để chọn kích thước bộ lọc, lượt 2 bật bit theo từng khối
+    with open(corpus_path, encoding="utf-8", errors="replace") as f:
+        line_count = sum(1 for _ in f)
+    bit_count, hash_count = filter_parameters(line_count, false_positive_rate)
+    bits = np.zeros((bit_count + 7) // 8, dtype=np.uint8)
+
+    item_count = 0
+    with open(corpus_path, encoding="utf-8", errors="replace") as f:
+        for chunk in _iter_digest_chunks(f, corpus_format, chunk_size):
+            hashes = np.frombuffer(chunk, dtype="<u8").reshape(-1, 2)
+            item_count += len(hashes)
+            for positions in _bit_positions(hashes, bit_count, hash_count):
+                masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+                np.bitwise_or.at(bits, positions >> np.uint64(3), masks)
+
+    # Ghi ra file tạm rồi thay thế nguyên tử để worker đang map file cũ không bị ảnh hưởng
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        header = _HEADER.pack(_MAGIC, _VERSION, hash_count, bit_count, item_count, false_positive_rate)
+        f.write(header.ljust(_HEADER_SIZE, b"\x00"))
+        f.write(bits.tobytes())
+    os.replace(tmp_path, output_path)
+    logger.info(f"Đã build bộ lọc mật khẩu đã lộ ({item_count} mật khẩu, {bits.nbytes} byte): {output_path}")
+    return {
+        "item_count": item_count,
+        "bit_count": bit_count,
+        "hash_count": hash_count,
+        "false_positive_rate": false_positive_rate,
+        "nbytes": _HEADER_SIZE + bits.nbytes,
+    }
+
+
+class BreachFilter:
+    """Bloom filter mật khẩu đã lộ, memory-map từ file đã build offline"""
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.hash_count = 0
+        self.bit_count = 0
+        self.item_count = 0
+        self.false_positive_rate = 0.0
+        self._mmap: Optional[mmap.mmap] = None
+        self._bits: Optional[np.ndarray] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._mmap is not None
+
+    def load(self, path: str) -> bool:
+        """Memory-map file bộ lọc (chỉ đọc)
+
+        Returns:
+            bool: True nếu đã map, False nếu file chưa được build
+
+        Raises:
+            ValueError: Nếu file không phải bộ lọc hợp lệ
+        """
+        if not os.path.exists(path):
+            logger.info(f"Chưa có bộ lọc mật khẩu đã lộ tại {path}")
+            return False
+
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _HEADER_SIZE:
+            mapped.close()
+            raise ValueError(f"File bộ lọc mật khẩu không hợp lệ: {path}")
+        magic, version, hash_count, bit_count, item_count, false_positive_rate = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC or version != _VERSION or len(mapped) != _HEADER_SIZE + (bit_count + 7) // 8:
+            mapped.close()
+            raise ValueError(f"File bộ lọc mật khẩu không hợp lệ: {path}")
+
+        self.close()
+        self.path = path
+        self.hash_count, self.bit_count = hash_count, bit_count
+        self.item_count, self.false_positive_rate = item_count, false_positive_rate
+        self._mmap = mapped
+        self._bits = np.frombuffer(mapped, dtype=np.uint8, offset=_HEADER_SIZE)
+        return True
+
+    def close(self) -> None:
+        """Bỏ ánh xạ bộ nhớ hiện tại"""
+        # Mảng numpy giữ tham chiếu tới vùng nhớ, phải bỏ trước khi đóng mmap
+        self._bits = None
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+        self.path = None
+
+    def contains_digest(self, digest: bytes) -> bool:
+        """Mã SHA-1 có (có thể) nằm trong kho mật khẩu đã lộ; False nếu chưa load bộ lọc"""
+        mapped = self._mmap
+        if mapped is None:
+            return False
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little")
+        bit_count = self.bit_count
+        for i in range(self.hash_count):
+            position = ((h1 + i * h2) & _MASK64) % bit_count
+            if not mapped[_HEADER_SIZE + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(password_digest(password))
+
+    def check(self, password: str) -> Optional[bool]:
+        """Mật khẩu có trong kho đã lộ không; None nếu chưa có bộ lọc"""
+        return password in self if self.loaded else None
+
+    def check_many(self, digests: Iterable[bytes]) -> np.ndarray:
+        """Kiểm tra hàng loạt các mã SHA-1 (vector hóa trên mảng bit đã map)
+
+        Raises:
+            ValueError: Nếu chưa load bộ lọc
+        """
+        if self._bits is None:
+            raise ValueError("Chưa có bộ lọc mật khẩu đã lộ")
+        chunk = b"".join(digest[:16] for digest in digests)
+        hashes = np.frombuffer(chunk, dtype="<u8").reshape(-1, 2)
+        found = np.ones(len(hashes), dtype=bool)
+        for positions in _bit_positions(hashes, self.bit_count, self.hash_count):
+            masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+            found &= (self._bits[positions >> np.uint64(3)] & masks) != 0
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        """Thông số của bộ lọc đang dùng"""
+        return {
+            "loaded": self.loaded,
+            "item_count": self.item_count,
+            "bit_count": self.bit_count,
+            "hash_count": self.hash_count,
+            "false_positive_rate": self.false_positive_rate,
+            "nbytes": len(self._mmap) if self._mmap is not None else 0,
+        }
+
+
+# Bộ lọc dùng chung trong service, được load trong lifespan của FastAPI
+breached_passwords = BreachFilter()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Build Bloom filter mật khẩu đã lộ từ kho mật khẩu cục bộ")
+    parser.add_argument("--corpus", required=True, help="File kho mật khẩu (mỗi dòng một mật khẩu hoặc mã SHA-1)")
+    parser.add_argument("--output", default=DEFAULT_BREACH_FILTER_PATH, help="File bộ lọc cần ghi")
+    parser.add_argument("--fp-rate", type=float, default=DEFAULT_FALSE_POSITIVE_RATE, help="Tỉ lệ dương tính giả")
+    parser.add_argument("--format", choices=[FORMAT_PLAIN, FORMAT_SHA1], default=FORMAT_PLAIN, help="Định dạng kho")
+    args = parser.parse_args()
+    built = build_breach_filter(args.corpus, args.output, args.fp_rate, args.format)
+    print(f"Đã build bộ lọc {built['item_count']} mật khẩu ({built['nbytes']} byte) vào {args.output}")
@@ -0,0 +1,167 @@
+"""
+Bulk Stream: Đọc/ghi dạng luồng cho phân tích hàng loạt số điện thoại
+
+Dùng cho endpoint `POST /api/batcuclinh_so/analyze_bulk`: thân request (CSV, NDJSON hoặc mỗi dòng
+một số) được đọc dần theo từng khối byte, tách thành các chunk có kích thước cố định để phân tích
+bằng `analyze_phone_numbers_batch`, và kết quả được ghi ra NDJSON hoặc CSV theo từng chunk.
+Bộ nhớ dùng chỉ phụ thuộc kích thước chunk, không phụ thuộc kích thước đầu vào.
+
+Mỗi bản ghi đầu vào có một `offset` (thứ tự bản ghi, bắt đầu từ 0, không tính dòng trống và dòng
+tiêu đề CSV). Bản ghi cuối của luồng kết quả cho biết trạng thái và `next_offset` để chạy tiếp
+công việc bị dừng giữa chừng (hết quota, mất kết nối) bằng cách gửi lại đầu vào với `offset` đó.
+"""
+
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tools.batcuclinhso_analysis.batch_analyzer import luck_level_names
+
+INPUT_CSV = "csv"
+INPUT_NDJSON = "ndjson"
+INPUT_TEXT = "text"
+
+OUTPUT_NDJSON = "ndjson"
+OUTPUT_CSV = "csv"
+OUTPUT_MEDIA_TYPES = {OUTPUT_NDJSON: "application/x-ndjson", OUTPUT_CSV: "text/csv"}
+
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", 10000))
+# Độ dài tối đa của một dòng đầu vào, tránh giữ cả thân request khi không có ký tự xuống dòng
+MAX_LINE_LENGTH = 4096
+
+# Tên cột chứa số điện thoại trong CSV có dòng tiêu đề (không có thì dùng cột đầu tiên)
+CSV_NUMBER_COLUMNS = ("phone_number", "phone", "number", "so_dien_thoai")
+RESULT_COLUMNS = ("offset", "input", "phone_number", "valid", "total_score", "luck_level", "matched_count")
+
+STATUS_COMPLETE = "complete"
+STATUS_QUOTA_EXCEEDED = "quota_exceeded"
+STATUS_ERROR = "error"
+
+
+def input_format_for(content_type: Optional[str]) -> str:
+    """Định dạng đầu vào theo Content-Type của request"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("text/csv", "application/csv"):
+        return INPUT_CSV
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return INPUT_NDJSON
+    return INPUT_TEXT
+
+
+async def iter_lines(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Tách luồng byte (UTF-8) thành các dòng, không giữ quá một dòng trong bộ nhớ
+
+    Raises:
+        ValueError: Nếu một dòng dài hơn MAX_LINE_LENGTH
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for data in byte_chunks:
+        buffer += decoder.decode(data)
+        *lines, buffer = buffer.split("\n")
+        if len(buffer) > MAX_LINE_LENGTH:
+            raise ValueError(f"Dòng đầu vào dài quá {MAX_LINE_LENGTH} ký tự")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def _ndjson_number(line: str) -> str:
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return line
+    if isinstance(value, dict):
+        value = next((value[key] for key in CSV_NUMBER_COLUMNS if key in value), "")
+    return str(value)
+
+
+async def iter_numbers(byte_chunks: AsyncIterator[bytes], input_format: str) -> AsyncIterator[str]:
+    """Các số điện thoại (chuỗi gốc) trong thân request, bỏ qua dòng trống và dòng tiêu đề CSV
+
+    - CSV: cột có tên trong CSV_NUMBER_COLUMNS nếu dòng đầu là tiêu đề, ngược lại cột đầu tiên
+    - NDJSON: mỗi dòng là một chuỗi JSON hoặc một object có khóa `phone_number`
+    - Văn bản: mỗi dòng một số
+    """
+    column: Optional[int] = None
+    async for line in iter_lines(byte_chunks):
+        if not line.strip():
+            continue
+        if input_format == INPUT_CSV:
+            fields = next(csv.reader([line]), [""])
+            if column is None:
+                header = [field.strip().lower() for field in fields]
+                column = next((header.index(name) for name in CSV_NUMBER_COLUMNS if name in header), 0)
+                if not any(char.isdigit() for char in line):
+                    continue
+            yield fields[column].strip() if column < len(fields) else ""
+        elif input_format == INPUT_NDJSON:
+            yield _ndjson_number(line)
+        else:
+            yield line.strip()
+
+
+async def iter_chunks(
+    numbers: AsyncIterator[str], chunk_size: int, offset: int = 0
+) -> AsyncIterator[Tuple[int, List[str]]]:
+    """Gom các bản ghi thành chunk (offset bản ghi đầu, danh sách số), bỏ qua `offset` bản ghi đầu"""
+    position = 0
+    chunk: List[str] = []
+    async for number in numbers:
+        if position >= offset:
+            chunk.append(number)
+            if len(chunk) == chunk_size:
+                yield position + 1 - chunk_size, chunk
+                chunk = []
+        position += 1
+    if chunk:
+        yield position - len(chunk), chunk
+
+
+def result_rows(offset: int, numbers: List[str], batch: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Các dòng kết quả của một chunk từ kết quả dạng cột của analyze_phone_numbers_batch"""
+    valid = batch["valid"]
+    digits = (batch["digits"] + ord("0")).astype(np.uint8)
+    luck_levels = luck_level_names(batch["luck_level"])
+    rows = []
+    for index, number in enumerate(numbers):
+        ok = bool(valid[index])
+        rows.append({
+            "offset": offset + index,
+            "input": number,
+            "phone_number": digits[index].tobytes().decode("ascii") if ok else "",
+            "valid": ok,
+            "total_score": float(batch["total_score"][index]) if ok else None,
+            "luck_level": luck_levels[index],
+            "matched_count": int(batch["matched_count"][index]),
+        })
+    return rows
+
+
+def format_rows(rows: List[Dict[str, Any]], output_format: str, header: bool = False) -> str:
+    """Ghi các dòng kết quả ra NDJSON hoặc CSV (kèm dòng tiêu đề nếu `header`)"""
+    if output_format == OUTPUT_NDJSON:
+        return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=RESULT_COLUMNS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def format_trailer(status: str, next_offset: int, processed: int, output_format: str, detail: str = "") -> str:
+    """Bản ghi cuối của luồng kết quả (dòng chú thích `#` với CSV)"""
+    trailer = {"status": status, "next_offset": next_offset, "processed": processed}
+    if detail:
+        trailer["detail"] = detail
+    if output_format == OUTPUT_NDJSON:
+        return json.dumps(trailer, ensure_ascii=False) + "\n"
+    return "# " + " ".join(f"{key}={value}" for key, value in trailer.items()) + "\n"
@@ -4,8 +4,15 @@ CCCD Analyzer Tool for Bát Cục Linh Số method
 
 from google.adk.tools import FunctionTool
 from typing import Dict, Any, Optional
-from constants.bat_tinh import BAT_TINH
-from constants.combinations import COMBINATIONS
+from tools.batcuclinhso_analysis.digit_kernel import digit_profile
+from tools.batcuclinhso_analysis.result_cache import analysis_cache
+from tools.batcuclinhso_analysis.rule_tables import (
+    COMBINATION_INFO,
+    COMBINATION_KEYS,
+    STAR_INFO,
+    STAR_KEYS,
+    adjacent_combinations,
+)
 
 def cccd_analyzer(cccd_number: str, purpose: Optional[str] = None) -> Dict[str, Any]:
     """Phân tích số CCCD theo phương pháp Bát Cục Linh Số.
@@ -17,12 +24,18 @@ def cccd_analyzer(cccd_number: str, purpose: Optional[str] = None) -> Dict[str,
     Returns:
         Kết quả phân tích chi tiết.
     """
+    # Nếu là 6 số cuối, thêm 6 số đầu giả định
+    if len(cccd_number) == 6 and cccd_number.isdigit():
+        cccd_number = "199901" + cccd_number  # Thêm một ngày sinh giả định
+    
+    return analysis_cache.get_or_compute(
+        "cccd", (cccd_number, purpose), lambda: _analyze_cccd(cccd_number, purpose)
+    )
+
+def _analyze_cccd(cccd_number: str, purpose: Optional[str]) -> Dict[str, Any]:
+    """Phân tích số CCCD 12 chữ số (xem cccd_analyzer)"""
     try:
         # Validate CCCD number
-        # Nếu là 6 số cuối, thêm 6 số đầu giả định
-        if len(cccd_number) == 6 and cccd_number.isdigit():
-            cccd_number = "199901" + cccd_number  # Thêm một ngày sinh giả định
-        
         if not cccd_number.isdigit() or len(cccd_number) != 12:
             raise ValueError("Invalid CCCD number format. Must be 12 digits.")
 
@@ -32,45 +45,34 @@ def cccd_analyzer(cccd_number: str, purpose: Optional[str] = None) -> Dict[str,
         birth_day = int(cccd_number[6:8])
         last_four = cccd_number[8:12]
 
-        # Calculate Bát Tinh numbers
-        bat_tinh_numbers = []
-        for i in range(0, 12, 2):
-            pair = cccd_number[i:i+2]
-            bat_tinh_numbers.append(pair)
-
-        # Analyze each pair
+        # Các cặp Bát Tinh (0-1, 2-3, ...) lấy từ lõi phân tích chữ số
         analysis = []
+        star_ids = []
         total_energy = 0
-        for number in bat_tinh_numbers:
-            for tinh, info in BAT_TINH.items():
-                if number in info["numbers"]:
-                    pair_energy = info["energy"].get(number, 2)
-                    total_energy += pair_energy
-                    analysis.append({
-                        "number": number,
-                        "tinh": tinh,
-                        "name": info["name"],
-                        "description": info["description"],
-                        "energy": pair_energy,
-                        "position": info["position"],
-                        "nature": info["nature"]
-                    })
-                    break
+        for number, star_id, pair_energy in digit_profile(cccd_number).aligned_pairs():
+            info = STAR_INFO[star_id]
+            star_ids.append(star_id)
+            total_energy += pair_energy
+            analysis.append({
+                "number": number,
+                "tinh": STAR_KEYS[star_id],
+                "name": info["name"],
+                "description": info["description"],
+                "energy": pair_energy,
+                "position": info["position"],
+                "nature": info["nature"]
+            })
 
-        # Analyze combinations
+        # Analyze combinations (tra ma trận tổ hợp theo id sao)
         combinations = []
-        for i in range(len(analysis) - 1):
-            current = analysis[i]
-            next_tinh = analysis[i + 1]
-            combination_key = f"{current['tinh']}_{next_tinh['tinh']}"
-            
-            if combination_key in COMBINATIONS:
-                combinations.append({
-                    "numbers": f"{current['number']}-{next_tinh['number']}",
-                    "combination": combination_key,
-                    "description": COMBINATIONS[combination_key]["description"],
-                    "detailed_description": COMBINATIONS[combination_key]["detailedDescription"]
-                })
+        for index, combination_id in adjacent_combinations(star_ids):
+            combination = COMBINATION_INFO[combination_id]
+            combinations.append({
+                "numbers": f"{analysis[index]['number']}-{analysis[index + 1]['number']}",
+                "combination": COMBINATION_KEYS[combination_id],
+                "description": combination["description"],
+                "detailed_description": combination["detailedDescription"]
+            })
 
         # Tính toán tổng điểm và mức may mắn
         avg_energy = total_energy / len(analysis) if analysis else 0
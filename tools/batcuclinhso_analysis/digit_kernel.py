@@ -0,0 +1,78 @@
+"""
+Digit Kernel: Lõi phân tích chữ số dùng chung cho các analyzer
+
+Các analyzer số điện thoại, CCCD, tài khoản ngân hàng và chuỗi số đều cần cùng một nhóm đại lượng
+của chuỗi chữ số. `digit_profile` tính tất cả trong một lần gọi và trả về `DigitProfile` gọn
+(chỉ gồm số nguyên), mỗi analyzer chỉ còn là một lớp trình bày trên kết quả này:
+
+- `pair_codes`: mã các cặp liền kề chồng lấn (10 * a + b) tại vị trí 0, 1, ..., n - 2
+- `star_ids` / `energies`: sao Bát Tinh và năng lượng của các cặp không chồng lấn
+  (vị trí 0, 2, 4, ...), NO_STAR / 0 nếu cặp không thuộc sao nào
+- `histogram`: tần suất từng chữ số 0-9
+- `digit_sum` / `digit_root`: tổng các chữ số và số năng lượng (1-9, 0 nếu chuỗi rỗng)
+
+Kết quả được ghi nhớ theo chuỗi chữ số (LRU) nên mọi analyzer dùng chung một cache.
+"""
+
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+from tools.batcuclinhso_analysis.rule_tables import NO_STAR, PAIR_ENERGY, PAIR_STAR
+
+PROFILE_CACHE_SIZE = 8192
+
+
+class DigitProfile(NamedTuple):
+    """Kết quả trung gian dạng gọn của một chuỗi chữ số"""
+    digits: str
+    pair_codes: Tuple[int, ...]
+    star_ids: Tuple[int, ...]
+    energies: Tuple[float, ...]
+    histogram: Tuple[int, ...]
+    digit_sum: int
+    digit_root: int
+
+    def pair(self, code_index: int) -> str:
+        """Cặp số (chuỗi 2 chữ số) bắt đầu tại vị trí `code_index`"""
+        return self.digits[code_index:code_index + 2]
+
+    def aligned_pairs(self) -> List[Tuple[str, int, float]]:
+        """Các cặp không chồng lấn thuộc một sao: (cặp số, id sao, năng lượng) theo thứ tự"""
+        return [
+            (self.pair(2 * index), star_id, energy)
+            for index, (star_id, energy) in enumerate(zip(self.star_ids, self.energies))
+            if star_id != NO_STAR
+        ]
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def digit_profile(digits: str) -> DigitProfile:
+    """Tính DigitProfile của một chuỗi chữ số ASCII
+
+    Args:
+        digits: Chuỗi chỉ gồm các chữ số 0-9 (có thể rỗng)
+
+    Returns:
+        DigitProfile: Kết quả trung gian dùng chung cho các analyzer
+
+    Raises:
+        ValueError: Nếu chuỗi chứa ký tự không phải chữ số 0-9
+    """
+    if digits and not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"Chuỗi chữ số không hợp lệ: {digits!r}")
+
+    values = digits.encode("ascii")
+    # Mã cặp 10 * a + b tính thẳng trên mã ASCII: 10 * (x - 48) + (y - 48) = 10 * x + y - 528
+    pair_codes = tuple([10 * first + second - 528 for first, second in zip(values, values[1:])])
+    aligned = pair_codes[::2]
+    digit_sum = sum(values) - 48 * len(values)
+    # Tạo theo vị trí (nhanh hơn theo từ khóa): digits, pair_codes, star_ids, energies, histogram, ...
+    return DigitProfile(
+        digits,
+        pair_codes,
+        tuple(map(PAIR_STAR.__getitem__, aligned)),
+        tuple(map(PAIR_ENERGY.__getitem__, aligned)),
+        tuple(map(digits.count, "0123456789")),
+        digit_sum,
+        (digit_sum % 9 or 9) if digits else 0,
+    )
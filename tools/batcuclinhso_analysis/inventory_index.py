@@ -0,0 +1,470 @@
+"""
+Inventory Index: Chỉ mục ngược cho kho số của đại lý SIM
+
+Đại lý cần các truy vấn dạng "mọi số trong kho kết thúc bằng SINH_KHI → THIEN_Y, không có
+TUYET_MENH và điểm ≥ 8". Kho số được phân tích một lần bằng `analyze_phone_numbers_batch`
+(các bảng BAT_TINH/COMBINATIONS đã biên dịch trong `rule_tables`) rồi lưu dạng cột gọn:
+
+- `numbers` (int64): số điện thoại 10 chữ số dạng số nguyên, 8 byte/số
+- `star_ids` (N x 5, uint8) và `combination_ids` (N x 4, int8): sao từng cặp và tổ hợp sao
+- `score_codes` (uint8): mã điểm như `score_table`, giải mã qua SCORE_BY_CODE / LUCK_BY_CODE
+
+Các danh sách ngược (posting list) được lưu dạng CSR: một mảng id dòng int32 đã sắp xếp cho
+mỗi khóa, ghép liền nhau, kèm mảng vị trí bắt đầu của từng khóa:
+
+- (vị trí cặp, sao): 5 x (NO_STAR + 1) khóa
+- id tổ hợp: mỗi dòng xuất hiện tối đa một lần trong danh sách của một tổ hợp
+- mã điểm: 256 khóa, điều kiện khoảng điểm là hợp của các mã thỏa mãn
+
+Truy vấn hội (AND) được trả lời bằng phép giao các danh sách, bắt đầu từ danh sách ngắn nhất;
+điều kiện loại trừ và khoảng điểm được lọc trực tiếp trên các cột của tập ứng viên. Khi xếp hạng
+theo mục đích, điểm phù hợp được tính theo từng khối PURPOSE_CHUNK_SIZE dòng bằng một phép nhân
+ma trận (`purpose_scoring`) từ cột `star_ids`, chỉ giữ lại offset + limit dòng tốt nhất. Tổng bộ nhớ
+khoảng 50 byte/số, nên vài triệu số vẫn nằm gọn trong bộ nhớ của một worker.
+
+Các cột của kho số được lưu thành một file .npz cho mỗi đại lý trong thư mục dùng chung
+(INVENTORY_DIR), ghi nguyên tử bằng os.replace. Mỗi worker giữ chỉ mục đã dựng trong bộ nhớ và
+đọc lại khi file thay đổi (so sánh stat), nên nhiều worker (và các lần khởi động lại) luôn thấy
+cùng một kho số. Kho số được ghi với bộ quy tắc cũ được phân tích lại từ cột `numbers` khi đọc.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from tools.batcuclinhso_analysis.batch_analyzer import PAIR_COUNT, PHONE_LENGTH, analyze_phone_numbers_batch
+from tools.batcuclinhso_analysis.purpose_scoring import PURPOSE_INDEX, PURPOSE_KEYS, purpose_scores, star_histogram
+from tools.batcuclinhso_analysis.rule_tables import (
+    COMBINATION_KEYS,
+    LUCK_LEVELS,
+    NO_COMBINATION,
+    NO_STAR,
+    STAR_IDS,
+    RULES_VERSION,
+    STAR_KEYS,
+    resolve_purpose,
+)
+from tools.batcuclinhso_analysis.score_table import LUCK_BY_CODE, SCORE_BY_CODE, encode_scores
+
+# Số lượng số tối đa của một kho (mặc định 5 triệu số, khoảng 250MB chỉ mục)
+MAX_INVENTORY_SIZE = int(os.environ.get("MAX_INVENTORY_SIZE", 5_000_000))
+INGEST_CHUNK_SIZE = 100_000
+# Số dòng mỗi lượt tính điểm phù hợp mục đích khi xếp hạng (giới hạn bộ nhớ tạm của một truy vấn)
+PURPOSE_CHUNK_SIZE = 65_536
+# Thư mục lưu kho số, phải dùng chung giữa các worker (cùng máy hoặc ổ mạng)
+DEFAULT_INVENTORY_DIR = os.environ.get(
+    "INVENTORY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "inventories"),
+)
+
+logger = logging.getLogger(__name__)
+
+_STAR_KEY_COUNT = NO_STAR + 1
+_COMBINATION_IDS: Dict[str, int] = {key: combination_id for combination_id, key in enumerate(COMBINATION_KEYS)}
+_PLACE_VALUES = 10 ** np.arange(PHONE_LENGTH - 1, -1, -1, dtype=np.int64)
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _star_id(star_key: str) -> int:
+    star_id = STAR_IDS.get(star_key.strip().upper())
+    if star_id is None:
+        raise ValueError(f"Sao không hợp lệ: {star_key!r}")
+    return star_id
+
+
+def _combination_id(combination_key: str) -> int:
+    combination_id = _COMBINATION_IDS.get(combination_key.strip().upper())
+    if combination_id is None:
+        raise ValueError(f"Tổ hợp sao không hợp lệ: {combination_key!r}")
+    return combination_id
+
+
+class PostingLists:
+    """Các danh sách id dòng đã sắp xếp theo khóa, lưu dạng CSR (rows + starts)"""
+
+    def __init__(self, keys: np.ndarray, rows: np.ndarray, key_count: int):
+        """
+        Args:
+            keys: Khóa của từng cặp (khóa, dòng), giá trị trong [0, key_count)
+            rows: Id dòng tương ứng, tăng dần (không giảm) theo thứ tự đầu vào
+            key_count: Số lượng khóa
+        """
+        # Sắp xếp ổn định theo khóa giữ nguyên thứ tự tăng dần của id dòng trong mỗi khóa
+        order = np.argsort(keys, kind="stable")
+        self.rows = rows[order].astype(np.int32)
+        self.starts = np.zeros(key_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=key_count), out=self.starts[1:])
+
+    def __getitem__(self, key: int) -> np.ndarray:
+        return self.rows[self.starts[key]:self.starts[key + 1]]
+
+    def size(self, key: int) -> int:
+        return int(self.starts[key + 1] - self.starts[key])
+
+    def union(self, keys: Iterable[int]) -> np.ndarray:
+        """Hợp (đã sắp xếp, không trùng) của các danh sách theo khóa"""
+        lists = [self[key] for key in keys]
+        if not lists:
+            return _EMPTY
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.starts.nbytes
+
+
+class InventoryIndex:
+    """Chỉ mục ngược (bất biến) của một kho số điện thoại"""
+
+    def __init__(
+        self,
+        numbers: np.ndarray,
+        star_ids: np.ndarray,
+        combination_ids: np.ndarray,
+        score_codes: np.ndarray,
+    ):
+        self.numbers = numbers
+        self.star_ids = star_ids
+        self.combination_ids = combination_ids
+        self.score_codes = score_codes
+
+        count = len(numbers)
+        rows = np.arange(count, dtype=np.int32)
+
+        # Khóa (vị trí cặp, sao) = vị trí * (NO_STAR + 1) + id sao, duyệt theo dòng nên id dòng tăng dần
+        position_keys = np.arange(PAIR_COUNT) * _STAR_KEY_COUNT + star_ids.astype(np.int64)
+        self._positions = PostingLists(
+            position_keys.ravel(), np.repeat(rows, PAIR_COUNT), PAIR_COUNT * _STAR_KEY_COUNT
+        )
+
+        # Mỗi (dòng, tổ hợp) chỉ giữ một lần dù tổ hợp xuất hiện nhiều lần trong số
+        combination_count = len(COMBINATION_KEYS)
+        present = combination_ids != NO_COMBINATION
+        pairs = np.unique(
+            np.repeat(rows.astype(np.int64), combination_ids.shape[1])[present.ravel()] * combination_count
+            + combination_ids[present].astype(np.int64)
+        )
+        self._combinations = PostingLists(
+            pairs % combination_count, pairs // combination_count, combination_count
+        )
+
+        self._scores = PostingLists(score_codes.astype(np.int64), rows, 256)
+
+    @classmethod
+    def build(cls, numbers: Iterable[str], chunk_size: int = INGEST_CHUNK_SIZE) -> "InventoryIndex":
+        """Phân tích và đánh chỉ mục một danh sách số điện thoại (theo từng chunk)"""
+        builder = InventoryBuilder()
+        chunk: List[str] = []
+        for number in numbers:
+            chunk.append(number)
+            if len(chunk) == chunk_size:
+                builder.add(chunk)
+                chunk = []
+        if chunk:
+            builder.add(chunk)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    @property
+    def nbytes(self) -> int:
+        """Bộ nhớ dùng cho các cột và danh sách ngược"""
+        columns = self.numbers.nbytes + self.star_ids.nbytes + self.combination_ids.nbytes + self.score_codes.nbytes
+        return columns + self._positions.nbytes + self._combinations.nbytes + self._scores.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {"count": len(self), "memory_bytes": self.nbytes}
+
+    def _score_rows(self, min_score: Optional[float], max_score: Optional[float]) -> np.ndarray:
+        codes = np.flatnonzero(
+            (self._scores.starts[1:] > self._scores.starts[:-1])
+            & (SCORE_BY_CODE >= (min_score if min_score is not None else -np.inf))
+            & (SCORE_BY_CODE <= (max_score if max_score is not None else np.inf))
+        )
+        return self._scores.union(codes)
+
+    def matching_rows(
+        self,
+        positions: Optional[Mapping[int, str]] = None,
+        starting: Optional[Sequence[str]] = None,
+        ending: Optional[Sequence[str]] = None,
+        include_stars: Optional[Sequence[str]] = None,
+        exclude_stars: Optional[Sequence[str]] = None,
+        combinations: Optional[Sequence[str]] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+    ) -> np.ndarray:
+        """Id dòng (tăng dần) thỏa mãn đồng thời mọi điều kiện
+
+        Args:
+            positions: Sao bắt buộc tại từng vị trí cặp (0-4), ví dụ {3: "SINH_KHI"}
+            starting: Chuỗi sao của các cặp đầu tiên, ví dụ ["THIEN_Y"]
+            ending: Chuỗi sao của các cặp cuối cùng, ví dụ ["SINH_KHI", "THIEN_Y"]
+            include_stars: Các sao phải xuất hiện (ở vị trí bất kỳ)
+            exclude_stars: Các sao không được xuất hiện
+            combinations: Các tổ hợp sao phải xuất hiện, ví dụ ["SINH_KHI_THIEN_Y"]
+            min_score, max_score: Khoảng điểm (bao gồm hai đầu)
+
+        Raises:
+            ValueError: Nếu sao, tổ hợp hoặc vị trí không hợp lệ
+        """
+        required: Dict[int, int] = {}
+        constraints = list((positions or {}).items())
+        constraints += list(enumerate(starting or []))
+        constraints += [(PAIR_COUNT - len(ending) + index, star) for index, star in enumerate(ending or [])]
+        for position, star_key in constraints:
+            if not 0 <= position < PAIR_COUNT:
+                raise ValueError(f"Vị trí cặp phải nằm trong khoảng 0-{PAIR_COUNT - 1}")
+            star_id = _star_id(star_key)
+            if required.setdefault(position, star_id) != star_id:
+                return _EMPTY
+
+        postings = [self._positions[position * _STAR_KEY_COUNT + star_id] for position, star_id in required.items()]
+        postings += [self._combinations[_combination_id(key)] for key in combinations or []]
+        for star_key in include_stars or []:
+            star_id = _star_id(star_key)
+            postings.append(self._positions.union(
+                position * _STAR_KEY_COUNT + star_id for position in range(PAIR_COUNT)
+            ))
+        excluded = [_star_id(star_key) for star_key in exclude_stars or []]
+        has_score_range = min_score is not None or max_score is not None
+
+        if not postings:
+            if not has_score_range:
+                candidates = np.arange(len(self), dtype=np.int32)
+            else:
+                candidates = self._score_rows(min_score, max_score)
+                has_score_range = False
+        else:
+            # Giao từ danh sách ngắn nhất để tập ứng viên nhỏ nhất có thể ngay từ đầu
+            postings.sort(key=len)
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not candidates.size:
+                    break
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+
+        if has_score_range and candidates.size:
+            scores = SCORE_BY_CODE[self.score_codes[candidates]]
+            keep = np.ones(candidates.size, dtype=bool)
+            if min_score is not None:
+                keep &= scores >= min_score
+            if max_score is not None:
+                keep &= scores <= max_score
+            candidates = candidates[keep]
+        if excluded and candidates.size:
+            candidates = candidates[~np.isin(self.star_ids[candidates], excluded).any(axis=1)]
+        return candidates
+
+    def purpose_match_scores(self, rows: np.ndarray) -> np.ndarray:
+        """Điểm phù hợp (0-10) của các dòng với mọi mục đích: (len(rows), P) theo PURPOSE_KEYS"""
+        return purpose_scores(star_histogram(self.star_ids[rows])).match_scores
+
+    def _top_by_purpose(self, rows: np.ndarray, purpose_index: int, count: int) -> tuple:
+        """`count` dòng có điểm tổng hợp cao nhất (rồi số tăng dần), tính theo từng khối dòng
+
+        Returns:
+            tuple: (id dòng, điểm tổng hợp) đã sắp xếp
+        """
+        best_rows, best_combined = _EMPTY, np.zeros(0)
+        for start in range(0, rows.size, PURPOSE_CHUNK_SIZE):
+            chunk = rows[start:start + PURPOSE_CHUNK_SIZE]
+            combined = (SCORE_BY_CODE[self.score_codes[chunk]] + self.purpose_match_scores(chunk)[:, purpose_index]) / 2
+            candidates = np.concatenate([best_rows, chunk])
+            combined = np.concatenate([best_combined, combined])
+            keep = np.lexsort((self.numbers[candidates], -combined))[:count]
+            best_rows, best_combined = candidates[keep], combined[keep]
+        return best_rows, best_combined
+
+    def describe(self, row: int, purpose_match: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Bản ghi kết quả của một dòng (kèm điểm phù hợp từng mục đích nếu có)"""
+        code = self.score_codes[row]
+        record = {
+            "phone_number": f"{self.numbers[row]:0{PHONE_LENGTH}d}",
+            "total_score": float(SCORE_BY_CODE[code]),
+            "luck_level": LUCK_LEVELS[LUCK_BY_CODE[code]],
+            "stars": [STAR_KEYS[star_id] if star_id != NO_STAR else None for star_id in self.star_ids[row]],
+            "combinations": [
+                COMBINATION_KEYS[combination_id]
+                for combination_id in self.combination_ids[row] if combination_id != NO_COMBINATION
+            ],
+        }
+        if purpose_match is not None:
+            record["purpose_scores"] = {key: float(score) for key, score in zip(PURPOSE_KEYS, purpose_match)}
+        return record
+
+    def search(
+        self, limit: int = 20, offset: int = 0, purpose: Optional[str] = None, **conditions: Any
+    ) -> Dict[str, Any]:
+        """Truy vấn hội có phân trang, kết quả sắp theo điểm giảm dần rồi theo số tăng dần
+
+        Args:
+            limit: Số kết quả tối đa của trang
+            offset: Số kết quả bỏ qua
+            purpose: Mục đích sử dụng (tùy chọn); nếu nhận diện được, xếp hạng theo điểm tổng hợp
+                (điểm + điểm phù hợp mục đích) / 2 giống suggest_phone_numbers
+            **conditions: Các điều kiện của matching_rows
+
+        Returns:
+            Dict[str, Any]: Tổng số kết quả (`total`), offset, limit và các số của trang (`numbers`);
+                khi có mục đích, mỗi số kèm `combined_score` và điểm phù hợp mọi mục đích (`purpose_scores`)
+        """
+        purpose_key = resolve_purpose(purpose)
+        rows = self.matching_rows(**conditions)
+        if purpose_key is None:
+            # Mã điểm tăng theo tổng năng lượng chứ không theo điểm, nên sắp xếp theo điểm đã giải mã
+            scores = SCORE_BY_CODE[self.score_codes[rows]]
+            page = rows[np.lexsort((self.numbers[rows], -scores))[offset:offset + limit]]
+            records = [self.describe(row) for row in page]
+        else:
+            best_rows, best_combined = self._top_by_purpose(rows, PURPOSE_INDEX[purpose_key], offset + limit)
+            page_rows, page_combined = best_rows[offset:], best_combined[offset:]
+            purpose_match = self.purpose_match_scores(page_rows)
+            records = []
+            for position, row in enumerate(page_rows):
+                record = self.describe(row, purpose_match[position])
+                record["combined_score"] = float(page_combined[position])
+                records.append(record)
+        return {
+            "total": int(rows.size),
+            "offset": offset,
+            "limit": limit,
+            "numbers": records,
+        }
+
+
+class InventoryBuilder:
+    """Gom kết quả phân tích theo từng chunk rồi dựng InventoryIndex (bỏ số không hợp lệ và số trùng)"""
+
+    def __init__(self, max_size: int = MAX_INVENTORY_SIZE):
+        self.max_size = max_size
+        self.count = 0
+        self.invalid = 0
+        self._columns: List[tuple] = []
+
+    def add_batch(self, batch: Dict[str, np.ndarray]) -> None:
+        """Thêm kết quả của analyze_phone_numbers_batch
+
+        Raises:
+            ValueError: Nếu kho vượt quá số lượng tối đa
+        """
+        valid = batch["valid"]
+        self.invalid += int(valid.size - valid.sum())
+        self.count += int(valid.sum())
+        if self.count > self.max_size:
+            raise ValueError(f"Kho số vượt quá {self.max_size} số")
+        energy_sum = batch["pair_energy"][valid].sum(axis=1)
+        self._columns.append((
+            batch["digits"][valid].astype(np.int64) @ _PLACE_VALUES,
+            batch["star_ids"][valid],
+            batch["combination_ids"][valid],
+            encode_scores(energy_sum, batch["matched_count"][valid]),
+        ))
+
+    def add(self, numbers: Union[np.ndarray, Sequence[str]]) -> None:
+        self.add_batch(analyze_phone_numbers_batch(numbers))
+
+    def build(self) -> InventoryIndex:
+        if not self._columns:
+            return InventoryIndex(
+                np.zeros(0, dtype=np.int64),
+                np.zeros((0, PAIR_COUNT), dtype=np.uint8),
+                np.zeros((0, PAIR_COUNT - 1), dtype=np.int8),
+                np.zeros(0, dtype=np.uint8),
+            )
+        numbers, star_ids, combination_ids, score_codes = (np.concatenate(column) for column in zip(*self._columns))
+        self._columns = []
+        # Giữ lần xuất hiện đầu tiên của mỗi số, theo thứ tự số tăng dần
+        numbers, first = np.unique(numbers, return_index=True)
+        return InventoryIndex(numbers, star_ids[first], combination_ids[first], score_codes[first])
+
+
+class InventoryStore:
+    """Các kho số đã đánh chỉ mục theo chủ sở hữu (đại lý), lưu trong thư mục dùng chung giữa các worker
+
+    File là nguồn dữ liệu gốc; chỉ mục trong bộ nhớ chỉ là cache, được đọc lại khi file của chủ sở
+    hữu được worker khác ghi đè hoặc xóa.
+    """
+
+    def __init__(self, directory: str = DEFAULT_INVENTORY_DIR):
+        self.directory = directory
+        # Chủ sở hữu -> (stat của file lúc đọc, chỉ mục)
+        self._indexes: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, owner: str) -> str:
+        # Id chủ sở hữu có thể chứa ký tự bất kỳ, tên file dùng giá trị băm
+        return os.path.join(self.directory, hashlib.sha256(owner.encode("utf-8")).hexdigest()[:32] + ".npz")
+
+    @staticmethod
+    def _signature(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    @staticmethod
+    def _read(path: str) -> InventoryIndex:
+        with np.load(path) as data:
+            if str(data["rules_version"]) != RULES_VERSION:
+                logger.info(f"Kho số {path} được ghi với bộ quy tắc cũ, phân tích lại")
+                return InventoryIndex.build(f"{number:010d}" for number in data["numbers"].tolist())
+            return InventoryIndex(data["numbers"], data["star_ids"], data["combination_ids"], data["score_codes"])
+
+    def put(self, owner: str, index: InventoryIndex) -> None:
+        """Thay thế kho số của chủ sở hữu (file mới được ghi xong trước khi thay)"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(owner)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                rules_version=np.array(RULES_VERSION),
+                numbers=index.numbers,
+                star_ids=index.star_ids,
+                combination_ids=index.combination_ids,
+                score_codes=index.score_codes,
+            )
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._indexes[owner] = (self._signature(path), index)
+
+    def get(self, owner: str) -> Optional[InventoryIndex]:
+        """Chỉ mục kho số của chủ sở hữu, None nếu chưa tải lên (hoặc đã bị xóa)"""
+        path = self._path(owner)
+        signature = self._signature(path)
+        cached = self._indexes.get(owner)
+        if signature is None:
+            with self._lock:
+                self._indexes.pop(owner, None)
+            return None
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            index = self._read(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._indexes[owner] = (signature, index)
+        return index
+
+    def remove(self, owner: str) -> bool:
+        with self._lock:
+            self._indexes.pop(owner, None)
+        try:
+            os.remove(self._path(owner))
+        except FileNotFoundError:
+            return False
+        return True
+
+
+# Kho số của các đại lý (thư mục INVENTORY_DIR dùng chung giữa các worker)
+inventory_store = InventoryStore()
@@ -2,12 +2,88 @@
 Number Analyzer Tool
 
 Provides functions for analyzing number strings based on Feng Shui principles.
+
+`analyze_number_string` analyzes a whole string at once. For long digit dumps
+(contract numbers, batches concatenated from files) `iter_number_string` and
+`analyze_number_stream` consume a string, an iterable of chunks or a file-like
+object chunk by chunk: only the last digit and the pattern matcher state cross
+chunk boundaries, and the aggregates (score sum, pair and pattern counts) take
+constant memory.
 """
 
-from typing import Dict, List, Any
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple, Union
 
 # Import the Feng Shui data (relative import is correct here)
 from .fengshui_data import NUMBER_PAIRS_MEANING, SINGLE_NUMBER_MEANING
+from .digit_kernel import digit_profile
+from .pattern_matcher import ROOT, SPECIAL_PATTERNS, find_special_patterns, special_pattern_matcher
+from utils.common import extract_digits
+
+
+def _describe_pair(pair: str) -> Tuple[str, str, float]:
+    """(name, meaning, score) of a two-digit pair, falling back to single digit meanings"""
+    if pair in NUMBER_PAIRS_MEANING:
+        info = NUMBER_PAIRS_MEANING[pair]
+        return info["name"], info["meaning"], info["score"]
+
+    # Fallback to single digit analysis if pair not found
+    digit1_info = SINGLE_NUMBER_MEANING.get(pair[0])
+    digit2_info = SINGLE_NUMBER_MEANING.get(pair[1])
+    if digit1_info and digit2_info:
+        avg_score = (digit1_info["score"] + digit2_info["score"]) / 2
+        meaning = f"Kết hợp {pair[0]} ({digit1_info['meaning']}) và {pair[1]} ({digit2_info['meaning']})"
+        return "Cặp số thông thường", meaning, avg_score
+    # Handle case where one or both digits are not in the database (should not happen with 0-9)
+    return "Cặp số không xác định", f"Không thể phân tích cặp số {pair} chi tiết.", 5.0 # Default score
+
+
+# Pair descriptions indexed by pair code (10 * first digit + second digit)
+PAIR_DESCRIPTIONS: Tuple[Tuple[str, str, float], ...] = tuple(_describe_pair(f"{code:02d}") for code in range(100))
+
+# Characters read per chunk from file-like sources and long strings
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+Chunk = Union[str, bytes]
+NumberSource = Union[Chunk, Iterable[Chunk], IO]
+
+
+def _luck_level(total_score: float) -> str:
+    """Luck level description for an average pair score"""
+    if total_score >= 8:
+        return "Rất tốt"
+    elif total_score >= 7:
+        return "Tốt"
+    elif total_score >= 6:
+        return "Khá"
+    elif total_score >= 5:
+        return "Trung bình"
+    return "Kém"
+
+
+def _pair_result(code: int, position: int) -> Dict[str, Any]:
+    name, meaning, score = PAIR_DESCRIPTIONS[code]
+    return {
+        "pair": f"{code:02d}",
+        "position": position,
+        "name": name,
+        "meaning": meaning,
+        "score": score
+    }
+
+
+def _single_digit_result(digit: str) -> Optional[Dict[str, Any]]:
+    """Pseudo pair analysis of a single digit input, None if the digit has no meaning"""
+    single_info = SINGLE_NUMBER_MEANING.get(digit)
+    if single_info is None:
+        return None
+    return {
+        "pair": digit,
+        "position": 1,
+        "name": "Số đơn",
+        "meaning": single_info["meaning"],
+        "score": float(single_info["score"])
+    }
+
 
 def analyze_number_string(number_string: str) -> Dict[str, Any]:
     """
@@ -21,83 +97,197 @@ def analyze_number_string(number_string: str) -> Dict[str, Any]:
         - 'pairs_analysis': A list of dictionaries, each detailing a pair.
         - 'total_score': The average score of all analyzed pairs.
         - 'luck_level': A textual description of the luck level.
+        - 'special_patterns': Special digit patterns found in the string (see pattern_matcher).
     """
-    digits_only = ''.join(filter(str.isdigit, number_string))
+    digits_only = extract_digits(number_string)
     if not digits_only:
         return {
             "pairs_analysis": [],
             "total_score": 0.0,
-            "luck_level": "Không xác định (không có số)"
+            "luck_level": "Không xác định (không có số)",
+            "special_patterns": []
         }
 
-    pairs_analysis = []
-    for i in range(len(digits_only) - 1):
-        pair = digits_only[i:i+2]
-        if pair in NUMBER_PAIRS_MEANING:
-            info = NUMBER_PAIRS_MEANING[pair]
-            pairs_analysis.append({
-                "pair": pair,
-                "position": i + 1,
-                "name": info["name"],
-                "meaning": info["meaning"],
-                "score": info["score"]
-            })
-        else:
-            # Fallback to single digit analysis if pair not found
-            # Ensure digits exist in SINGLE_NUMBER_MEANING before accessing
-            digit1_info = SINGLE_NUMBER_MEANING.get(pair[0])
-            digit2_info = SINGLE_NUMBER_MEANING.get(pair[1])
-
-            if digit1_info and digit2_info:
-                avg_score = (digit1_info["score"] + digit2_info["score"]) / 2
-                meaning = f"Kết hợp {pair[0]} ({digit1_info['meaning']}) và {pair[1]} ({digit2_info['meaning']})"
-                name = "Cặp số thông thường"
-            else:
-                # Handle case where one or both digits are not in the database (should not happen with 0-9)
-                avg_score = 5.0 # Default score
-                meaning = f"Không thể phân tích cặp số {pair} chi tiết."
-                name = "Cặp số không xác định"
-
-            pairs_analysis.append({
-                "pair": pair,
-                "position": i + 1,
-                "name": name,
-                "meaning": meaning,
-                "score": avg_score
-            })
+    # Overlapping pairs come from the shared digit kernel
+    profile = digit_profile(digits_only)
+    pairs_analysis: List[Dict[str, Any]] = []
+    for i, code in enumerate(profile.pair_codes):
+        name, meaning, score = PAIR_DESCRIPTIONS[code]
+        pairs_analysis.append({
+            "pair": profile.pair(i),
+            "position": i + 1,
+            "name": name,
+            "meaning": meaning,
+            "score": score
+        })
 
     if not pairs_analysis:
-        # Handle single digit numbers if applicable
-        if len(digits_only) == 1 and digits_only in SINGLE_NUMBER_MEANING:
-             single_info = SINGLE_NUMBER_MEANING[digits_only]
-             total_score = float(single_info["score"])
-             # Append a pseudo-analysis for consistency
-             pairs_analysis.append({
-                 "pair": digits_only, 
-                 "position": 1,
-                 "name": "Số đơn",
-                 "meaning": single_info["meaning"],
-                 "score": total_score
-             })
+        # Handle single digit numbers if applicable (pseudo-analysis for consistency)
+        single = _single_digit_result(digits_only) if len(digits_only) == 1 else None
+        if single is not None:
+            pairs_analysis.append(single)
+            total_score = single["score"]
         else:
-             total_score = 0.0 
-    else:        
-        total_score = sum(pair["score"] for pair in pairs_analysis) / len(pairs_analysis)
-
-    # Determine luck level based on score
-    if total_score >= 8:
-        luck_level = "Rất tốt"
-    elif total_score >= 7:
-        luck_level = "Tốt"
-    elif total_score >= 6:
-        luck_level = "Khá"
-    elif total_score >= 5:
-        luck_level = "Trung bình"
+            total_score = 0.0
     else:
-        luck_level = "Kém"
+        total_score = sum(pair["score"] for pair in pairs_analysis) / len(pairs_analysis)
 
     return {
         "pairs_analysis": pairs_analysis,
         "total_score": round(total_score, 2),
-        "luck_level": luck_level
-    } 
\ No newline at end of file
+        "luck_level": _luck_level(total_score),
+        "special_patterns": find_special_patterns(digits_only)
+    }
+
+
+class NumberStream:
+    """
+    Incremental Bat Cuc Linh So analysis of a digit stream.
+
+    Each `feed` call strips non-digits from the chunk, pairs its first digit
+    with the last digit of the previous chunk and updates the running
+    aggregates immediately; the pair results of the chunk are produced lazily.
+    Memory does not depend on the stream length.
+    """
+
+    def __init__(self):
+        self.digit_count = 0
+        self.pair_count = 0
+        self.score_sum = 0.0
+        self.pair_counts = [0] * 100
+        self.special_pattern_counts = [0] * len(SPECIAL_PATTERNS)
+        self._last_digit = ""
+        self._first_digit = ""
+        self._matcher_state = ROOT
+
+    def feed(self, chunk: Chunk) -> Iterator[Dict[str, Any]]:
+        """
+        Consumes one chunk of the stream.
+
+        Args:
+            chunk: Text or bytes; non-digit characters are ignored.
+
+        Returns:
+            An iterator over the analyses of the pairs completed by this chunk
+            (same records as `pairs_analysis`, positions counted over the whole stream).
+        """
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode("latin-1")
+        digits = extract_digits(chunk)
+        if not digits:
+            return iter(())
+
+        # Pair codes of the chunk, including the pair straddling the previous boundary
+        values = (self._last_digit + digits).encode("ascii")
+        codes = [10 * first + second - 528 for first, second in zip(values, values[1:])]
+        first_position = self.pair_count + 1
+
+        pair_counts = self.pair_counts
+        for code in codes:
+            pair_counts[code] += 1
+            self.score_sum += PAIR_DESCRIPTIONS[code][2]
+        matches, self._matcher_state = special_pattern_matcher.scan(
+            digits, self._matcher_state, self.digit_count
+        )
+        for match in matches:
+            self.special_pattern_counts[match.pattern_id] += 1
+
+        if not self._first_digit:
+            self._first_digit = digits[0]
+        self.digit_count += len(digits)
+        self.pair_count += len(codes)
+        self._last_digit = digits[-1]
+        return (_pair_result(code, position) for position, code in enumerate(codes, first_position))
+
+    def single_digit_result(self) -> Optional[Dict[str, Any]]:
+        """Pseudo pair analysis when the whole stream held exactly one digit"""
+        return _single_digit_result(self._first_digit) if self.digit_count == 1 else None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregates of the digits consumed so far.
+
+        Returns:
+            A dictionary with 'digit_count', 'pair_count', 'total_score' and
+            'luck_level' (as in analyze_number_string), plus 'pair_counts'
+            (pair -> occurrences) and 'special_pattern_counts' (pattern -> occurrences).
+        """
+        if not self.digit_count:
+            total_score, luck_level = 0.0, "Không xác định (không có số)"
+        else:
+            single = self.single_digit_result()
+            if self.pair_count:
+                total_score = self.score_sum / self.pair_count
+            else:
+                total_score = single["score"] if single is not None else 0.0
+            luck_level = _luck_level(total_score)
+        # A pattern string may belong to several kinds (e.g. special pattern and *_ZERO triple)
+        pattern_counts: Dict[str, int] = {}
+        for pattern_id, count in enumerate(self.special_pattern_counts):
+            if count:
+                pattern = SPECIAL_PATTERNS[pattern_id].pattern
+                pattern_counts[pattern] = pattern_counts.get(pattern, 0) + count
+        return {
+            "digit_count": self.digit_count,
+            "pair_count": self.pair_count,
+            "total_score": round(total_score, 2),
+            "luck_level": luck_level,
+            "pair_counts": {f"{code:02d}": count for code, count in enumerate(self.pair_counts) if count},
+            "special_pattern_counts": pattern_counts
+        }
+
+
+def _iter_chunks(source: NumberSource, chunk_size: int) -> Iterator[Chunk]:
+    """Splits a string, a file-like object or an iterable of chunks into chunks"""
+    if isinstance(source, (str, bytes)):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+
+def iter_number_string(
+    source: NumberSource,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stream: Optional[NumberStream] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of analyze_number_string.
+
+    Args:
+        source: A string, bytes, a file-like object (read in chunks) or an iterable of chunks.
+        chunk_size: Characters per read for strings and file-like sources.
+        stream: Optional NumberStream receiving the running aggregates (see NumberStream.summary).
+
+    Yields:
+        The pair analyses in order, as in 'pairs_analysis' of analyze_number_string.
+    """
+    stream = stream if stream is not None else NumberStream()
+    for chunk in _iter_chunks(source, chunk_size):
+        yield from stream.feed(chunk)
+    single = stream.single_digit_result()
+    if single is not None:
+        yield single
+
+
+def analyze_number_stream(source: NumberSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Analyzes an arbitrarily long digit source in constant memory.
+
+    Args:
+        source: A string, bytes, a file-like object or an iterable of chunks.
+        chunk_size: Characters per read for strings and file-like sources.
+
+    Returns:
+        The aggregates of NumberStream.summary (no per-pair list).
+    """
+    stream = NumberStream()
+    for chunk in _iter_chunks(source, chunk_size):
+        stream.feed(chunk)
+    return stream.summary() 
\ No newline at end of file
@@ -0,0 +1,300 @@
+"""
+Number Search: Tìm kiếm top-k số đẹp theo phương pháp Bát Cục Linh Số
+
+Không gian tìm kiếm được mô tả bằng tập chữ số cho phép tại từng vị trí (tiền tố cố định,
+ký tự đại diện, ...). Các vị trí được ghép thành cặp (0-1), (2-3), ... giống
+`PhoneAnalyzer.analyze_phone_number`; thuật toán nhánh cận (branch-and-bound) duyệt
+lần lượt từng cặp, cộng dồn tổng năng lượng / số cặp khớp sao / độ phù hợp mục đích và
+cắt tỉa bằng cận trên suy ra từ bảng năng lượng sao trong `rule_tables`. Nhờ vậy top-k
+được trả về chính xác mà không cần liệt kê toàn bộ 10^n ứng viên.
+
+Thứ tự xếp hạng: điểm tổng hợp, rồi số cặp khớp sao, rồi số chữ số ưa thích (đều giảm dần);
+các kết quả bằng nhau giữ theo thứ tự được tìm thấy.
+"""
+
+import heapq
+import random
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from tools.batcuclinhso_analysis.purpose_scoring import PURPOSE_INDEX, PURPOSE_WEIGHTS
+from tools.batcuclinhso_analysis.rule_tables import (
+    PAIR_RULES,
+    phone_score,
+    resolve_purpose,
+)
+
+DIGITS = "0123456789"
+WILDCARDS = "xX*?"
+
+# Số node duyệt giữa hai lần kiểm tra thời gian
+_CLOCK_INTERVAL = 1024
+
+
+class SearchHit(NamedTuple):
+    """Một số tìm được cùng các điểm thành phần"""
+    number: str
+    total_score: float
+    purpose_score: Optional[float]
+    combined_score: float
+    matched_count: int
+    preferred_count: int
+    changed_positions: Tuple[int, ...]
+
+
+class SearchResult(NamedTuple):
+    """Kết quả tìm kiếm
+
+    `complete` là False nếu việc tìm kiếm dừng sớm do hết ngân sách thời gian/node;
+    khi đó `hits` là các kết quả tốt nhất tìm được đến lúc dừng.
+    """
+    hits: List[SearchHit]
+    complete: bool
+    nodes: int
+
+
+class _Option(NamedTuple):
+    digits: str
+    energy: float
+    matched: int
+    favor: int
+    preferred: int
+    edits: int
+
+
+def positions_for_prefix(prefix: str, length: int) -> List[str]:
+    """Tập chữ số cho phép tại từng vị trí: cố định theo tiền tố, tự do ở phần còn lại"""
+    if not prefix.isdigit() and prefix:
+        raise ValueError("Tiền tố phải chỉ chứa chữ số")
+    if len(prefix) > length:
+        raise ValueError("Tiền tố dài hơn độ dài yêu cầu")
+    return list(prefix) + [DIGITS] * (length - len(prefix))
+
+
+def positions_for_pattern(pattern: str) -> List[str]:
+    """Tập chữ số cho phép từ mẫu có ký tự đại diện, ví dụ "09xx68xx88" """
+    positions = []
+    for char in pattern:
+        if char.isdigit():
+            positions.append(char)
+        elif char in WILDCARDS:
+            positions.append(DIGITS)
+        else:
+            raise ValueError(f"Ký tự không hợp lệ trong mẫu: {char!r}")
+    return positions
+
+
+def purpose_match_score(favor: int, matched_count: int) -> float:
+    """Điểm phù hợp mục đích thang 0-10 từ (số sao thuận lợi - số sao bất lợi) / số cặp khớp sao"""
+    compatibility = favor / matched_count if matched_count else 0
+    return (compatibility + 1) * 5
+
+
+def _star_favor(purpose_key: Optional[str]) -> Optional[Sequence[int]]:
+    """Hàng trọng số mục đích x sao (theo id sao) của mục đích, None nếu không xét mục đích"""
+    if purpose_key is None:
+        return None
+    return PURPOSE_WEIGHTS[PURPOSE_INDEX[purpose_key]].tolist()
+
+
+def _build_options(
+    allowed: Sequence[str],
+    base: Optional[str],
+    favor_by_star: Optional[Sequence[int]],
+    preferred: frozenset,
+    rng: Optional[random.Random],
+) -> List[_Option]:
+    """Liệt kê các lựa chọn của một vị trí cặp (hoặc chữ số lẻ cuối), sắp theo độ tốt giảm dần"""
+    options = []
+    for first in allowed[0]:
+        for second in (allowed[1] if len(allowed) > 1 else ("",)):
+            digits = first + second
+            rule = PAIR_RULES[int(digits)] if len(digits) == 2 else None
+            edits = sum(1 for i, d in enumerate(digits) if base is not None and base[i] != d)
+            options.append(_Option(
+                digits=digits,
+                energy=rule.energy if rule else 0,
+                matched=1 if rule else 0,
+                favor=favor_by_star[rule.star_id] if rule and favor_by_star else 0,
+                preferred=sum(1 for d in digits if d in preferred),
+                edits=edits,
+            ))
+    if rng is not None:
+        rng.shuffle(options)
+    # sort ổn định: các lựa chọn ngang nhau giữ thứ tự chữ số tăng dần (hoặc thứ tự đã xáo theo seed)
+    options.sort(key=lambda o: (-o.energy, -o.favor, -o.preferred, o.edits))
+    return options
+
+
+def _suffix_bounds(options: Sequence[List[_Option]], edit_budget: int) -> List[List[Dict[int, Tuple[float, int]]]]:
+    """Cận trên của phần còn lại theo độ sâu và số chữ số còn được thay đổi
+
+    `bounds[depth][r]` ánh xạ số cặp khớp sao thêm được -> (năng lượng lớn nhất, độ phù hợp lớn nhất)
+    của các vị trí từ `depth` trở đi khi thay đổi tối đa `r` chữ số. Hai giá trị được lấy lớn nhất
+    độc lập nên là cận trên (không nhất thiết đạt được cùng lúc). Tính bằng quy hoạch động từ cuối
+    lên, mỗi vị trí chỉ giữ lựa chọn tốt nhất theo (khớp sao, số chữ số thay đổi).
+    """
+    empty = {0: (0, 0)}
+    bounds: List[List[Dict[int, Tuple[float, int]]]] = [[empty] * (edit_budget + 1)]
+    for opts in reversed(options):
+        choices: Dict[Tuple[int, int], Tuple[float, int]] = {}
+        for o in opts:
+            best = choices.get((o.matched, o.edits))
+            choices[(o.matched, o.edits)] = (o.energy, o.favor) if best is None else (
+                max(best[0], o.energy), max(best[1], o.favor)
+            )
+        after = bounds[-1]
+        level = []
+        for remaining in range(edit_budget + 1):
+            points: Dict[int, Tuple[float, int]] = {}
+            for (matched, edits), (energy, favor) in choices.items():
+                if edits > remaining:
+                    continue
+                for added, (rest_energy, rest_favor) in after[remaining - edits].items():
+                    best = points.get(added + matched)
+                    candidate = (energy + rest_energy, favor + rest_favor)
+                    points[added + matched] = candidate if best is None else (
+                        max(best[0], candidate[0]), max(best[1], candidate[1])
+                    )
+            level.append(points)
+        bounds.append(level)
+    bounds.reverse()
+    return bounds
+
+
+def search_numbers(
+    positions: Sequence[str],
+    purpose: Optional[str] = None,
+    preferred_digits: Optional[Sequence[str]] = None,
+    k: int = 5,
+    offset: int = 0,
+    time_budget_ms: Optional[float] = None,
+    node_budget: Optional[int] = None,
+    base_number: Optional[str] = None,
+    max_edits: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> SearchResult:
+    """Tìm top-k số có điểm cao nhất trong không gian mô tả bởi `positions`
+
+    Args:
+        positions: Chuỗi các chữ số cho phép tại từng vị trí
+        purpose: Mục đích sử dụng; nếu nhận diện được, điểm tổng hợp là trung bình của
+            điểm phong thủy và điểm phù hợp mục đích, ngược lại chỉ dùng điểm phong thủy
+        preferred_digits: Các chữ số ưa thích (dùng để xếp hạng các số cùng điểm)
+        k: Số kết quả trả về
+        offset: Số kết quả bỏ qua (phân trang)
+        time_budget_ms: Ngân sách thời gian, hết thời gian sẽ trả về kết quả tốt nhất hiện có
+        node_budget: Ngân sách số node duyệt
+        base_number: Số gốc để đếm số chữ số thay đổi (dùng cùng max_edits)
+        max_edits: Số chữ số tối đa được thay đổi so với base_number
+        seed: Nếu có, xáo thứ tự các lựa chọn ngang nhau theo seed (kết quả vẫn tái lập được)
+
+    Returns:
+        SearchResult: Danh sách kết quả đã xếp hạng
+    """
+    if k <= 0:
+        return SearchResult([], True, 0)
+    if base_number is not None and len(base_number) != len(positions):
+        raise ValueError("Số gốc phải có cùng độ dài với không gian tìm kiếm")
+    for allowed in positions:
+        if not allowed or not all(d in DIGITS for d in allowed):
+            raise ValueError("Mỗi vị trí phải có ít nhất một chữ số hợp lệ")
+
+    purpose_key = resolve_purpose(purpose)
+    favor_by_star = _star_favor(purpose_key)
+    preferred = frozenset(preferred_digits or ())
+    rng = random.Random(seed) if seed is not None else None
+    edit_budget = min(max_edits, len(positions)) if max_edits is not None else len(positions)
+
+    slots = [positions[i:i + 2] for i in range(0, len(positions), 2)]
+    bases = [base_number[i:i + 2] if base_number is not None else None for i in range(0, len(positions), 2)]
+    options = [_build_options(slot, base, favor_by_star, preferred, rng) for slot, base in zip(slots, bases)]
+    depth_count = len(options)
+
+    suffix_bounds = _suffix_bounds(options, edit_budget)
+    suffix_preferred = [sum(max(o.preferred for o in opts) for opts in options[depth:]) for depth in range(depth_count + 1)]
+
+    def combine(fs: float, favor: int, matched: int) -> float:
+        if purpose_key is None:
+            return fs
+        return (fs + purpose_match_score(favor, matched)) / 2
+
+    def upper_bound(
+        depth: int, energy: float, matched: int, favor: int, preferred_count: int, edits: int
+    ) -> Tuple[float, int, int]:
+        points = suffix_bounds[depth][edit_budget - edits]
+        if not points:
+            # Không còn cách hoàn thành nào trong số chữ số được thay đổi
+            return float("-inf"), 0, 0
+        # Điểm phong thủy tăng theo năng lượng khi số cặp khớp cố định, ngoại trừ điểm mặc định khi
+        # tổng năng lượng bằng 0
+        best_fs = phone_score(energy, matched) if energy == 0 else 0.0
+        best_pm = 0.0
+        for added, (max_energy, max_favor) in points.items():
+            best_fs = max(best_fs, phone_score(energy + max_energy, matched + added))
+            if purpose_key is not None:
+                best_pm = max(best_pm, purpose_match_score(favor + max_favor, matched + added))
+        best_combined = best_fs if purpose_key is None else (best_fs + best_pm) / 2
+        return best_combined, matched + max(points), preferred_count + suffix_preferred[depth]
+
+    wanted = offset + k
+    heap: List[Tuple[float, int, int, int, str, float, int]] = []
+    deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms is not None else None
+    state = {"nodes": 0, "sequence": 0, "stopped": False}
+    chosen: List[str] = []
+
+    def out_of_budget() -> bool:
+        if state["stopped"]:
+            return True
+        if node_budget is not None and state["nodes"] >= node_budget:
+            state["stopped"] = True
+        elif deadline is not None and state["nodes"] % _CLOCK_INTERVAL == 0 and time.perf_counter() > deadline:
+            state["stopped"] = True
+        return state["stopped"]
+
+    def visit(depth: int, energy: float, matched: int, favor: int, preferred_count: int, edits: int) -> None:
+        if depth == depth_count:
+            fs = phone_score(energy, matched)
+            key = (combine(fs, favor, matched), matched, preferred_count)
+            state["sequence"] += 1
+            item = key + (-state["sequence"], "".join(chosen), fs, favor)
+            if len(heap) < wanted:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+            return
+        for option in options[depth]:
+            if edits + option.edits > edit_budget:
+                continue
+            if out_of_budget():
+                return
+            state["nodes"] += 1
+            next_state = (
+                energy + option.energy,
+                matched + option.matched,
+                favor + option.favor,
+                preferred_count + option.preferred,
+                edits + option.edits,
+            )
+            if len(heap) == wanted and upper_bound(depth + 1, *next_state) <= heap[0][:3]:
+                continue
+            chosen.append(option.digits)
+            visit(depth + 1, *next_state)
+            chosen.pop()
+
+    visit(0, 0, 0, 0, 0, 0)
+
+    ranked = sorted(heap, reverse=True)[offset:wanted]
+    hits = []
+    for combined, matched, preferred_count, _, number, fs, favor in ranked:
+        changed = tuple(i for i, d in enumerate(number) if base_number is not None and base_number[i] != d)
+        hits.append(SearchHit(
+            number=number,
+            total_score=fs,
+            purpose_score=purpose_match_score(favor, matched) if purpose_key is not None else None,
+            combined_score=combined,
+            matched_count=matched,
+            preferred_count=preferred_count,
+            changed_positions=changed,
+        ))
+    return SearchResult(hits, not state["stopped"], state["nodes"])
@@ -0,0 +1,140 @@
+"""
+Pair Automaton: Máy trạng thái hữu hạn tách chuỗi chữ số thành các cặp số
+
+Quy tắc ghép cặp của Bát Cục Linh Số (số 0 và 5 được gộp vào cặp chứa chữ số đứng trước)
+được biên dịch thành một bộ chuyển đổi trạng thái hữu hạn (finite-state transducer) dạng bảng:
+
+- Mỗi chữ số thuộc một trong hai lớp: 0/5 (ZERO_FIVE) hoặc chữ số còn lại (OTHER)
+- Trạng thái START: chưa có cặp đang mở (bỏ qua các số 0/5 ở đầu)
+- Trạng thái OPEN: đang mở một cặp bắt đầu tại chữ số OTHER gần nhất
+- Gặp chữ số OTHER ở trạng thái OPEN: đóng cặp đang mở tại vị trí này (end = pos + 1)
+  rồi mở cặp mới bắt đầu từ chính vị trí này
+- Kết thúc chuỗi ở trạng thái OPEN: đóng cặp cuối nếu cặp đó dài ít nhất 2 chữ số
+
+Đầu ra là các khoảng (start, end) trên chuỗi gốc, không tạo chuỗi con trung gian.
+`pair_spans_batch` chạy cùng bảng chuyển trạng thái đồng thời trên cả một ma trận chữ số (NumPy).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Lớp chữ số
+OTHER = 0
+ZERO_FIVE = 1
+DIGIT_CLASS: Tuple[int, ...] = tuple(ZERO_FIVE if digit in (0, 5) else OTHER for digit in range(10))
+
+# Trạng thái
+START = 0
+OPEN = 1
+
+# Hành động (cờ bit)
+NO_ACTION = 0
+OPEN_SPAN = 1
+EMIT_SPAN = 2
+
+# TRANSITIONS[trạng thái][lớp chữ số] -> (trạng thái kế tiếp, hành động)
+TRANSITIONS: Tuple[Tuple[Tuple[int, int], ...], ...] = (
+    # START
+    ((OPEN, OPEN_SPAN), (START, NO_ACTION)),
+    # OPEN
+    ((OPEN, EMIT_SPAN | OPEN_SPAN), (OPEN, NO_ACTION)),
+)
+
+# Bảng tra theo ký tự cho đường từng chuỗi: _CHAR_STEP[trạng thái][ký tự] -> (trạng thái, hành động).
+# Ký tự không phải 0/5 (kể cả ký tự lạ) được xử lý như lớp OTHER, giống quy tắc gốc.
+_CHAR_STEP: Tuple[Dict[str, Tuple[int, int]], ...] = tuple(
+    {str(digit): row[DIGIT_CLASS[digit]] for digit in range(10)} for row in TRANSITIONS
+)
+_OTHER_STEP: Tuple[Tuple[int, int], ...] = tuple(row[OTHER] for row in TRANSITIONS)
+
+# Dạng mảng phẳng cho đường hàng loạt, tra theo mã trạng thái * 10 + chữ số
+_NEXT_STATE = np.array(
+    [row[DIGIT_CLASS[digit]][0] for row in TRANSITIONS for digit in range(10)], dtype=np.uint8
+)
+_ACTION = np.array(
+    [row[DIGIT_CLASS[digit]][1] for row in TRANSITIONS for digit in range(10)], dtype=np.uint8
+)
+
+
+def pair_spans(digits: str) -> List[Tuple[int, int]]:
+    """Tách chuỗi chữ số thành các khoảng cặp số (start, end)
+
+    Args:
+        digits: Chuỗi chữ số đã chuẩn hóa
+
+    Returns:
+        List[Tuple[int, int]]: Các khoảng theo thứ tự, `digits[start:end]` là cặp số tương ứng
+    """
+    spans: List[Tuple[int, int]] = []
+    state = START
+    start = 0
+    for pos, char in enumerate(digits):
+        step = _CHAR_STEP[state].get(char)
+        state, action = step if step else _OTHER_STEP[state]
+        if action:
+            if action & EMIT_SPAN:
+                spans.append((start, pos + 1))
+            if action & OPEN_SPAN:
+                start = pos
+    if state == OPEN and len(digits) - start >= 2:
+        spans.append((start, len(digits)))
+    return spans
+
+
+def pair_spans_batch(
+    digits: np.ndarray, lengths: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Tách cặp số cho cả một ma trận chữ số, chạy bảng chuyển trạng thái đồng thời trên mọi dòng
+
+    Args:
+        digits: Ma trận chữ số 0-9 (N x L)
+        lengths: Độ dài thực của từng dòng (N,) khi các dòng có độ dài khác nhau
+            (phần sau độ dài bị bỏ qua). Mặc định mọi dòng dài L.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (rows, starts, ends) dạng phẳng, sắp xếp theo
+            dòng rồi theo vị trí; cặp thứ k là `digits[rows[k], starts[k]:ends[k]]`
+    """
+    digits = np.asarray(digits)
+    if digits.ndim != 2:
+        raise ValueError("Ma trận chữ số phải có 2 chiều (N x L)")
+    count, width = digits.shape
+    if lengths is None:
+        lengths = np.full(count, width, dtype=np.int64)
+    else:
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if lengths.shape != (count,) or (count and (lengths.min() < 0 or lengths.max() > width)):
+            raise ValueError(f"lengths phải có dạng ({count},) với giá trị trong [0, {width}]")
+
+    # Duyệt theo cột: chuyển vị để mỗi cột liền mạch trong bộ nhớ
+    columns = np.ascontiguousarray(digits.T, dtype=np.uint8)
+    ragged = lengths.size and lengths.min() < width
+    state = np.full(count, START, dtype=np.uint8)
+    start = np.zeros(count, dtype=np.int64)
+    rows, starts, ends = [], [], []
+    for pos in range(width):
+        code = state * 10 + columns[pos]
+        action = _ACTION[code]
+        next_state = _NEXT_STATE[code]
+        if ragged:
+            active = lengths > pos
+            action[~active] = NO_ACTION
+            next_state[~active] = state[~active]
+        state = next_state
+        emit = np.flatnonzero(action & EMIT_SPAN)
+        if emit.size:
+            rows.append(emit)
+            starts.append(start[emit])
+            ends.append(np.full(emit.size, pos + 1, dtype=np.int64))
+        start[(action & OPEN_SPAN).astype(bool)] = pos
+
+    final = np.flatnonzero((state == OPEN) & (lengths - start >= 2))
+    rows.append(final)
+    starts.append(start[final])
+    ends.append(lengths[final])
+
+    # Trong mỗi dòng các khoảng được phát ra theo thứ tự vị trí, nên chỉ cần sắp xếp ổn định theo dòng
+    rows_flat = np.concatenate(rows)
+    order = np.argsort(rows_flat, kind="stable")
+    return rows_flat[order], np.concatenate(starts)[order], np.concatenate(ends)[order]
@@ -2,8 +2,12 @@
 Tool để phân tích mật khẩu dựa trên phương pháp Bát Cục Linh Số
 """
 
+import hashlib
+
 from google.adk.tools import FunctionTool
 from typing import Dict, Any, List, Optional
+from tools.batcuclinhso_analysis.breach_filter import breached_passwords
+from tools.batcuclinhso_analysis.result_cache import analysis_cache
 from utils.common import extract_digits
 
 def password_analyzer(password: str) -> Dict[str, Any]:
@@ -19,6 +23,13 @@ def password_analyzer(password: str) -> Dict[str, Any]:
     if not password:
         raise ValueError("Mật khẩu không được để trống")
     
+    # Khóa cache là mã băm của mật khẩu để không giữ mật khẩu gốc trong bộ nhớ đệm
+    # (kèm file bộ lọc mật khẩu đã lộ đang dùng, vì kết quả có trường isBreached)
+    key = (hashlib.sha256(password.encode("utf-8")).hexdigest(), breached_passwords.path)
+    return analysis_cache.get_or_compute("password", key, lambda: _analyze_password(password))
+
+def _analyze_password(password: str) -> Dict[str, Any]:
+    """Phân tích mật khẩu (xem password_analyzer)"""
     # Tách các chữ số và các ký tự đặc biệt
     digits = extract_digits(password)
     characters = ''.join([c for c in password if not c.isdigit()])
@@ -27,7 +38,12 @@ def password_analyzer(password: str) -> Dict[str, Any]:
     digit_count = len(digits)
     char_count = len(characters)
     length = len(password)
-    is_secure = length >= 8 and any(c.isdigit() for c in password) and any(c.isalpha() for c in password)
+    # Kiểm tra kho mật khẩu đã lộ cục bộ (None nếu chưa build bộ lọc)
+    is_breached = breached_passwords.check(password)
+    is_secure = (
+        length >= 8 and any(c.isdigit() for c in password) and any(c.isalpha() for c in password)
+        and not is_breached
+    )
     
     # Phân tích theo Bát Cục Linh Số
     energy = sum(int(d) for d in digits) if digits else 0
@@ -45,6 +61,15 @@ def password_analyzer(password: str) -> Dict[str, Any]:
         9: "Thuộc hành Hỏa, biểu thị sự viên mãn, hoàn thành và tính lý tưởng"
     }
     
+    recommendations = [
+        "Mật khẩu nên có ít nhất 8 ký tự" if length < 8 else "Độ dài mật khẩu tốt",
+        "Nên kết hợp cả chữ và số" if not (any(c.isdigit() for c in password) and any(c.isalpha() for c in password)) else "Kết hợp chữ và số tốt",
+        "Nên thêm ký tự đặc biệt" if not any(not c.isalnum() for c in password) else "Có ký tự đặc biệt là tốt",
+        f"Mật khẩu mang năng lượng số {energy_score}, {energy_meanings.get(energy_score, '')}"
+    ]
+    if is_breached:
+        recommendations.insert(0, "Mật khẩu đã xuất hiện trong các vụ rò rỉ dữ liệu, nên đổi mật khẩu khác")
+    
     # Kết quả phân tích
     return {
         "success": True,
@@ -54,14 +79,10 @@ def password_analyzer(password: str) -> Dict[str, Any]:
             "digitCount": digit_count,
             "characterCount": char_count,
             "isSecure": is_secure,
+            "isBreached": is_breached,
             "energyNumber": energy_score,
             "energyMeaning": energy_meanings.get(energy_score, "Không xác định"),
-            "recommendations": [
-                "Mật khẩu nên có ít nhất 8 ký tự" if length < 8 else "Độ dài mật khẩu tốt",
-                "Nên kết hợp cả chữ và số" if not (any(c.isdigit() for c in password) and any(c.isalpha() for c in password)) else "Kết hợp chữ và số tốt",
-                "Nên thêm ký tự đặc biệt" if not any(not c.isalnum() for c in password) else "Có ký tự đặc biệt là tốt",
-                f"Mật khẩu mang năng lượng số {energy_score}, {energy_meanings.get(energy_score, '')}"
-            ]
+            "recommendations": recommendations
         }
     }
 
@@ -0,0 +1,107 @@
+"""
+Password Generator: Tạo mật khẩu mang đúng năng lượng số mong muốn
+
+Năng lượng số của mật khẩu (xem `password_analyzer`) là căn số của tổng các chữ số:
+tổng % 9, hoặc 9 nếu chia hết cho 9. Thay vì tạo ngẫu nhiên rồi kiểm tra lại, các ký tự được
+dựng trực tiếp: mọi ký tự trừ một chữ số được chọn ngẫu nhiên, chữ số còn lại được tính sao cho
+tổng các chữ số đồng dư với năng lượng đích theo modulo 9. Toàn bộ N mật khẩu được tạo trong một
+lượt trên mảng N x độ dài (không có vòng lặp loại bỏ), dùng nguồn ngẫu nhiên của hệ điều hành.
+
+Thành phần của mỗi mật khẩu (rồi xáo trộn vị trí):
+- Ký tự đặc biệt: độ dài // 8 + 1 ký tự nếu yêu cầu
+- Chữ số: độ dài // 4 ký tự nếu yêu cầu, luôn có ít nhất một chữ số điều chỉnh năng lượng
+- Chữ cái: phần còn lại, có ít nhất một chữ hoa và một chữ thường
+"""
+
+import os
+import string
+from typing import List, Optional
+
+import numpy as np
+
+# Độ dài tối thiểu giống PasswordAgent; độ dài và số lượng tối đa của một lượt tạo
+MIN_PASSWORD_LENGTH = 8
+MAX_PASSWORD_LENGTH = 128
+MAX_PASSWORD_BATCH = 10000
+
+SPECIAL_CHARACTERS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+
+_UPPER = np.frombuffer(string.ascii_uppercase.encode("ascii"), dtype=np.uint8)
+_LOWER = np.frombuffer(string.ascii_lowercase.encode("ascii"), dtype=np.uint8)
+_LETTERS = np.frombuffer(string.ascii_letters.encode("ascii"), dtype=np.uint8)
+_SPECIALS = np.frombuffer(SPECIAL_CHARACTERS.encode("ascii"), dtype=np.uint8)
+_ZERO = ord("0")
+
+
+def energy_number(digit_sum: int) -> int:
+    """Năng lượng số (1-9) ứng với tổng các chữ số, như password_analyzer"""
+    return digit_sum % 9 or 9
+
+
+def _random_integers(upper: int, shape, rng: Optional[np.random.Generator]) -> np.ndarray:
+    """Số ngẫu nhiên trong [0, upper): từ os.urandom, hoặc từ rng khi cần tái lập (kiểm thử)"""
+    if rng is not None:
+        return rng.integers(0, upper, size=shape, dtype=np.int64)
+    count = int(np.prod(shape))
+    # Độ lệch của phép modulo trên 32 bit là không đáng kể với các bảng ký tự nhỏ
+    return (np.frombuffer(os.urandom(4 * count), dtype=np.uint32) % upper).astype(np.int64).reshape(shape)
+
+
+def generate_passwords(
+    count: int,
+    target_energy: int,
+    min_length: int = MIN_PASSWORD_LENGTH,
+    require_special_chars: bool = True,
+    require_numbers: bool = True,
+    rng: Optional[np.random.Generator] = None,
+) -> List[str]:
+    """Tạo một lượt mật khẩu có năng lượng số đúng bằng target_energy
+
+    Args:
+        count: Số mật khẩu cần tạo (tối đa MAX_PASSWORD_BATCH)
+        target_energy: Năng lượng số mong muốn (1-9)
+        min_length: Độ dài tối thiểu (tối thiểu 8, như PasswordAgent)
+        require_special_chars: Có ký tự đặc biệt
+        require_numbers: Có độ dài // 4 chữ số (nếu không, chỉ có một chữ số điều chỉnh năng lượng)
+        rng: Bộ sinh số ngẫu nhiên cố định (chỉ dùng khi cần tái lập kết quả)
+
+    Returns:
+        List[str]: Các mật khẩu đã tạo
+
+    Raises:
+        ValueError: Nếu tham số nằm ngoài giới hạn
+    """
+    if not 1 <= target_energy <= 9:
+        raise ValueError("Năng lượng số phải nằm trong khoảng 1-9")
+    if not 0 <= count <= MAX_PASSWORD_BATCH:
+        raise ValueError(f"Số lượng mật khẩu phải nằm trong khoảng 0-{MAX_PASSWORD_BATCH}")
+    length = max(MIN_PASSWORD_LENGTH, min_length)
+    if length > MAX_PASSWORD_LENGTH:
+        raise ValueError(f"Độ dài mật khẩu tối đa là {MAX_PASSWORD_LENGTH}")
+    if count == 0:
+        return []
+
+    special_count = length // 8 + 1 if require_special_chars else 0
+    digit_count = max(length // 4, 1) if require_numbers else 1
+    letter_count = length - special_count - digit_count
+
+    # Các chữ số tự do, rồi chữ số cuối đưa tổng về đúng lớp đồng dư của năng lượng đích
+    free_digits = _random_integers(10, (count, digit_count - 1), rng)
+    remainder = (target_energy - free_digits.sum(axis=1)) % 9
+    # Lớp dư 0 có hai chữ số (0 và 9); các lớp khác chỉ có một
+    last_digit = np.where(remainder == 0, 9 * _random_integers(2, (count,), rng), remainder)
+
+    columns = [
+        _SPECIALS[_random_integers(len(_SPECIALS), (count, special_count), rng)],
+        (np.column_stack([free_digits, last_digit]) + _ZERO).astype(np.uint8),
+        _UPPER[_random_integers(len(_UPPER), (count, 1), rng)],
+        _LOWER[_random_integers(len(_LOWER), (count, 1), rng)],
+        _LETTERS[_random_integers(len(_LETTERS), (count, letter_count - 2), rng)],
+    ]
+    characters = np.concatenate(columns, axis=1)
+
+    # Xáo trộn vị trí từng dòng bằng hoán vị ngẫu nhiên (argsort của khóa ngẫu nhiên)
+    order = np.argsort(_random_integers(1 << 30, characters.shape, rng), axis=1)
+    characters = np.take_along_axis(characters, order, axis=1)
+    text = characters.tobytes().decode("ascii")
+    return [text[start:start + length] for start in range(0, len(text), length)]
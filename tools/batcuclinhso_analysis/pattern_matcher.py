@@ -0,0 +1,257 @@
+"""
+Pattern Matcher: Máy Aho–Corasick tìm các mẫu chữ số đặc biệt trong một lần quét
+
+Các mẫu đặc biệt gồm `RESPONSE_FACTORS["SPECIAL_PATTERN_RESPONSE"]` (ví dụ "608", "413") và các
+bộ 3 chữ số của biến thể `*_ZERO` trong `BAT_TINH`. Toàn bộ được biên dịch một lần thành máy trạng
+thái hữu hạn đơn định trên bảng chữ cái 0-9:
+
+- Cây tiền tố (trie) của các mẫu, liên kết thất bại (failure link) tính theo BFS
+- Bảng chuyển trạng thái đầy đủ `delta[state * 10 + digit]` (đã gộp liên kết thất bại), nên mỗi
+  chữ số chỉ cần đúng một phép tra bảng
+- Các mẫu kết thúc tại mỗi trạng thái (kể cả qua chuỗi liên kết thất bại) được gộp sẵn
+
+Mọi lần xuất hiện (kể cả chồng lấn) được tìm trong thời gian O(độ dài chuỗi + số kết quả), không
+phụ thuộc số lượng mẫu. `scan` nhận và trả về trạng thái máy nên có thể quét một luồng chữ số theo
+từng khối mà không bỏ sót mẫu nằm vắt qua ranh giới hai khối. `find_all_batch` chạy cùng bảng
+chuyển trạng thái đồng thời trên cả một ma trận chữ số (NumPy), giống `pair_spans_batch`.
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from constants.response_factors import RESPONSE_FACTORS
+from tools.batcuclinhso_analysis.rule_tables import STAR_KEYS, TRIPLE_RULES
+
+ALPHABET_SIZE = 10
+ROOT = 0
+
+# Bảng bytes.translate đưa mã ASCII '0'-'9' về byte 0-9
+_DIGIT_BYTES = bytes((byte - 48) % 256 for byte in range(256))
+
+# Loại mẫu đặc biệt
+KIND_SPECIAL = "special"
+KIND_STAR_ZERO = "star_zero"
+
+
+class PatternMatch(NamedTuple):
+    """Một lần xuất hiện: `digits[start:end]` khớp mẫu có chỉ số `pattern_id`"""
+    start: int
+    end: int
+    pattern_id: int
+
+
+class PatternMatcher:
+    """Máy Aho–Corasick trên các chuỗi chữ số, biên dịch một lần và dùng lại cho mọi chuỗi"""
+
+    def __init__(self, patterns: Sequence[str]):
+        """
+        Args:
+            patterns: Các mẫu (chuỗi chữ số khác rỗng); chỉ số trong dãy là `pattern_id`
+
+        Raises:
+            ValueError: Nếu có mẫu rỗng hoặc chứa ký tự không phải chữ số 0-9
+        """
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self.lengths: Tuple[int, ...] = tuple(len(pattern) for pattern in self.patterns)
+
+        # Cây tiền tố: children[state * 10 + digit], -1 nếu chưa có cạnh
+        children: List[int] = [-1] * ALPHABET_SIZE
+        own_outputs: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern or not (pattern.isascii() and pattern.isdigit()):
+                raise ValueError(f"Mẫu không hợp lệ: {pattern!r}")
+            state = ROOT
+            for char in pattern:
+                index = state * ALPHABET_SIZE + ord(char) - 48
+                if children[index] < 0:
+                    children[index] = len(own_outputs)
+                    children.extend([-1] * ALPHABET_SIZE)
+                    own_outputs.append([])
+                state = children[index]
+            own_outputs[state].append(pattern_id)
+
+        # BFS: liên kết thất bại và bảng chuyển đầy đủ (cạnh thiếu đi theo chuyển của trạng thái thất bại)
+        state_count = len(own_outputs)
+        delta = [ROOT] * (state_count * ALPHABET_SIZE)
+        outputs: List[Tuple[int, ...]] = [()] * state_count
+        fail = [ROOT] * state_count
+        queue = deque()
+        for digit in range(ALPHABET_SIZE):
+            child = children[digit]
+            if child >= 0:
+                delta[digit] = child
+                queue.append(child)
+        outputs[ROOT] = tuple(own_outputs[ROOT])
+        while queue:
+            state = queue.popleft()
+            outputs[state] = tuple(own_outputs[state]) + outputs[fail[state]]
+            base = state * ALPHABET_SIZE
+            fail_base = fail[state] * ALPHABET_SIZE
+            for digit in range(ALPHABET_SIZE):
+                child = children[base + digit]
+                if child >= 0:
+                    fail[child] = delta[fail_base + digit]
+                    delta[base + digit] = child
+                    queue.append(child)
+                else:
+                    delta[base + digit] = delta[fail_base + digit]
+
+        self.state_count = state_count
+        # Đường từng chuỗi: trạng thái được lưu sẵn dưới dạng state * 10 để mỗi bước chỉ còn một phép
+        # cộng với chữ số (chuỗi được chuyển sang byte 0-9 bằng bytes.translate)
+        self._step = [delta[index] * ALPHABET_SIZE for index in range(len(delta))]
+        # Các mẫu kết thúc tại từng trạng thái dưới dạng (độ dài, id mẫu), cùng cách đánh chỉ số
+        self._emits: List[Tuple[Tuple[int, int], ...]] = [()] * len(delta)
+        for state, found in enumerate(outputs):
+            self._emits[state * ALPHABET_SIZE] = tuple((self.lengths[pattern_id], pattern_id) for pattern_id in found)
+
+        # Đường hàng loạt (NumPy): bảng chuyển phẳng và danh sách mẫu theo trạng thái dạng CSR
+        self._delta = np.array(delta, dtype=np.int32)
+        self._output_starts = np.zeros(state_count + 1, dtype=np.int64)
+        np.cumsum([len(found) for found in outputs], out=self._output_starts[1:])
+        self._output_ids = np.array([pattern_id for found in outputs for pattern_id in found], dtype=np.int32)
+        self._pattern_lengths = np.array(self.lengths, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def scan(self, digits: str, state: int = ROOT, offset: int = 0) -> Tuple[List[PatternMatch], int]:
+        """Quét một khối chữ số tiếp nối trạng thái trước đó
+
+        Args:
+            digits: Khối chữ số (chỉ gồm 0-9)
+            state: Trạng thái máy sau khối trước (ROOT nếu bắt đầu chuỗi mới)
+            offset: Vị trí của chữ số đầu khối trong toàn bộ luồng
+
+        Returns:
+            Tuple[List[PatternMatch], int]: (các lần xuất hiện kết thúc trong khối, theo vị trí
+                kết thúc, vị trí tính trên toàn luồng; trạng thái máy sau khối)
+
+        Raises:
+            ValueError: Nếu khối chứa ký tự không phải chữ số 0-9
+        """
+        if digits and not (digits.isascii() and digits.isdigit()):
+            raise ValueError(f"Chuỗi chữ số không hợp lệ: {digits!r}")
+        step, emits = self._step, self._emits
+        ends: List[int] = []
+        found: List[Tuple[int, int]] = []
+        cursor = state * ALPHABET_SIZE
+        end = offset
+        for digit in digits.encode("ascii").translate(_DIGIT_BYTES):
+            cursor = step[cursor + digit]
+            end += 1
+            emitted = emits[cursor]
+            if emitted:
+                ends.extend([end] * len(emitted))
+                found.extend(emitted)
+        matches = [
+            PatternMatch(end - length, end, pattern_id) for end, (length, pattern_id) in zip(ends, found)
+        ]
+        return matches, cursor // ALPHABET_SIZE
+
+    def find_all_batch(
+        self, digits: np.ndarray, lengths: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Tìm mẫu đồng thời trên mọi dòng của một ma trận chữ số (ví dụ N số điện thoại)
+
+        Args:
+            digits: Ma trận chữ số 0-9 (N x L)
+            lengths: Độ dài thực của từng dòng khi các dòng dài khác nhau (mặc định mọi dòng dài L)
+
+        Returns:
+            Tuple[np.ndarray, ...]: (rows, starts, ends, pattern_ids) dạng phẳng, sắp theo dòng rồi
+                theo vị trí kết thúc
+        """
+        digits = np.asarray(digits)
+        if digits.ndim != 2:
+            raise ValueError("Ma trận chữ số phải có 2 chiều (N x L)")
+        count, width = digits.shape
+        columns = np.ascontiguousarray(digits.T, dtype=np.int32)
+        state = np.full(count, ROOT, dtype=np.int32)
+        output_counts = np.diff(self._output_starts)
+        rows, ends, ids = [], [], []
+        for pos in range(width):
+            state = self._delta[state * ALPHABET_SIZE + columns[pos]]
+            emitting = output_counts[state] > 0
+            if lengths is not None:
+                emitting &= np.asarray(lengths) > pos
+            hit_rows = np.flatnonzero(emitting)
+            if not hit_rows.size:
+                continue
+            hit_states = state[hit_rows]
+            repeats = output_counts[hit_states]
+            # Vị trí của từng mẫu trong danh sách CSR của trạng thái tương ứng
+            first = np.repeat(self._output_starts[hit_states], repeats)
+            within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+            rows.append(np.repeat(hit_rows, repeats))
+            ends.append(np.full(int(repeats.sum()), pos + 1, dtype=np.int64))
+            ids.append(self._output_ids[first + within])
+
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty, np.zeros(0, dtype=np.int32)
+        rows_flat = np.concatenate(rows)
+        order = np.argsort(rows_flat, kind="stable")
+        ends_flat = np.concatenate(ends)[order]
+        ids_flat = np.concatenate(ids)[order]
+        return rows_flat[order], ends_flat - self._pattern_lengths[ids_flat], ends_flat, ids_flat
+
+    def find_all(self, digits: str) -> List[PatternMatch]:
+        """Mọi lần xuất hiện (kể cả chồng lấn) của các mẫu trong chuỗi chữ số"""
+        return self.scan(digits)[0]
+
+    def count(self, digits: str) -> List[int]:
+        """Số lần xuất hiện của từng mẫu (theo pattern_id)"""
+        counts = [0] * len(self.patterns)
+        for match in self.find_all(digits):
+            counts[match.pattern_id] += 1
+        return counts
+
+
+class SpecialPattern(NamedTuple):
+    """Mẫu chữ số đặc biệt lấy từ hằng số"""
+    pattern: str
+    kind: str
+    key: Optional[str]
+    weight: float
+
+
+def _special_patterns() -> Tuple[SpecialPattern, ...]:
+    """Các mẫu từ SPECIAL_PATTERN_RESPONSE (trọng số là hệ số ứng nghiệm) và các bộ 3 chữ số
+    `*_ZERO` (khóa là sao, trọng số là năng lượng)"""
+    patterns = [
+        SpecialPattern(pattern, KIND_SPECIAL, None, factor)
+        for pattern, factor in RESPONSE_FACTORS.get("SPECIAL_PATTERN_RESPONSE", {}).items()
+    ]
+    patterns += [
+        SpecialPattern(f"{code:03d}", KIND_STAR_ZERO, STAR_KEYS[rule.star_id], rule.energy)
+        for code, rule in enumerate(TRIPLE_RULES) if rule is not None
+    ]
+    return tuple(patterns)
+
+
+SPECIAL_PATTERNS: Tuple[SpecialPattern, ...] = _special_patterns()
+special_pattern_matcher = PatternMatcher([special.pattern for special in SPECIAL_PATTERNS])
+
+
+def describe_matches(matches: Iterable[PatternMatch]) -> List[Dict[str, Any]]:
+    """Các lần xuất hiện mẫu đặc biệt dưới dạng dict (vị trí bắt đầu tính từ 0)"""
+    described = []
+    for match in matches:
+        special = SPECIAL_PATTERNS[match.pattern_id]
+        described.append({
+            "pattern": special.pattern,
+            "start": match.start,
+            "end": match.end,
+            "kind": special.kind,
+            "key": special.key,
+            "weight": special.weight,
+        })
+    return described
+
+
+def find_special_patterns(digits: str) -> List[Dict[str, Any]]:
+    """Các mẫu đặc biệt (SPECIAL_PATTERN_RESPONSE, bộ 3 `*_ZERO`) xuất hiện trong chuỗi chữ số"""
+    return describe_matches(special_pattern_matcher.find_all(digits))
@@ -6,15 +6,42 @@ Chuyển đổi thành MCP server để sử dụng với Model Context Protocol
 import re
 import asyncio
 import sys
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 # Sử dụng Google ADK FunctionTool
 from google.adk.tools import FunctionTool
 
-from constants.bat_tinh import BAT_TINH
-from constants.combinations import COMBINATIONS
 from constants.digit_meanings import DIGIT_MEANINGS
-from constants.response_factors import RESPONSE_FACTORS
+from tools.batcuclinhso_analysis.batch_analyzer import analyze_phone_numbers_batch
+from tools.batcuclinhso_analysis.digit_kernel import digit_profile
+from tools.batcuclinhso_analysis.number_search import positions_for_pattern, positions_for_prefix, search_numbers
+from tools.batcuclinhso_analysis.pair_automaton import pair_spans
+from tools.batcuclinhso_analysis.pattern_matcher import find_special_patterns
+from tools.batcuclinhso_analysis.purpose_scoring import PURPOSE_INDEX, compatibility_level, purpose_scores, star_histogram
+from tools.batcuclinhso_analysis.result_cache import analysis_cache
+from tools.batcuclinhso_analysis.star_entries import (
+    SPECIAL_FIVE,
+    SPECIAL_ZERO,
+    STAR_LEVELS,
+    StarEntry,
+    star_level_code,
+)
+from tools.batcuclinhso_analysis.rule_tables import (
+    COMBINATION_INFO,
+    COMBINATION_KEYS,
+    LUCK_LEVELS,
+    NO_STAR,
+    PURPOSE_PROFILES,
+    STAR_INFO,
+    STAR_KEYS,
+    adjacent_combinations,
+    lookup_pair,
+    luck_level_code,
+    phone_score,
+    resolve_purpose,
+)
 
 # Import các thư viện cần thiết nếu có
 try:
@@ -33,6 +60,9 @@ except ImportError:
     print("Cảnh báo: Không thể import model_context_protocol. MCP server sẽ không khả dụng.")
     print("Đề xuất: Cài đặt model_context_protocol để sử dụng MCP server.")
 
+# Bảng str.translate bỏ các số 0 và 5 khỏi cặp số (cặp số đã ánh xạ)
+_DROP_ZERO_FIVE = str.maketrans("", "", "05")
+
 class PhoneAnalyzer:
     """Class để phân tích số điện thoại theo phương pháp Bát Cục Linh Số"""
     
@@ -57,10 +87,19 @@ class PhoneAnalyzer:
                     - starCombinations: Các tổ hợp sao liền kề
                     - keyPositions: Các vị trí đặc biệt trong số điện thoại
         """
+        return PhoneAnalyzer._cached_analysis(PhoneAnalyzer._normalize_phone_number(phone_number), purpose)
+
+    @staticmethod
+    def _cached_analysis(phone_number: str, purpose: Optional[str] = None) -> Dict[str, Any]:
+        """Kết quả analyze_phone_number (bất biến) lấy từ cache dùng chung"""
+        return analysis_cache.get_or_compute(
+            "phone", (phone_number, purpose), lambda: PhoneAnalyzer._analyze_normalized(phone_number, purpose)
+        )
+
+    @staticmethod
+    def _analyze_normalized(phone_number: str, purpose: Optional[str] = None) -> Dict[str, Any]:
+        """Phân tích số điện thoại đã chuẩn hóa (xem analyze_phone_number)"""
         try:
-            # Chuẩn hóa số điện thoại
-            phone_number = PhoneAnalyzer._normalize_phone_number(phone_number)
-            
             # Validate phone number
             if not phone_number.isdigit() or len(phone_number) != 10:
                 raise ValueError("Invalid phone number format. Must be 10 digits.")
@@ -69,59 +108,39 @@ class PhoneAnalyzer:
             network_code = phone_number[0:3]
             subscriber_number = phone_number[3:10]
 
-            # Calculate Bát Tinh numbers
-            bat_tinh_numbers = []
-            for i in range(0, 10, 2):
-                pair = phone_number[i:i+2]
-                bat_tinh_numbers.append(pair)
-
-            # Analyze each pair
+            # Các cặp Bát Tinh (0-1, 2-3, ...) lấy từ lõi phân tích chữ số
             analysis = []
-            for number in bat_tinh_numbers:
-                for tinh, info in BAT_TINH.items():
-                    if number in info["numbers"]:
-                        analysis.append({
-                            "number": number,
-                            "tinh": tinh,
-                            "name": info["name"],
-                            "description": info["description"],
-                            "energy": info["energy"],
-                            "position": info["position"],
-                            "nature": info["nature"]
-                        })
-                        break
-
-            # Analyze combinations
+            star_ids = []
+            for number, star_id, energy in digit_profile(phone_number).aligned_pairs():
+                info = STAR_INFO[star_id]
+                star_ids.append(star_id)
+                analysis.append({
+                    "number": number,
+                    "tinh": STAR_KEYS[star_id],
+                    "name": info["name"],
+                    "description": info["description"],
+                    "energy": energy,
+                    "position": info["position"],
+                    "nature": info["nature"]
+                })
+
+            # Analyze combinations (tra ma trận tổ hợp theo id sao)
             combinations = []
-            for i in range(len(analysis) - 1):
-                current = analysis[i]
-                next_tinh = analysis[i + 1]
-                combination_key = f"{current['tinh']}_{next_tinh['tinh']}"
-                
-                if combination_key in COMBINATIONS:
-                    combinations.append({
-                        "numbers": f"{current['number']}-{next_tinh['number']}",
-                        "combination": combination_key,
-                        "description": COMBINATIONS[combination_key]["description"],
-                        "detailed_description": COMBINATIONS[combination_key]["detailedDescription"]
-                    })
+            for index, combination_id in adjacent_combinations(star_ids):
+                combination = COMBINATION_INFO[combination_id]
+                combinations.append({
+                    "numbers": f"{analysis[index]['number']}-{analysis[index + 1]['number']}",
+                    "combination": COMBINATION_KEYS[combination_id],
+                    "description": combination["description"],
+                    "detailed_description": combination["detailedDescription"]
+                })
 
             # Tính toán điểm số tổng
-            total_score = sum(item.get("energy", 0) for item in analysis if isinstance(item.get("energy"), (int, float)))
-            if total_score > 0:
-                total_score = min(10, total_score / len(analysis) * 2.5)
-            else:
-                total_score = 5.0
+            energy_sum = sum(item["energy"] for item in analysis)
+            total_score = phone_score(energy_sum, len(analysis))
 
             # Xác định cấp độ may mắn
-            if total_score >= 8.5:
-                luck_level = "Rất tốt"
-            elif total_score >= 7:
-                luck_level = "Tốt"
-            elif total_score >= 5:
-                luck_level = "Trung bình"
-            else:
-                luck_level = "Cần cải thiện"
+            luck_level = LUCK_LEVELS[luck_level_code(total_score)]
 
             return {
                 "phone_number": phone_number,
@@ -130,6 +149,7 @@ class PhoneAnalyzer:
                 "analysis": analysis,
                 "pairs_analysis": analysis,  # Alias cho backward compatibility
                 "combinations": combinations,
+                "special_patterns": find_special_patterns(phone_number),
                 "purpose": purpose,
                 "total_score": total_score,
                 "luck_level": luck_level
@@ -137,13 +157,52 @@ class PhoneAnalyzer:
         except Exception as e:
             raise ValueError(f"Error analyzing phone number: {str(e)}")
 
+    @staticmethod
+    def analyze_phone_full(phone_number: str, purpose: Optional[str] = None) -> Dict[str, Any]:
+        """Phân tích đầy đủ số điện thoại trong một lần gọi
+        
+        Gộp analyze_phone_number, analyze_last_three_digits, analyze_last_five_digits và
+        get_phone_recommendations: số điện thoại chỉ được chuẩn hóa một lần và toàn bộ kết quả
+        được trả về trong một phản hồi (một lượt gọi MCP thay vì bốn).
+        
+        Args:
+            phone_number: Số điện thoại cần phân tích
+            purpose: Mục đích sử dụng số điện thoại (tùy chọn)
+            
+        Returns:
+            Dict[str, Any]: Kết quả của analyze_phone_number, bổ sung các trường
+                last_three_digit_analysis, last_five_digit_analysis và recommendations
+        """
+        normalized = PhoneAnalyzer._normalize_phone_number(phone_number)
+        
+        def compute() -> Dict[str, Any]:
+            result = dict(PhoneAnalyzer._cached_analysis(normalized, purpose))
+            result["last_three_digit_analysis"] = PhoneAnalyzer._describe_last_three(normalized)
+            result["last_five_digit_analysis"] = PhoneAnalyzer._describe_last_five(normalized)
+            result["recommendations"] = PhoneAnalyzer.get_phone_recommendations(
+                result["total_score"], result["pairs_analysis"]
+            )
+            return result
+        
+        return analysis_cache.get_or_compute("phone_full", (normalized, purpose), compute)
+
+    @staticmethod
+    def analyze_phone_numbers_batch(numbers: Union[np.ndarray, Sequence[str]]) -> Dict[str, np.ndarray]:
+        """Phân tích hàng loạt số điện thoại, trả về kết quả dạng cột NumPy
+
+        Xem `batch_analyzer.analyze_phone_numbers_batch` để biết chi tiết các cột trả về.
+        """
+        return analyze_phone_numbers_batch(numbers)
+
     @staticmethod
     def analyze_last_three_digits(phone_number: str) -> str:
         """Phân tích ý nghĩa của 3 số cuối trong số điện thoại"""
+        return PhoneAnalyzer._describe_last_three(PhoneAnalyzer._normalize_phone_number(phone_number))
+
+    @staticmethod
+    def _describe_last_three(phone_number: str) -> str:
+        """Phân tích 3 số cuối của số điện thoại đã chuẩn hóa"""
         try:
-            # Chuẩn hóa số điện thoại 
-            phone_number = PhoneAnalyzer._normalize_phone_number(phone_number)
-            
             if not phone_number.isdigit() or len(phone_number) < 3:
                 return "Số điện thoại không hợp lệ"
                 
@@ -167,10 +226,12 @@ class PhoneAnalyzer:
     @staticmethod
     def analyze_last_five_digits(phone_number: str) -> str:
         """Phân tích ý nghĩa của 5 số cuối trong số điện thoại"""
+        return PhoneAnalyzer._describe_last_five(PhoneAnalyzer._normalize_phone_number(phone_number))
+
+    @staticmethod
+    def _describe_last_five(phone_number: str) -> str:
+        """Phân tích 5 số cuối của số điện thoại đã chuẩn hóa"""
         try:
-            # Chuẩn hóa số điện thoại
-            phone_number = PhoneAnalyzer._normalize_phone_number(phone_number)
-            
             if not phone_number.isdigit() or len(phone_number) < 5:
                 return "Số điện thoại không hợp lệ"
                 
@@ -180,10 +241,9 @@ class PhoneAnalyzer:
             analysis = []
             for i in range(0, len(last_five) - 1, 2):
                 pair = last_five[i:i+2]
-                for tinh, info in BAT_TINH.items():
-                    if pair in info["numbers"]:
-                        analysis.append(f"Cặp số {pair} thuộc {info['name']}: {info['description']}")
-                        break
+                rule = lookup_pair(pair)
+                if rule is not None:
+                    analysis.append(f"Cặp số {pair} thuộc {rule.info['name']}: {rule.info['description']}")
             
             return f"Năm số cuối {last_five}. " + " ".join(analysis)
         except Exception as e:
@@ -262,66 +322,198 @@ class PhoneAnalyzer:
         return recommendations
 
     @staticmethod
-    def suggest_phone_numbers(purpose: str, preferred_digits: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-        """Đề xuất số điện thoại phù hợp với mục đích sử dụng"""
-        # Đây là một hàm đơn giản để mock dữ liệu, trong thực tế nên triển khai thuật toán thực sự
-        purpose_lower = purpose.lower()
+    def suggest_phone_numbers(
+        purpose: str,
+        preferred_digits: Optional[List[str]] = None,
+        prefix: str = "090",
+        k: int = 5,
+        offset: int = 0,
+        time_budget_ms: int = 200
+    ) -> Dict[str, Any]:
+        """Đề xuất số điện thoại phù hợp với mục đích sử dụng
         
-        # Các số mẫu với đặc điểm phong thủy tốt cho các mục đích khác nhau
-        sample_phones = {
-            "kinh doanh": [
-                "0918666888", "0917888999", "0909789789", "0908168168", "0907168168"
-            ],
-            "cá nhân": [
-                "0918339339", "0917868868", "0909969969", "0908558558", "0907668668"
-            ],
-            "tài lộc": [
-                "0919678678", "0918939939", "0917828828", "0909989989", "0908369369"
-            ],
-            "sự nghiệp": [
-                "0919838838", "0918668668", "0917828868", "0909989889", "0908168689"
-            ],
-            "tình duyên": [
-                "0919168168", "0918939839", "0917828238", "0909989639", "0908369968"
-            ]
-        }
-        
-        # Chọn danh sách số phù hợp với mục đích
-        matching_phones = []
-        for key, phones in sample_phones.items():
-            if key in purpose_lower or purpose_lower in key:
-                matching_phones.extend(phones)
-                
-        if not matching_phones:
-            # Mặc định nếu không tìm thấy mục đích
-            matching_phones = sample_phones["cá nhân"]
+        Tìm top-k trên toàn bộ không gian số của đầu số bằng thuật toán nhánh cận (number_search),
+        không liệt kê toàn bộ các số thuê bao.
         
-        # Lọc theo các chữ số ưa thích nếu có
-        if preferred_digits and len(preferred_digits) > 0:
-            filtered_phones = []
-            for phone in matching_phones:
-                if any(digit in phone for digit in preferred_digits):
-                    filtered_phones.append(phone)
-            if filtered_phones:
-                matching_phones = filtered_phones
+        Args:
+            purpose: Mục đích sử dụng (kinh doanh, cá nhân, tài lộc, sự nghiệp, tình duyên, ...)
+            preferred_digits: Các chữ số ưa thích, ưu tiên khi các số có cùng điểm
+            prefix: Đầu số cố định (mặc định "090")
+            k: Số lượng đề xuất
+            offset: Số lượng đề xuất bỏ qua (phân trang)
+            time_budget_ms: Ngân sách thời gian tìm kiếm (mili giây)
+            
+        Returns:
+            Dict[str, Any]: Các đề xuất (`numbers`) sắp theo điểm tổng hợp giảm dần, `complete` là False
+            nếu dừng do hết ngân sách (đầu số ngắn có thể chưa duyệt hết trong ngân sách mặc định)
+        """
+        prefix = "".join(d for d in prefix if d.isdigit())
+        # Mặc định mục đích cá nhân nếu không nhận diện được mục đích
+        search_purpose = purpose if resolve_purpose(purpose) else "personal"
+        result = search_numbers(
+            positions_for_prefix(prefix, 10),
+            purpose=search_purpose,
+            preferred_digits="".join(preferred_digits or []),
+            k=k,
+            offset=offset,
+            time_budget_ms=time_budget_ms
+        )
         
-        # Phân tích các số điện thoại được chọn
         suggestions = []
-        for phone in matching_phones[:5]:  # Giới hạn 5 gợi ý
-            analysis = PhoneAnalyzer.analyze_phone_number(phone, purpose)
-            
+        for hit in result.hits:
             suggestions.append({
-                "phone_number": phone,
-                "feng_shui_score": analysis["total_score"],
-                "purpose_match_score": 8.5,  # Điểm mặc định cho phù hợp mục đích
-                "combined_score": (analysis["total_score"] + 8.5) / 2,
-                "summary": f"Số {phone} điểm phong thủy {analysis['total_score']:.1f}/10, phù hợp mục đích {purpose}."
+                "phone_number": hit.number,
+                "feng_shui_score": hit.total_score,
+                "purpose_match_score": hit.purpose_score,
+                "combined_score": hit.combined_score,
+                "luck_level": LUCK_LEVELS[luck_level_code(hit.total_score)],
+                "summary": f"Số {hit.number} điểm phong thủy {hit.total_score:.1f}/10, phù hợp mục đích {purpose} {hit.purpose_score:.1f}/10."
             })
-            
-        # Sắp xếp theo điểm tổng hợp
-        suggestions.sort(key=lambda x: x["combined_score"], reverse=True)
-        
-        return suggestions
+        return {
+            "prefix": prefix,
+            "offset": offset,
+            "numbers": suggestions,
+            "complete": result.complete,
+            "nodes": result.nodes
+        }
+
+    @staticmethod
+    def search_pattern(
+        pattern: str,
+        k: int = 10,
+        offset: int = 0,
+        purpose: Optional[str] = None,
+        time_budget_ms: Optional[float] = 200,
+        node_budget: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Tìm các số điểm cao nhất khớp mẫu có ký tự đại diện, ví dụ "09xx68xx88"
+
+        Các cách điền ký tự đại diện được duyệt bằng thuật toán nhánh cận (number_search) với cận
+        trên suy ra từ bảng năng lượng sao, không liệt kê toàn bộ 10^k ứng viên.
+
+        Args:
+            pattern: Mẫu 10 ký tự gồm chữ số và ký tự đại diện (x, X, *, ?)
+            k: Số lượng kết quả
+            offset: Số lượng kết quả bỏ qua (phân trang)
+            purpose: Mục đích sử dụng, nếu có thì xếp hạng theo điểm tổng hợp
+            time_budget_ms: Ngân sách thời gian tìm kiếm (mili giây)
+            node_budget: Ngân sách số node duyệt
+
+        Returns:
+            Dict[str, Any]: Các số tìm được (`numbers`), `complete` là False nếu dừng do hết ngân sách
+
+        Raises:
+            ValueError: Nếu mẫu không hợp lệ
+        """
+        pattern = pattern.strip()
+        if len(pattern) != 10:
+            raise ValueError("Mẫu số điện thoại phải gồm đúng 10 ký tự")
+        result = search_numbers(
+            positions_for_pattern(pattern),
+            purpose=purpose,
+            k=k,
+            offset=offset,
+            time_budget_ms=time_budget_ms,
+            node_budget=node_budget
+        )
+
+        numbers = []
+        for hit in result.hits:
+            numbers.append({
+                "phone_number": hit.number,
+                "total_score": hit.total_score,
+                "purpose_match_score": hit.purpose_score,
+                "combined_score": hit.combined_score,
+                "luck_level": LUCK_LEVELS[luck_level_code(hit.total_score)],
+                "matched_count": hit.matched_count
+            })
+        return {
+            "pattern": pattern,
+            "offset": offset,
+            "numbers": numbers,
+            "complete": result.complete,
+            "nodes": result.nodes
+        }
+
+    @staticmethod
+    def improve_phone_number(
+        phone_number: str,
+        max_edits: int = 2,
+        k: int = 10,
+        purpose: Optional[str] = None,
+        keep_prefix: int = 3,
+        time_budget_ms: Optional[float] = 200,
+        node_budget: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Tìm các số điểm cao hơn số hiện tại khi thay đổi tối đa `max_edits` chữ số
+
+        Duyệt các số cách số hiện tại không quá `max_edits` chữ số (khoảng cách Hamming) bằng
+        thuật toán nhánh cận (number_search): mỗi bước chỉ cộng thêm năng lượng của cặp vừa chọn,
+        và nhánh bị cắt khi cận trên (theo số chữ số còn được thay đổi) không vượt kết quả thứ k.
+
+        Args:
+            phone_number: Số điện thoại hiện tại
+            max_edits: Số chữ số tối đa được thay đổi
+            k: Số lượng kết quả
+            purpose: Mục đích sử dụng, nếu có thì xếp hạng theo điểm tổng hợp
+            keep_prefix: Số chữ số đầu giữ nguyên (mặc định giữ đầu số nhà mạng)
+            time_budget_ms: Ngân sách thời gian tìm kiếm (mili giây)
+            node_budget: Ngân sách số node duyệt
+
+        Returns:
+            Dict[str, Any]: Điểm hiện tại và các số tốt hơn (`improvements`) kèm các vị trí thay đổi,
+                xếp theo điểm giảm dần
+
+        Raises:
+            ValueError: Nếu số điện thoại hoặc tham số không hợp lệ
+        """
+        normalized = PhoneAnalyzer._normalize_phone_number(phone_number)
+        if len(normalized) != 10:
+            raise ValueError("Invalid phone number format. Must be 10 digits.")
+        if not 0 <= keep_prefix <= 10:
+            raise ValueError("keep_prefix phải nằm trong khoảng 0-10")
+        current = PhoneAnalyzer._cached_analysis(normalized)
+        positions = positions_for_prefix(normalized[:keep_prefix], 10)
+        result = search_numbers(
+            positions,
+            purpose=purpose,
+            k=k,
+            time_budget_ms=time_budget_ms,
+            node_budget=node_budget,
+            base_number=normalized,
+            max_edits=max_edits
+        )
+        # Số hiện tại nằm trong không gian tìm kiếm, nên mọi số tốt hơn nó đều nằm trước nó trong top-k
+        current_hit = next((hit for hit in result.hits if hit.number == normalized), None)
+        baseline = current_hit.combined_score if current_hit else None
+        if baseline is None:
+            baseline = search_numbers(list(normalized), purpose=purpose, k=1).hits[0].combined_score
+
+        improvements = []
+        for hit in result.hits:
+            if hit.combined_score <= baseline:
+                break
+            improvements.append({
+                "phone_number": hit.number,
+                "total_score": hit.total_score,
+                "purpose_match_score": hit.purpose_score,
+                "combined_score": hit.combined_score,
+                "luck_level": LUCK_LEVELS[luck_level_code(hit.total_score)],
+                "score_gain": hit.total_score - current["total_score"],
+                "changed_positions": list(hit.changed_positions),
+                "changes": [
+                    {"position": i, "from": normalized[i], "to": hit.number[i]} for i in hit.changed_positions
+                ]
+            })
+        return {
+            "phone_number": normalized,
+            "total_score": current["total_score"],
+            "luck_level": current["luck_level"],
+            "max_edits": max_edits,
+            "improvements": improvements,
+            "complete": result.complete,
+            "nodes": result.nodes
+        }
 
     @staticmethod
     def _normalize_phone_number(phone: str) -> str:
@@ -337,153 +529,74 @@ class PhoneAnalyzer:
     
     @staticmethod
     def _get_star_level(energy: int) -> str:
-        if energy >= 4:
-            return "VERY_HIGH"
-        elif energy == 3:
-            return "HIGH"
-        elif energy == 2:
-            return "MEDIUM"
-        return "LOW"
+        return STAR_LEVELS[star_level_code(energy)]
 
     @staticmethod
     def _generate_pairs(digits: str) -> List[str]:
-        pairs: List[str] = []
-        i = 0
-        while i < len(digits) - 1:
-            if digits[i] in ("0", "5"):
-                i += 1
-                continue
-            if digits[i+1] not in ("0", "5"):
-                pairs.append(digits[i:i+2])
-                i += 1
-            else:
-                j = i + 1
-                group = digits[i]
-                while j < len(digits) and digits[j] in ("0", "5"):
-                    group += digits[j]
-                    j += 1
-                if j < len(digits):
-                    group += digits[j]
-                    j += 1
-                pairs.append(group)
-                i = j - 1
-        # xử lý nhóm cuối
-        if pairs:
-            last = pairs[-1]
-            if len(last) > 1 and last[0] not in ("0", "5") and all(c in ("0","5") for c in last[1:]):
-                trailing = last[1:]
-                pairs[-1] = last[0] + trailing
-        return pairs
-    
+        """Tách chuỗi chữ số thành các cặp số (số 0/5 được gộp vào cặp đứng trước), xem pair_automaton"""
+        return [digits[start:end] for start, end in pair_spans(digits)]
+
     @staticmethod
     def _map_to_star_sequence(normalized: str) -> List[Dict[str, Any]]:
-        pairs = PhoneAnalyzer._generate_pairs(normalized)
-        zero_count = normalized.count("0")
-        five_count = normalized.count("5")
-        special_attr = ""
-        special_effect = ""
-        if zero_count:
-            special_attr = "zero"
-            special_effect = "Số 0 làm giảm năng lượng của các sao"
-        if five_count:
-            special_attr = f"{special_attr}_five" if special_attr else "five"
-            msg = "Số 5 tăng cường năng lượng của các sao"
-            special_effect = f"{special_effect}, {msg}" if special_effect else msg
-        sequence: List[Dict[str,Any]] = []
-        for pair in pairs:
+        """Chuỗi sao ở dạng dict 18 khóa (ranh giới API), xem _star_entries"""
+        return [entry.to_dict() for entry in PhoneAnalyzer._star_entries(normalized)]
+
+    @staticmethod
+    def _star_entries(normalized: str) -> Tuple[StarEntry, ...]:
+        """Ánh xạ các cặp số thành chuỗi sao ở dạng gọn (StarEntry)"""
+        special = 0
+        if "0" in normalized:
+            special |= SPECIAL_ZERO
+        if "5" in normalized:
+            special |= SPECIAL_FIVE
+        sequence: List[StarEntry] = []
+        for start, end in pair_spans(normalized):
+            pair = normalized[start:end]
             zeroes = pair.count("0")
             fives = pair.count("5")
-            clean = "".join(d for d in pair if d not in ("0","5"))
-            star_key, star_obj = None, None
-            for k,v in BAT_TINH.items():
-                if clean in v.get("numbers",[]):
-                    star_key, star_obj = k, v
-                    break
-            base_energy = star_obj.get("energy", {}).get(clean, 1) if star_obj else 1
-            energy_level = max(1, base_energy + fives - zeroes)
-            level = PhoneAnalyzer._get_star_level(energy_level)
-            response_factor = RESPONSE_FACTORS.get("STAR_RESPONSE_FACTORS", {}).get(star_key, 1)
-            weighted = energy_level
-            adjusted = weighted * response_factor
-            sequence.append({
-                "originalPair": pair,
-                "mappedPair": clean,
-                "star": star_key or "UNKNOWN",
-                "name": star_obj.get("name", "") if star_obj else "",
-                "nature": star_obj.get("nature", "") if star_obj else "",
-                "level": level,
-                "energyLevel": energy_level,
-                "baseEnergyLevel": base_energy,
-                "specialAttribute": special_attr,
-                "specialEffect": special_effect,
-                "detailedDescription": star_obj.get("detailedDescription", "") if star_obj else "",
-                "description": star_obj.get("description", "") if star_obj else "",
-                "isZeroVariant": zeroes > 0,
-                "zeroCount": zeroes,
-                "fiveCount": fives,
-                "weightedEnergy": weighted,
-                "responseFactor": response_factor,
-                "adjustedEnergy": adjusted
-            })
-        return sequence
+            clean = pair.translate(_DROP_ZERO_FIVE)
+            rule = lookup_pair(clean)
+            base_energy = rule.energy if rule else 1
+            sequence.append(StarEntry(
+                original_pair=pair,
+                mapped_pair=clean,
+                star_id=rule.star_id if rule else NO_STAR,
+                energy_level=max(1, base_energy + fives - zeroes),
+                base_energy=base_energy,
+                zero_count=zeroes,
+                five_count=fives,
+                special=special
+            ))
+        return tuple(sequence)
 
     @staticmethod
-    def _analyze_purpose_compatibility(star_sequence: List[Dict[str, Any]], purpose: str) -> Dict[str, Any]:
+    def _analyze_purpose_compatibility(star_sequence: Sequence[StarEntry], purpose: str) -> Dict[str, Any]:
         """Phân tích độ phù hợp với mục đích sử dụng"""
-        # Các mục đích phổ biến
-        purposes = {
-            "business": {
-                "name": "Kinh doanh",
-                "favorable_stars": ["THIEN_Y", "DIEN_NIEN"],
-                "unfavorable_stars": ["TUYET_MENH", "NGU_QUY"]
-            },
-            "personal": {
-                "name": "Cá nhân",
-                "favorable_stars": ["SINH_KHI", "THIEN_Y"],
-                "unfavorable_stars": ["HOA_HAI", "LUC_SAT"]
-            },
-            "wealth": {
-                "name": "Tài lộc",
-                "favorable_stars": ["THIEN_Y", "SINH_KHI"],
-                "unfavorable_stars": ["TUYET_MENH", "NGU_QUY"]
-            }
-        }
-        
         # Lấy thông tin mục đích
-        purpose_info = purposes.get(purpose.lower())
+        purpose_info = PURPOSE_PROFILES.get(resolve_purpose(purpose))
         if not purpose_info:
             return None
             
-        # Đếm số sao thuận lợi và bất lợi
-        favorable_count = sum(1 for star in star_sequence if star["star"] in purpose_info["favorable_stars"])
-        unfavorable_count = sum(1 for star in star_sequence if star["star"] in purpose_info["unfavorable_stars"])
-        
-        # Tính điểm phù hợp
-        total_stars = len(star_sequence)
-        compatibility_score = (favorable_count - unfavorable_count) / total_stars if total_stars > 0 else 0
-        
-        # Xác định mức độ phù hợp
-        if compatibility_score >= 0.5:
-            compatibility_level = "Rất phù hợp"
-        elif compatibility_score >= 0:
-            compatibility_level = "Phù hợp"
-        elif compatibility_score >= -0.5:
-            compatibility_level = "Không phù hợp"
-        else:
-            compatibility_level = "Rất không phù hợp"
-        
+        # Đếm số sao thuận lợi / bất lợi của mọi mục đích trong một phép nhân ma trận
+        scores = purpose_scores(
+            star_histogram([star.star_id for star in star_sequence]), totals=len(star_sequence)
+        )
+        index = PURPOSE_INDEX[resolve_purpose(purpose)]
+        compatibility_score = float(scores.compatibility[index])
+
         return {
             "purpose": purpose_info["name"],
             "favorable_stars": purpose_info["favorable_stars"],
             "unfavorable_stars": purpose_info["unfavorable_stars"],
-            "favorable_count": favorable_count,
-            "unfavorable_count": unfavorable_count,
+            "favorable_count": int(scores.favorable[index]),
+            "unfavorable_count": int(scores.unfavorable[index]),
             "compatibility_score": compatibility_score,
-            "compatibility_level": compatibility_level
+            "compatibility_level": compatibility_level(compatibility_score)
         }
 
 # Tạo Function Tools cho ADK
 phone_analyzer_tool = FunctionTool(PhoneAnalyzer.analyze_phone_number)
+phone_full_analyzer_tool = FunctionTool(PhoneAnalyzer.analyze_phone_full)
 last_three_analyzer_tool = FunctionTool(PhoneAnalyzer.analyze_last_three_digits)
 last_five_analyzer_tool = FunctionTool(PhoneAnalyzer.analyze_last_five_digits)
 phone_recommendations_tool = FunctionTool(PhoneAnalyzer.get_phone_recommendations)
@@ -525,6 +638,22 @@ if __name__ == "__main__" and MCP_AVAILABLE:
                 },
                 handler=PhoneAnalyzer.analyze_phone_number
             ),
+            ToolDefinition(
+                name="analyze_phone_full",
+                description="Phân tích đầy đủ số điện thoại (các cặp số, 3 số cuối, 5 số cuối, khuyến nghị) trong một lần gọi",
+                parameters={
+                    "phone_number": ToolParameterDefinition(
+                        type="string",
+                        description="Số điện thoại cần phân tích"
+                    ),
+                    "purpose": ToolParameterDefinition(
+                        type="string", 
+                        description="Mục đích sử dụng số điện thoại",
+                        required=False
+                    )
+                },
+                handler=PhoneAnalyzer.analyze_phone_full
+            ),
             ToolDefinition(
                 name="analyze_last_three_digits",
                 description="Phân tích ý nghĩa của 3 số cuối của số điện thoại",
@@ -574,6 +703,26 @@ if __name__ == "__main__" and MCP_AVAILABLE:
                         type="array",
                         description="Các chữ số ưa thích",
                         required=False
+                    ),
+                    "prefix": ToolParameterDefinition(
+                        type="string",
+                        description="Đầu số cố định",
+                        required=False
+                    ),
+                    "k": ToolParameterDefinition(
+                        type="integer",
+                        description="Số lượng đề xuất",
+                        required=False
+                    ),
+                    "offset": ToolParameterDefinition(
+                        type="integer",
+                        description="Số lượng đề xuất bỏ qua (phân trang)",
+                        required=False
+                    ),
+                    "time_budget_ms": ToolParameterDefinition(
+                        type="integer",
+                        description="Ngân sách thời gian tìm kiếm (mili giây)",
+                        required=False
                     )
                 },
                 handler=PhoneAnalyzer.suggest_phone_numbers
@@ -0,0 +1,96 @@
+"""
+Purpose Scoring: Độ phù hợp mục đích sử dụng cho mọi mục đích trong một phép nhân ma trận
+
+`PURPOSE_PROFILES` được biên dịch một lần thành ma trận đếm (2P x (NO_STAR + 1)): P hàng đầu đánh
+dấu các sao thuận lợi, P hàng sau đánh dấu các sao bất lợi của từng mục đích (cột NO_STAR luôn bằng 0).
+Với vector tần suất sao của một số (hoặc ma trận tần suất N x (NO_STAR + 1) của cả lô), một phép
+nhân ma trận cho ra số sao thuận lợi và bất lợi của tất cả mục đích cùng lúc:
+
+    độ phù hợp = (số sao thuận lợi - số sao bất lợi) / số sao
+
+cùng công thức với `PhoneAnalyzer._analyze_purpose_compatibility` và `number_search.purpose_match_score`.
+"""
+
+from typing import NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from tools.batcuclinhso_analysis.rule_tables import NO_STAR, PURPOSE_PROFILES, STAR_IDS
+
+PURPOSE_KEYS: Tuple[str, ...] = tuple(PURPOSE_PROFILES)
+PURPOSE_INDEX = {key: index for index, key in enumerate(PURPOSE_KEYS)}
+
+# Mức độ phù hợp theo ngưỡng độ phù hợp (giảm dần)
+COMPATIBILITY_LEVELS: Tuple[str, ...] = ("Rất phù hợp", "Phù hợp", "Không phù hợp", "Rất không phù hợp")
+COMPATIBILITY_THRESHOLDS: Tuple[float, ...] = (0.5, 0, -0.5)
+
+
+def _star_mask(star_keys: Sequence[str]) -> np.ndarray:
+    mask = np.zeros(NO_STAR + 1, dtype=np.int32)
+    mask[[STAR_IDS[key] for key in star_keys]] = 1
+    return mask
+
+
+FAVORABLE_MATRIX = np.array(
+    [_star_mask(PURPOSE_PROFILES[key]["favorable_stars"]) for key in PURPOSE_KEYS], dtype=np.int32
+)
+UNFAVORABLE_MATRIX = np.array(
+    [_star_mask(PURPOSE_PROFILES[key]["unfavorable_stars"]) for key in PURPOSE_KEYS], dtype=np.int32
+)
+# Trọng số mục đích x sao: +1 sao thuận lợi, -1 sao bất lợi
+PURPOSE_WEIGHTS = FAVORABLE_MATRIX - UNFAVORABLE_MATRIX
+_COUNT_MATRIX = np.vstack([FAVORABLE_MATRIX, UNFAVORABLE_MATRIX])
+
+
+class PurposeScores(NamedTuple):
+    """Kết quả cho mọi mục đích (cột cuối theo thứ tự PURPOSE_KEYS): (P,) với một số, (N, P) với một lô"""
+    favorable: np.ndarray
+    unfavorable: np.ndarray
+    compatibility: np.ndarray
+
+    @property
+    def match_scores(self) -> np.ndarray:
+        """Điểm phù hợp mục đích thang 0-10 (giống number_search.purpose_match_score)"""
+        return (self.compatibility + 1) * 5
+
+
+def star_histogram(star_ids: Union[Sequence[int], np.ndarray]) -> np.ndarray:
+    """Tần suất từng id sao: (NO_STAR + 1,) cho một dãy id sao, (N, NO_STAR + 1) cho ma trận N x L"""
+    star_ids = np.asarray(star_ids, dtype=np.intp)
+    if star_ids.ndim == 1:
+        return np.bincount(star_ids, minlength=NO_STAR + 1)
+    # Cộng dồn theo từng cột: mỗi cột là một phép scatter trên N dòng
+    counts = np.zeros((len(star_ids), NO_STAR + 1), dtype=np.int32)
+    rows = np.arange(len(star_ids))
+    for column in star_ids.T:
+        counts[rows, column] += 1
+    return counts
+
+
+def purpose_scores(counts: np.ndarray, totals: Optional[Union[int, np.ndarray]] = None) -> PurposeScores:
+    """Độ phù hợp của mọi mục đích từ tần suất sao bằng một phép nhân ma trận
+
+    Args:
+        counts: Tần suất sao (NO_STAR + 1,) hoặc (N, NO_STAR + 1) từ star_histogram
+        totals: Mẫu số của độ phù hợp; mặc định là số cặp khớp sao (không tính cột NO_STAR)
+
+    Returns:
+        PurposeScores: Số sao thuận lợi, bất lợi và độ phù hợp (0 nếu mẫu số bằng 0) theo PURPOSE_KEYS
+    """
+    counts = np.asarray(counts)
+    both = counts @ _COUNT_MATRIX.T
+    favorable, unfavorable = both[..., :len(PURPOSE_KEYS)], both[..., len(PURPOSE_KEYS):]
+    if totals is None:
+        totals = counts[..., :NO_STAR].sum(axis=-1)
+    totals = np.asarray(totals)[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        compatibility = np.where(totals > 0, (favorable - unfavorable) / totals, 0.0)
+    return PurposeScores(favorable, unfavorable, compatibility)
+
+
+def compatibility_level(score: float) -> str:
+    """Mức độ phù hợp (trong COMPATIBILITY_LEVELS) của một độ phù hợp"""
+    for code, threshold in enumerate(COMPATIBILITY_THRESHOLDS):
+        if score >= threshold:
+            return COMPATIBILITY_LEVELS[code]
+    return COMPATIBILITY_LEVELS[-1]
@@ -0,0 +1,129 @@
+"""
+Result Cache: Bộ nhớ đệm LRU dùng chung cho kết quả các analyzer
+
+Các analyzer (số điện thoại, CCCD, tài khoản ngân hàng, mật khẩu) là hàm thuần của đầu vào,
+nên kết quả được ghi nhớ theo khóa (loại analyzer, đầu vào đã chuẩn hóa, mục đích, RULES_VERSION).
+Khi bộ quy tắc thay đổi, RULES_VERSION đổi theo nên các kết quả cũ không còn được dùng lại.
+
+- Giới hạn số phần tử cấu hình qua biến môi trường ANALYSIS_CACHE_SIZE (0 để tắt)
+- Loại bỏ phần tử ít dùng nhất trong O(1) (OrderedDict)
+- Đếm hit/miss/eviction (stats() và metrics Prometheus)
+- Kết quả trả về là bất biến (FrozenDict / tuple): phía gọi cần sửa kết quả phải tạo bản sao
+  bằng `thaw()` hoặc `dict(...)`
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from prometheus_client import Counter
+
+from tools.batcuclinhso_analysis.rule_tables import RULES_VERSION
+
+DEFAULT_CACHE_SIZE = int(os.environ.get("ANALYSIS_CACHE_SIZE", 10000))
+
+CACHE_HITS = Counter("analysis_cache_hits_total", "Số lần kết quả analyzer được lấy từ cache", ["namespace"])
+CACHE_MISSES = Counter("analysis_cache_misses_total", "Số lần analyzer phải tính lại kết quả", ["namespace"])
+CACHE_EVICTIONS = Counter("analysis_cache_evictions_total", "Số kết quả bị loại khỏi cache do đầy")
+
+
+class FrozenDict(dict):
+    """Dict chỉ đọc: vẫn là dict (tuần tự hóa JSON như thường) nhưng mọi thao tác sửa đều báo lỗi"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Kết quả phân tích trong cache là bất biến, dùng thaw() để tạo bản sao có thể sửa")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+def freeze(value: Any) -> Any:
+    """Chuyển kết quả thành dạng bất biến (dict -> FrozenDict, list -> tuple), đệ quy"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Tạo bản sao có thể sửa của kết quả bất biến (FrozenDict -> dict, tuple -> list), đệ quy"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ResultCache:
+    """Cache LRU có giới hạn, an toàn với nhiều luồng"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Trả về kết quả đã ghi nhớ cho (namespace, key), tính bằng `compute()` nếu chưa có
+
+        Kết quả luôn được đóng băng (freeze) kể cả khi cache bị tắt, để hành vi không phụ thuộc cấu hình.
+        """
+        full_key = (namespace, key, RULES_VERSION)
+        with self._lock:
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                CACHE_HITS.labels(namespace).inc()
+                return self._entries[full_key]
+            self.misses += 1
+        CACHE_MISSES.labels(namespace).inc()
+
+        # Tính ngoài khóa: hai luồng cùng trượt có thể tính trùng, nhưng kết quả như nhau
+        result = freeze(compute())
+        if self.maxsize <= 0:
+            return result
+        with self._lock:
+            self._entries[full_key] = result
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                CACHE_EVICTIONS.inc()
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "rules_version": RULES_VERSION,
+            }
+
+
+# Cache dùng chung cho toàn bộ analyzer trong tiến trình
+analysis_cache = ResultCache()
@@ -0,0 +1,229 @@
+"""
+Rule Tables: Bảng tra cứu Bát Tinh đã được biên dịch sẵn
+
+Module này biên dịch `constants/bat_tinh.py` một lần duy nhất khi import thành
+các bảng dày đánh chỉ số trực tiếp bằng giá trị số của cặp số:
+- `PAIR_RULES`: 100 phần tử cho các cặp 2 chữ số ("00" - "99")
+- `TRIPLE_RULES`: 1000 phần tử cho các biến thể `*_ZERO` 3 chữ số ("000" - "999")
+
+Mỗi phần tử là một `StarRule` (id sao, khóa sao, năng lượng, hệ số phản ứng) hoặc
+None nếu cặp số không thuộc sao nào. Các analyzer tra cứu O(1) thay vì duyệt toàn bộ
+`BAT_TINH.items()` và kiểm tra `in info["numbers"]` cho từng cặp số.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from constants.bat_tinh import BAT_TINH
+from constants.combinations import COMBINATIONS
+from constants.response_factors import RESPONSE_FACTORS
+
+
+class StarRule(NamedTuple):
+    """Quy tắc đã biên dịch cho một cặp (hoặc bộ ba) chữ số"""
+    star_id: int
+    star_key: str
+    energy: float
+    response_factor: float
+    info: Dict[str, Any]
+
+
+# Danh sách khóa sao theo đúng thứ tự khai báo trong BAT_TINH, id sao là chỉ số trong tuple này
+STAR_KEYS: Tuple[str, ...] = tuple(BAT_TINH.keys())
+STAR_IDS: Dict[str, int] = {key: star_id for star_id, key in enumerate(STAR_KEYS)}
+
+# Id "không thuộc sao nào", dùng làm giá trị lính canh cho các bảng số
+NO_STAR: int = len(STAR_KEYS)
+
+# Thông tin (tên, mô tả, ...) và hệ số phản ứng theo id sao, phần tử cuối ứng với NO_STAR
+STAR_INFO: Tuple[Optional[Dict[str, Any]], ...] = tuple(BAT_TINH.values()) + (None,)
+STAR_RESPONSE: Tuple[float, ...] = tuple(
+    RESPONSE_FACTORS.get("STAR_RESPONSE_FACTORS", {}).get(key, 1) for key in STAR_KEYS
+) + (1,)
+
+# Năng lượng mặc định khi bảng BAT_TINH không khai báo năng lượng cho một số
+DEFAULT_ENERGY = 1
+
+
+def _compile_rules(width: int) -> Tuple[Optional[StarRule], ...]:
+    """Biên dịch các số có `width` chữ số trong BAT_TINH thành bảng dày
+
+    Giữ nguyên ngữ nghĩa "sao đầu tiên khớp" của vòng lặp `for tinh, info in BAT_TINH.items()`.
+    """
+    response_factors = RESPONSE_FACTORS.get("STAR_RESPONSE_FACTORS", {})
+    table: List[Optional[StarRule]] = [None] * (10 ** width)
+    for star_key, info in BAT_TINH.items():
+        energies = info.get("energy", {})
+        for number in info.get("numbers", []):
+            if len(number) != width or not number.isdigit():
+                continue
+            code = int(number)
+            if table[code] is not None:
+                continue
+            table[code] = StarRule(
+                star_id=STAR_IDS[star_key],
+                star_key=star_key,
+                energy=energies.get(number, DEFAULT_ENERGY),
+                response_factor=response_factors.get(star_key, 1),
+                info=info,
+            )
+    return tuple(table)
+
+
+PAIR_RULES: Tuple[Optional[StarRule], ...] = _compile_rules(2)
+TRIPLE_RULES: Tuple[Optional[StarRule], ...] = _compile_rules(3)
+
+# Các cột số tách riêng để dùng cho các phép tính dạng bảng (không cần truy cập NamedTuple)
+PAIR_STAR: Tuple[int, ...] = tuple(rule.star_id if rule else NO_STAR for rule in PAIR_RULES)
+PAIR_ENERGY: Tuple[float, ...] = tuple(rule.energy if rule else 0 for rule in PAIR_RULES)
+PAIR_RESPONSE: Tuple[float, ...] = tuple(rule.response_factor if rule else 1 for rule in PAIR_RULES)
+TRIPLE_STAR: Tuple[int, ...] = tuple(rule.star_id if rule else NO_STAR for rule in TRIPLE_RULES)
+TRIPLE_ENERGY: Tuple[float, ...] = tuple(rule.energy if rule else 0 for rule in TRIPLE_RULES)
+TRIPLE_RESPONSE: Tuple[float, ...] = tuple(rule.response_factor if rule else 1 for rule in TRIPLE_RULES)
+
+
+def lookup_pair(pair: str) -> Optional[StarRule]:
+    """Tra cứu sao của một cặp 2 chữ số, trả về None nếu không thuộc sao nào"""
+    if len(pair) != 2 or not (pair.isascii() and pair.isdigit()):
+        return None
+    return PAIR_RULES[int(pair)]
+
+
+def lookup_triple(triple: str) -> Optional[StarRule]:
+    """Tra cứu biến thể `*_ZERO` của một bộ 3 chữ số, trả về None nếu không thuộc sao nào"""
+    if len(triple) != 3 or not (triple.isascii() and triple.isdigit()):
+        return None
+    return TRIPLE_RULES[int(triple)]
+
+
+def lookup_digits(digits: str) -> Optional[StarRule]:
+    """Tra cứu một nhóm 2 hoặc 3 chữ số trong bảng tương ứng"""
+    if len(digits) == 2:
+        return lookup_pair(digits)
+    if len(digits) == 3:
+        return lookup_triple(digits)
+    return None
+
+
+# Tổ hợp sao liền kề: id tổ hợp là chỉ số trong COMBINATION_KEYS, COMBINATION_INFO giữ bản ghi
+# mô tả dùng chung (chính các dict trong constants/combinations.py)
+NO_COMBINATION = -1
+COMBINATION_KEYS: Tuple[str, ...] = tuple(COMBINATIONS.keys())
+COMBINATION_INFO: Tuple[Dict[str, Any], ...] = tuple(COMBINATIONS.values())
+
+
+def _compile_combinations() -> Tuple[Tuple[int, ...], ...]:
+    """Ma trận (id sao trước, id sao sau) -> id tổ hợp, kích thước (NO_STAR + 1)^2
+
+    Giữ nguyên ngữ nghĩa tra khóa f"{sao trước}_{sao sau}" trong COMBINATIONS: biến thể `*_ZERO`
+    chỉ tạo tổ hợp khi khóa đó được khai báo. Hàng/cột NO_STAR luôn là NO_COMBINATION.
+    """
+    ids = {key: combination_id for combination_id, key in enumerate(COMBINATION_KEYS)}
+    matrix = []
+    for first in STAR_KEYS + (None,):
+        row = []
+        for second in STAR_KEYS + (None,):
+            combination_id = NO_COMBINATION
+            if first is not None and second is not None:
+                combination_id = ids.get(f"{first}_{second}", NO_COMBINATION)
+            row.append(combination_id)
+        matrix.append(tuple(row))
+    return tuple(matrix)
+
+
+COMBINATION_MATRIX: Tuple[Tuple[int, ...], ...] = _compile_combinations()
+
+
+def adjacent_combinations(star_ids: Sequence[int]) -> List[Tuple[int, int]]:
+    """Các tổ hợp giữa hai sao liền kề trong chuỗi id sao: danh sách (vị trí, id tổ hợp)"""
+    found = []
+    for index in range(len(star_ids) - 1):
+        combination_id = COMBINATION_MATRIX[star_ids[index]][star_ids[index + 1]]
+        if combination_id != NO_COMBINATION:
+            found.append((index, combination_id))
+    return found
+
+
+# Thang điểm số điện thoại: điểm = min(10, trung bình năng lượng các cặp khớp sao * 2.5),
+# mặc định 5.0 nếu không có cặp nào mang năng lượng
+SCORE_SCALE = 2.5
+MAX_SCORE = 10
+DEFAULT_SCORE = 5.0
+
+# Cấp độ may mắn theo thứ tự mã 0..3 và ngưỡng điểm tương ứng
+LUCK_LEVELS: Tuple[str, ...] = ("Rất tốt", "Tốt", "Trung bình", "Cần cải thiện")
+LUCK_THRESHOLDS: Tuple[float, ...] = (8.5, 7, 5)
+
+
+def phone_score(energy_sum: float, matched_count: int) -> float:
+    """Tính điểm phong thủy từ tổng năng lượng và số cặp khớp sao"""
+    if energy_sum > 0:
+        return min(MAX_SCORE, energy_sum / matched_count * SCORE_SCALE)
+    return DEFAULT_SCORE
+
+
+def luck_level_code(score: float) -> int:
+    """Trả về mã cấp độ may mắn (chỉ số trong LUCK_LEVELS) cho một điểm số"""
+    for code, threshold in enumerate(LUCK_THRESHOLDS):
+        if score >= threshold:
+            return code
+    return len(LUCK_THRESHOLDS)
+
+
+# Các mục đích sử dụng phổ biến và các sao thuận lợi/bất lợi tương ứng
+PURPOSE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "business": {
+        "name": "Kinh doanh",
+        "favorable_stars": ["THIEN_Y", "DIEN_NIEN"],
+        "unfavorable_stars": ["TUYET_MENH", "NGU_QUY"]
+    },
+    "personal": {
+        "name": "Cá nhân",
+        "favorable_stars": ["SINH_KHI", "THIEN_Y"],
+        "unfavorable_stars": ["HOA_HAI", "LUC_SAT"]
+    },
+    "wealth": {
+        "name": "Tài lộc",
+        "favorable_stars": ["THIEN_Y", "SINH_KHI"],
+        "unfavorable_stars": ["TUYET_MENH", "NGU_QUY"]
+    }
+}
+
+# Tên gọi khác (tiếng Việt, mục đích tài khoản ngân hàng) của các mục đích trên
+PURPOSE_ALIASES: Dict[str, str] = {
+    "kinh doanh": "business",
+    "sự nghiệp": "business",
+    "cá nhân": "personal",
+    "tình duyên": "personal",
+    "tình cảm": "personal",
+    "tài lộc": "wealth",
+    "savings": "wealth",
+    "tiết kiệm": "wealth",
+    "investment": "wealth",
+    "đầu tư": "wealth",
+}
+
+
+def resolve_purpose(purpose: Optional[str]) -> Optional[str]:
+    """Chuẩn hóa mục đích sử dụng về khóa trong PURPOSE_PROFILES, None nếu không nhận diện được"""
+    if not purpose:
+        return None
+    key = purpose.strip().lower()
+    key = PURPOSE_ALIASES.get(key, key)
+    return key if key in PURPOSE_PROFILES else None
+
+
+def _rules_fingerprint() -> str:
+    """Dấu vân tay của bộ quy tắc, thay đổi khi BAT_TINH, hệ số phản ứng hoặc thang điểm thay đổi"""
+    payload = {
+        "stars": {key: [info.get("numbers", []), info.get("energy", {})] for key, info in BAT_TINH.items()},
+        "response_factors": RESPONSE_FACTORS.get("STAR_RESPONSE_FACTORS", {}),
+        "score": [SCORE_SCALE, MAX_SCORE, DEFAULT_SCORE, list(LUCK_THRESHOLDS)],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+# Phiên bản bộ quy tắc, dùng để vô hiệu hóa dữ liệu tính sẵn/cache khi quy tắc thay đổi
+RULES_VERSION: str = _rules_fingerprint()
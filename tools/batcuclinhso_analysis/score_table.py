@@ -0,0 +1,463 @@
+"""
+Score Table: Bảng điểm tính sẵn cho toàn bộ không gian số thuê bao
+
+Điểm của một số điện thoại chỉ phụ thuộc vào các chữ số, nên có thể tính trước
+cho cả 10^7 số thuê bao của mỗi đầu số nhà mạng. Mỗi đầu số được ghi ra một file
+`{prefix}.bin` gồm hai khối liên tiếp, mỗi khối 10^7 byte đánh chỉ số theo 7 số thuê bao:
+- Khối điểm: mã điểm = (tổng năng lượng << 3) | số cặp khớp sao, giải mã chính xác
+  ra `total_score` qua bảng `SCORE_BY_CODE`
+- Khối cấp độ may mắn: chỉ số trong `LUCK_LEVELS`
+
+Service memory-map các file này khi khởi động (chế độ chỉ đọc), nên các worker
+gunicorn dùng chung trang nhớ qua page cache và mọi truy vấn không cần phân tích lại.
+
+Kèm theo là bảng phân phối điểm `score_distributions.npz` (vài trăm KB cho mọi đầu số):
+histogram 256 mã điểm của từng đầu số cùng số lượng tích lũy (điểm thấp hơn / không cao hơn
+điểm của từng mã). Percentile của một số chỉ cần mã điểm của số đó (tra bảng hoặc cộng 5 đóng
+góp cặp) và một lần tra bảng tích lũy, kể cả với đầu số chưa build file `{prefix}.bin`.
+
+Build offline:
+    python -m tools.batcuclinhso_analysis.score_table --output data/score_tables [--prefixes 098 090]
+    python -m tools.batcuclinhso_analysis.score_table --distributions-only   # chỉ bảng phân phối
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from constants.network_prefixes import ALL_NETWORK_PREFIXES
+from tools.batcuclinhso_analysis.rule_tables import (
+    LUCK_LEVELS,
+    NO_STAR,
+    PAIR_ENERGY,
+    PAIR_STAR,
+    RULES_VERSION,
+    luck_level_code,
+    phone_score,
+)
+from utils.common import normalize_phone_number
+
+logger = logging.getLogger(__name__)
+
+PREFIX_LENGTH = 3
+SUBSCRIBER_DIGITS = 7
+SUBSCRIBER_SPACE = 10 ** SUBSCRIBER_DIGITS
+MANIFEST_FILE = "manifest.json"
+DISTRIBUTION_FILE = "score_distributions.npz"
+
+DEFAULT_SCORE_TABLE_DIR = os.environ.get(
+    "SCORE_TABLE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "score_tables"),
+)
+
+# Số bit dành cho số cặp khớp sao trong mã điểm (tối đa 5 cặp)
+_COUNT_BITS = 3
+
+
+def encode_score(energy_sum: int, matched_count: int) -> int:
+    """Mã hóa (tổng năng lượng, số cặp khớp sao) thành 1 byte"""
+    return (int(energy_sum) << _COUNT_BITS) | matched_count
+
+
+def encode_scores(energy_sums: np.ndarray, matched_counts: np.ndarray) -> np.ndarray:
+    """Dạng mảng của encode_score (ví dụ trên kết quả của analyze_phone_numbers_batch)"""
+    return (np.asarray(energy_sums).astype(np.uint8) << _COUNT_BITS) | np.asarray(matched_counts, dtype=np.uint8)
+
+
+def _build_decode_tables():
+    """Bảng giải mã 256 phần tử: mã điểm -> total_score và mã cấp độ may mắn"""
+    scores = np.full(256, np.nan, dtype=np.float64)
+    lucks = np.zeros(256, dtype=np.uint8)
+    for code in range(256):
+        energy_sum, matched_count = code >> _COUNT_BITS, code & ((1 << _COUNT_BITS) - 1)
+        if matched_count > 5 or (matched_count == 0 and energy_sum) or energy_sum > 4 * matched_count:
+            continue
+        score = phone_score(energy_sum, matched_count)
+        scores[code] = score
+        lucks[code] = luck_level_code(score)
+    return scores, lucks
+
+
+SCORE_BY_CODE, LUCK_BY_CODE = _build_decode_tables()
+
+
+def _build_pair_codes() -> np.ndarray:
+    """Đóng góp của từng cặp 00-99 vào mã điểm; mã điểm của cả số là tổng các đóng góp"""
+    codes = np.zeros(100, dtype=np.uint16)
+    for pair_code, (star_id, energy) in enumerate(zip(PAIR_STAR, PAIR_ENERGY)):
+        if star_id == NO_STAR:
+            continue
+        if energy != int(energy):
+            raise ValueError(f"Năng lượng cặp {pair_code:02d} không phải số nguyên, không mã hóa được")
+        codes[pair_code] = encode_score(energy, 1)
+    return codes
+
+
+_PAIR_CODES = _build_pair_codes()
+
+# _SCORE_BELOW[c, c'] / _SCORE_AT_OR_BELOW[c, c']: điểm của mã c' thấp hơn / không cao hơn điểm của mã c
+_SCORES_OR_LOWEST = np.nan_to_num(SCORE_BY_CODE, nan=-1.0)
+_SCORE_BELOW = (_SCORES_OR_LOWEST[None, :] < _SCORES_OR_LOWEST[:, None]).astype(np.int64)
+_SCORE_AT_OR_BELOW = (_SCORES_OR_LOWEST[None, :] <= _SCORES_OR_LOWEST[:, None]).astype(np.int64)
+
+
+def score_code(phone_number: str) -> int:
+    """Mã điểm của một số 10 chữ số đã chuẩn hóa: tổng đóng góp của 5 cặp (không phân tích đầy đủ)"""
+    return int(sum(_PAIR_CODES[int(phone_number[i:i + 2])] for i in range(0, len(phone_number), 2)))
+
+
+def cumulative_counts(histogram: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Số lượng có điểm thấp hơn và không cao hơn điểm của từng mã (hai mảng 256 phần tử)"""
+    histogram = np.asarray(histogram, dtype=np.int64)
+    return _SCORE_BELOW @ histogram, _SCORE_AT_OR_BELOW @ histogram
+
+
+def _validate_prefix(prefix: str) -> str:
+    if len(prefix) != PREFIX_LENGTH or not prefix.isdigit():
+        raise ValueError(f"Đầu số phải gồm đúng {PREFIX_LENGTH} chữ số: {prefix!r}")
+    return prefix
+
+
+def compute_prefix_codes(prefix: str) -> np.ndarray:
+    """Tính mã điểm cho toàn bộ 10^7 số thuê bao của một đầu số
+
+    Các cặp số là (d0 d1), (d2 s0), (s1 s2), (s3 s4), (s5 s6) với d là đầu số, s là số thuê bao;
+    mã điểm là tổng đóng góp của từng cặp nên được tính bằng phép cộng broadcast
+    theo đúng thứ tự chỉ số thuê bao.
+    """
+    d0, d1, d2 = (int(d) for d in _validate_prefix(prefix))
+    head = _PAIR_CODES[d0 * 10 + d1]
+    first = _PAIR_CODES[d2 * 10 + np.arange(10)]
+    codes = (
+        head
+        + first[:, None, None, None]
+        + _PAIR_CODES[None, :, None, None]
+        + _PAIR_CODES[None, None, :, None]
+        + _PAIR_CODES[None, None, None, :]
+    )
+    return codes.reshape(SUBSCRIBER_SPACE).astype(np.uint8)
+
+
+def _verify_prefix(prefix: str, score_codes: np.ndarray, samples: int) -> None:
+    """Đối chiếu ngẫu nhiên với PhoneAnalyzer.analyze_phone_number (nguồn chuẩn của điểm số)"""
+    from tools.batcuclinhso_analysis.phone_analyzer import PhoneAnalyzer
+
+    rng = random.Random(prefix)
+    for subscriber in rng.sample(range(SUBSCRIBER_SPACE), samples):
+        phone_number = f"{prefix}{subscriber:0{SUBSCRIBER_DIGITS}d}"
+        expected = PhoneAnalyzer.analyze_phone_number(phone_number)
+        code = score_codes[subscriber]
+        if SCORE_BY_CODE[code] != expected["total_score"] or LUCK_LEVELS[LUCK_BY_CODE[code]] != expected["luck_level"]:
+            raise ValueError(f"Bảng điểm không khớp PhoneAnalyzer tại số {phone_number}")
+
+
+def _write_distributions(output_dir: str, histograms: Dict[str, np.ndarray]) -> None:
+    """Ghi bảng phân phối điểm (histogram và số lượng tích lũy) của các đầu số
+
+    Các đầu số đã có trong bảng hiện tại (cùng bộ quy tắc) được giữ lại; đầu số được build lại
+    thay thế histogram cũ.
+    """
+    existing, _ = ScoreTableStore._read_distributions(output_dir)
+    histograms = {**existing, **histograms}
+    prefixes = sorted(histograms)
+    stacked = np.array([histograms[prefix] for prefix in prefixes], dtype=np.uint32).reshape(-1, 256)
+    below, at_or_below = cumulative_counts(stacked.T)
+    path = os.path.join(output_dir, DISTRIBUTION_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            rules_version=np.array(RULES_VERSION),
+            prefixes=np.array(prefixes, dtype=f"U{PREFIX_LENGTH}"),
+            histograms=stacked,
+            below=below.T.astype(np.uint32),
+            at_or_below=at_or_below.T.astype(np.uint32),
+        )
+    os.replace(tmp_path, path)
+    logger.info(f"Đã ghi bảng phân phối điểm cho {len(prefixes)} đầu số: {path}")
+
+
+def build_score_distributions(output_dir: str, prefixes: Optional[Iterable[str]] = None, verify_samples: int = 1000) -> List[str]:
+    """Build riêng bảng phân phối điểm (không ghi file `{prefix}.bin`)
+
+    Args:
+        output_dir: Thư mục chứa file `score_distributions.npz`
+        prefixes: Danh sách đầu số, mặc định là tất cả đầu số nhà mạng Việt Nam
+        verify_samples: Số lượng số ngẫu nhiên mỗi đầu số được đối chiếu với PhoneAnalyzer
+
+    Returns:
+        List[str]: Danh sách đầu số đã build
+    """
+    prefixes = sorted({_validate_prefix(prefix) for prefix in (prefixes or ALL_NETWORK_PREFIXES)})
+    os.makedirs(output_dir, exist_ok=True)
+
+    histograms = {}
+    for prefix in prefixes:
+        score_codes = compute_prefix_codes(prefix)
+        if verify_samples:
+            _verify_prefix(prefix, score_codes, verify_samples)
+        histograms[prefix] = np.bincount(score_codes, minlength=256)
+    _write_distributions(output_dir, histograms)
+    return prefixes
+
+
+def _existing_table_prefixes(output_dir: str) -> List[str]:
+    """Các đầu số trong manifest hiện có (cùng bộ quy tắc) mà file bảng điểm vẫn còn"""
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("rules_version") != RULES_VERSION or manifest.get("subscriber_digits") != SUBSCRIBER_DIGITS:
+        return []
+    return [
+        prefix for prefix in manifest.get("prefixes", [])
+        if os.path.exists(os.path.join(output_dir, f"{prefix}.bin"))
+    ]
+
+
+def build_score_tables(output_dir: str, prefixes: Optional[Iterable[str]] = None, verify_samples: int = 1000) -> List[str]:
+    """Build file bảng điểm cho các đầu số và ghi manifest
+
+    Manifest được gộp với các đầu số đã build trước đó (cùng bộ quy tắc), nên có thể build dần
+    từng nhóm đầu số.
+
+    Args:
+        output_dir: Thư mục chứa các file `{prefix}.bin`
+        prefixes: Danh sách đầu số, mặc định là tất cả đầu số nhà mạng Việt Nam
+        verify_samples: Số lượng số ngẫu nhiên mỗi đầu số được đối chiếu với PhoneAnalyzer
+
+    Returns:
+        List[str]: Danh sách đầu số đã build
+    """
+    prefixes = sorted({_validate_prefix(prefix) for prefix in (prefixes or ALL_NETWORK_PREFIXES)})
+    os.makedirs(output_dir, exist_ok=True)
+
+    histograms = {}
+    for prefix in prefixes:
+        score_codes = compute_prefix_codes(prefix)
+        if verify_samples:
+            _verify_prefix(prefix, score_codes, verify_samples)
+        histograms[prefix] = np.bincount(score_codes, minlength=256)
+        luck_codes = LUCK_BY_CODE[score_codes]
+
+        # Ghi ra file tạm rồi thay thế nguyên tử để worker đang map file cũ không bị ảnh hưởng
+        path = os.path.join(output_dir, f"{prefix}.bin")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(score_codes.tobytes())
+            f.write(luck_codes.tobytes())
+        os.replace(tmp_path, path)
+        logger.info(f"Đã build bảng điểm cho đầu số {prefix}: {path}")
+    _write_distributions(output_dir, histograms)
+
+    manifest = {
+        "rules_version": RULES_VERSION,
+        "subscriber_digits": SUBSCRIBER_DIGITS,
+        "prefixes": sorted(set(_existing_table_prefixes(output_dir)) | set(prefixes)),
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return prefixes
+
+
+class ScoreTableStore:
+    """Kho bảng điểm đã memory-map, hỗ trợ tra cứu O(1), percentile và tìm số đẹp nhất"""
+
+    def __init__(self):
+        self.directory: Optional[str] = None
+        self._tables: Dict[str, np.memmap] = {}
+        self._histograms: Dict[str, np.ndarray] = {}
+        self._cumulative: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def prefixes(self) -> List[str]:
+        return sorted(self._tables)
+
+    @property
+    def distribution_prefixes(self) -> List[str]:
+        """Các đầu số có phân phối điểm (từ bảng phân phối hoặc từ file bảng điểm)"""
+        return sorted(set(self._cumulative) | set(self._tables))
+
+    @staticmethod
+    def _read_tables(directory: str) -> Dict[str, np.memmap]:
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            logger.info(f"Chưa có bảng điểm tính sẵn tại {directory}")
+            return {}
+
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("rules_version") != RULES_VERSION:
+            logger.warning(
+                f"Bảng điểm tại {directory} được build với bộ quy tắc {manifest.get('rules_version')}, "
+                f"hiện tại là {RULES_VERSION}; bỏ qua, cần build lại"
+            )
+            return {}
+
+        tables = {}
+        for prefix in manifest.get("prefixes", []):
+            path = os.path.join(directory, f"{prefix}.bin")
+            tables[prefix] = np.memmap(path, dtype=np.uint8, mode="r", shape=(2, SUBSCRIBER_SPACE))
+        return tables
+
+    @staticmethod
+    def _read_distributions(directory: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+        path = os.path.join(directory, DISTRIBUTION_FILE)
+        if not os.path.exists(path):
+            return {}, {}
+        with np.load(path) as data:
+            if str(data["rules_version"]) != RULES_VERSION:
+                logger.warning(f"Bảng phân phối điểm {path} được build với bộ quy tắc cũ; bỏ qua, cần build lại")
+                return {}, {}
+            prefixes = [str(prefix) for prefix in data["prefixes"]]
+            histograms = dict(zip(prefixes, data["histograms"].astype(np.int64)))
+            cumulative = {
+                prefix: (below.astype(np.int64), at_or_below.astype(np.int64))
+                for prefix, below, at_or_below in zip(prefixes, data["below"], data["at_or_below"])
+            }
+        return histograms, cumulative
+
+    def load(self, directory: str) -> int:
+        """Memory-map các file bảng điểm và đọc bảng phân phối điểm trong thư mục
+
+        Returns:
+            int: Số đầu số đã được map; 0 nếu thư mục chưa được build hoặc đã cũ
+        """
+        tables = self._read_tables(directory)
+        histograms, cumulative = self._read_distributions(directory)
+
+        self.close()
+        self.directory = directory
+        self._tables = tables
+        self._histograms = histograms
+        self._cumulative = cumulative
+        return len(tables)
+
+    def close(self) -> None:
+        """Bỏ các ánh xạ bộ nhớ và bảng phân phối hiện tại"""
+        self._tables = {}
+        self._histograms = {}
+        self._cumulative = {}
+        self.directory = None
+
+    def has_prefix(self, prefix: str) -> bool:
+        return prefix in self._tables
+
+    def _locate(self, phone_number: str):
+        phone_number = normalize_phone_number(phone_number)
+        if len(phone_number) != PREFIX_LENGTH + SUBSCRIBER_DIGITS:
+            raise ValueError("Invalid phone number format. Must be 10 digits.")
+        table = self._tables.get(phone_number[:PREFIX_LENGTH])
+        return phone_number, table, int(phone_number[PREFIX_LENGTH:])
+
+    def lookup(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Tra cứu điểm và cấp độ may mắn của một số điện thoại, None nếu đầu số chưa có bảng"""
+        phone_number, table, subscriber = self._locate(phone_number)
+        if table is None:
+            return None
+        return {
+            "phone_number": phone_number,
+            "total_score": float(SCORE_BY_CODE[table[0, subscriber]]),
+            "luck_level": LUCK_LEVELS[table[1, subscriber]],
+        }
+
+    def histogram(self, prefix: str) -> np.ndarray:
+        """Số lượng số thuê bao theo từng mã điểm của một đầu số (quét một lần, sau đó cache)"""
+        histogram = self._histograms.get(prefix)
+        if histogram is None:
+            histogram = np.bincount(self._tables[prefix][0], minlength=256)
+            self._histograms[prefix] = histogram
+        return histogram
+
+    def _cumulative_counts(self, prefix: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(thấp hơn, không cao hơn) theo từng mã điểm; tính từ histogram nếu chưa có bảng phân phối"""
+        cumulative = self._cumulative.get(prefix)
+        if cumulative is None:
+            cumulative = cumulative_counts(self.histogram(prefix))
+            self._cumulative[prefix] = cumulative
+        return cumulative
+
+    def percentile_rank(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Vị trí điểm của số so với toàn bộ số thuê bao cùng đầu số, None nếu đầu số chưa có phân phối
+
+        Mã điểm lấy từ bảng điểm (nếu đã map) hoặc cộng đóng góp của 5 cặp; sau đó chỉ tra bảng
+        tích lũy. Các số bằng điểm nhau có chung hạng.
+        """
+        phone_number, table, subscriber = self._locate(phone_number)
+        prefix = phone_number[:PREFIX_LENGTH]
+        if table is None and prefix not in self._cumulative:
+            return None
+        code = int(table[0, subscriber]) if table is not None else score_code(phone_number)
+        below, at_or_below = self._cumulative_counts(prefix)
+        return {
+            "phone_number": phone_number,
+            "prefix": prefix,
+            "total_score": float(SCORE_BY_CODE[code]),
+            "luck_level": LUCK_LEVELS[LUCK_BY_CODE[code]],
+            "percentile": float(at_or_below[code] * 100 / SUBSCRIBER_SPACE),
+            "better_than_percent": float(below[code] * 100 / SUBSCRIBER_SPACE),
+            "rank": int(SUBSCRIBER_SPACE - at_or_below[code] + 1),
+            "population": SUBSCRIBER_SPACE,
+        }
+
+    def percentile(self, phone_number: str) -> Optional[float]:
+        """Phần trăm số thuê bao cùng đầu số có điểm không cao hơn số này"""
+        result = self.percentile_rank(phone_number)
+        return result["percentile"] if result is not None else None
+
+    def best_numbers(self, prefix: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Các số điểm cao nhất của một đầu số (sắp theo điểm giảm dần, rồi theo số tăng dần)"""
+        table = self._tables.get(prefix)
+        if table is None:
+            return []
+
+        # Chọn các mã điểm cao nhất vừa đủ bao phủ offset + limit kết quả
+        histogram = self.histogram(prefix)
+        wanted = offset + limit
+        selected = np.zeros(256, dtype=bool)
+        covered = 0
+        for code in sorted(np.flatnonzero(histogram), key=lambda c: -SCORE_BY_CODE[c]):
+            selected[code] = True
+            covered += histogram[code]
+            if covered >= wanted:
+                break
+
+        subscribers = np.flatnonzero(selected[table[0]])
+        scores = SCORE_BY_CODE[table[0, subscribers]]
+        order = np.lexsort((subscribers, -scores))[offset:wanted]
+        return [
+            {
+                "phone_number": f"{prefix}{subscribers[i]:0{SUBSCRIBER_DIGITS}d}",
+                "total_score": float(scores[i]),
+                "luck_level": LUCK_LEVELS[table[1, subscribers[i]]],
+            }
+            for i in order
+        ]
+
+
+# Kho bảng điểm dùng chung trong service, được load trong lifespan của FastAPI
+score_tables = ScoreTableStore()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Build bảng điểm tính sẵn cho các đầu số nhà mạng")
+    parser.add_argument("--output", default=DEFAULT_SCORE_TABLE_DIR, help="Thư mục ghi các file bảng điểm")
+    parser.add_argument("--prefixes", nargs="*", help="Các đầu số cần build (mặc định: tất cả)")
+    parser.add_argument("--verify-samples", type=int, default=1000, help="Số mẫu đối chiếu với PhoneAnalyzer mỗi đầu số")
+    parser.add_argument(
+        "--distributions-only", action="store_true", help="Chỉ build bảng phân phối điểm (không ghi file bảng điểm)"
+    )
+    args = parser.parse_args()
+    build = build_score_distributions if args.distributions_only else build_score_tables
+    built = build(args.output, args.prefixes, args.verify_samples)
+    print(f"Đã build {len(built)} đầu số vào {args.output}")
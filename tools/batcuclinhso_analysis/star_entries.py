@@ -0,0 +1,94 @@
+"""
+Star Entries: Biểu diễn gọn cho chuỗi sao của một số điện thoại
+
+Mỗi phần tử của chuỗi sao được lưu dưới dạng `StarEntry` (NamedTuple, không có __dict__)
+chỉ gồm các số nguyên nhỏ (id sao, mã cấp độ, cờ thuộc tính đặc biệt) và chuỗi cặp số.
+Tên, mô tả và mô tả chi tiết của sao không được chép vào từng phần tử mà tra cứu từ
+`rule_tables.STAR_INFO` theo id sao.
+
+Dạng dict 18 khóa cũ chỉ được tạo ra (`to_dict`) ở ranh giới API.
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from tools.batcuclinhso_analysis.rule_tables import NO_STAR, STAR_INFO, STAR_KEYS, STAR_RESPONSE
+
+# Cấp độ sao theo mã 0..3
+STAR_LEVELS: Tuple[str, ...] = ("LOW", "MEDIUM", "HIGH", "VERY_HIGH")
+
+# Cờ thuộc tính đặc biệt của cả số (bit 0: có số 0, bit 1: có số 5)
+SPECIAL_ZERO = 1
+SPECIAL_FIVE = 2
+_ZERO_EFFECT = "Số 0 làm giảm năng lượng của các sao"
+_FIVE_EFFECT = "Số 5 tăng cường năng lượng của các sao"
+SPECIAL_ATTRIBUTES: Tuple[str, ...] = ("", "zero", "five", "zero_five")
+SPECIAL_EFFECTS: Tuple[str, ...] = ("", _ZERO_EFFECT, _FIVE_EFFECT, f"{_ZERO_EFFECT}, {_FIVE_EFFECT}")
+
+UNKNOWN_STAR = "UNKNOWN"
+
+
+def star_level_code(energy: float) -> int:
+    """Mã cấp độ sao (chỉ số trong STAR_LEVELS) theo mức năng lượng"""
+    if energy >= 4:
+        return 3
+    if energy == 3:
+        return 2
+    if energy == 2:
+        return 1
+    return 0
+
+
+class StarEntry(NamedTuple):
+    """Một phần tử của chuỗi sao ở dạng gọn"""
+    original_pair: str
+    mapped_pair: str
+    star_id: int
+    energy_level: int
+    base_energy: float
+    zero_count: int
+    five_count: int
+    special: int
+
+    @property
+    def star_key(self) -> str:
+        return STAR_KEYS[self.star_id] if self.star_id != NO_STAR else UNKNOWN_STAR
+
+    @property
+    def info(self) -> Optional[Dict[str, Any]]:
+        return STAR_INFO[self.star_id]
+
+    @property
+    def level(self) -> str:
+        return STAR_LEVELS[star_level_code(self.energy_level)]
+
+    @property
+    def response_factor(self) -> float:
+        return STAR_RESPONSE[self.star_id]
+
+    @property
+    def adjusted_energy(self) -> float:
+        return self.energy_level * self.response_factor
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Chuyển về dạng dict 18 khóa cũ (dùng ở ranh giới API)"""
+        info = self.info or {}
+        return {
+            "originalPair": self.original_pair,
+            "mappedPair": self.mapped_pair,
+            "star": self.star_key,
+            "name": info.get("name", ""),
+            "nature": info.get("nature", ""),
+            "level": self.level,
+            "energyLevel": self.energy_level,
+            "baseEnergyLevel": self.base_energy,
+            "specialAttribute": SPECIAL_ATTRIBUTES[self.special],
+            "specialEffect": SPECIAL_EFFECTS[self.special],
+            "detailedDescription": info.get("detailedDescription", ""),
+            "description": info.get("description", ""),
+            "isZeroVariant": self.zero_count > 0,
+            "zeroCount": self.zero_count,
+            "fiveCount": self.five_count,
+            "weightedEnergy": self.energy_level,
+            "responseFactor": self.response_factor,
+            "adjustedEnergy": self.adjusted_energy
+        }
@@ -0,0 +1,249 @@
+"""
+What-if: Phân tích lại tăng dần khi người dùng sửa một chữ số của số điện thoại
+
+Giao diện cho phép người dùng đổi từng chữ số của số ứng viên và xem điểm thay đổi. Thay vì phân tích
+lại toàn bộ số cho mỗi lần gõ phím, phía client giữ một trạng thái gọn (`PhoneState`) do server trả về
+và gửi kèm thao tác sửa (vị trí, chữ số mới). Server chỉ tính lại:
+
+- Cặp Bát Tinh chứa vị trí bị sửa (sao, năng lượng)
+- Các tổ hợp sao nối cặp đó với cặp thuộc sao gần nhất ở hai bên
+- Các tổng tích lũy (tổng năng lượng, số cặp thuộc sao, số tổ hợp) và điểm số, đều trong O(1)
+
+Điểm số và cấp độ may mắn khớp chính xác với `PhoneAnalyzer.analyze_phone_number`.
+
+Trạng thái do client gửi lên không được tin cậy: khi đọc lại, trạng thái được dựng lại từ số điện
+thoại (5 lượt tra bảng cặp số) và bị từ chối nếu các trường còn lại không khớp.
+"""
+
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from tools.batcuclinhso_analysis.digit_kernel import digit_profile
+from tools.batcuclinhso_analysis.rule_tables import (
+    COMBINATION_INFO,
+    COMBINATION_KEYS,
+    COMBINATION_MATRIX,
+    LUCK_LEVELS,
+    NO_COMBINATION,
+    NO_STAR,
+    PAIR_ENERGY,
+    PAIR_STAR,
+    RULES_VERSION,
+    STAR_KEYS,
+    adjacent_combinations,
+    luck_level_code,
+    phone_score,
+)
+from utils.common import normalize_phone_number
+
+PHONE_LENGTH = 10
+
+
+class PhoneState(NamedTuple):
+    """Trạng thái phân tích gọn của một số điện thoại, đủ để áp dụng thao tác sửa trong O(1)"""
+    phone_number: str
+    star_ids: Tuple[int, ...]
+    energies: Tuple[int, ...]
+    energy_sum: int
+    matched_count: int
+    combination_count: int
+    rules_version: str = RULES_VERSION
+
+    @property
+    def total_score(self) -> float:
+        return phone_score(self.energy_sum, self.matched_count)
+
+    @property
+    def luck_level(self) -> str:
+        return LUCK_LEVELS[luck_level_code(self.total_score)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phone_number": self.phone_number,
+            "star_ids": list(self.star_ids),
+            "energies": list(self.energies),
+            "energy_sum": self.energy_sum,
+            "matched_count": self.matched_count,
+            "combination_count": self.combination_count,
+            "rules_version": self.rules_version,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "PhoneState":
+        """Đọc lại trạng thái do client gửi lên
+
+        Trạng thái luôn được dựng lại từ `phone_number`; các trường còn lại chỉ dùng để đối chiếu.
+        Trạng thái được tạo với bộ quy tắc cũ (rules_version khác) được dựng lại mà không đối chiếu.
+
+        Raises:
+            ValueError: Nếu trạng thái không đúng định dạng hoặc không khớp với số điện thoại
+        """
+        try:
+            phone_number = str(data["phone_number"])
+            if len(phone_number) != PHONE_LENGTH or not phone_number.isdigit():
+                raise ValueError("Trạng thái phân tích không hợp lệ: số điện thoại phải có 10 chữ số")
+            state = _derive_state(phone_number)
+            if data.get("rules_version") != RULES_VERSION:
+                return state
+            supplied = (
+                tuple(int(star_id) for star_id in data["star_ids"]),
+                tuple(int(energy) for energy in data["energies"]),
+                int(data["energy_sum"]),
+                int(data["matched_count"]),
+                int(data["combination_count"]),
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Trạng thái phân tích không hợp lệ: {e}")
+        if supplied != state[1:6]:
+            raise ValueError("Trạng thái phân tích không khớp với số điện thoại")
+        return state
+
+
+def _derive_state(phone_number: str) -> PhoneState:
+    """Dựng trạng thái từ số điện thoại 10 chữ số đã chuẩn hóa"""
+    profile = digit_profile(phone_number)
+    matched = [star_id for star_id in profile.star_ids if star_id != NO_STAR]
+    return PhoneState(
+        phone_number=phone_number,
+        star_ids=profile.star_ids,
+        energies=profile.energies,
+        energy_sum=sum(profile.energies),
+        matched_count=len(matched),
+        combination_count=len(adjacent_combinations(matched)),
+    )
+
+
+def initial_state(phone_number: str) -> PhoneState:
+    """Phân tích đầy đủ một lần để tạo trạng thái ban đầu
+
+    Raises:
+        ValueError: Nếu số điện thoại sau chuẩn hóa không có đúng 10 chữ số
+    """
+    normalized = normalize_phone_number(phone_number)
+    if len(normalized) != PHONE_LENGTH:
+        raise ValueError("Invalid phone number format. Must be 10 digits.")
+    return _derive_state(normalized)
+
+
+def _links(star_ids: Tuple[int, ...], index: int) -> List[Tuple[int, int]]:
+    """Các cặp (trái, phải) của chuỗi sao liền kề đi qua vị trí `index`
+
+    Tổ hợp chỉ xét giữa các cặp thuộc sao (cặp không thuộc sao bị bỏ qua), nên láng giềng của một cặp
+    là cặp thuộc sao gần nhất ở mỗi bên. Nếu cặp tại `index` không thuộc sao, hai láng giềng nối thẳng
+    với nhau.
+    """
+    left = next((i for i in range(index - 1, -1, -1) if star_ids[i] != NO_STAR), None)
+    right = next((i for i in range(index + 1, len(star_ids)) if star_ids[i] != NO_STAR), None)
+    if star_ids[index] == NO_STAR:
+        return [(left, right)] if left is not None and right is not None else []
+    links = []
+    if left is not None:
+        links.append((left, index))
+    if right is not None:
+        links.append((index, right))
+    return links
+
+
+def _link_combinations(phone_number: str, star_ids: Tuple[int, ...], index: int) -> List[Dict[str, Any]]:
+    """Các tổ hợp sao (cùng định dạng `combinations` của analyze_phone_number) đi qua vị trí `index`"""
+    combinations = []
+    for left, right in _links(star_ids, index):
+        combination_id = COMBINATION_MATRIX[star_ids[left]][star_ids[right]]
+        if combination_id == NO_COMBINATION:
+            continue
+        combination = COMBINATION_INFO[combination_id]
+        combinations.append({
+            "numbers": f"{phone_number[2 * left:2 * left + 2]}-{phone_number[2 * right:2 * right + 2]}",
+            "combination": COMBINATION_KEYS[combination_id],
+            "description": combination["description"],
+            "detailed_description": combination["detailedDescription"]
+        })
+    return combinations
+
+
+def _describe_pair(phone_number: str, star_ids: Tuple[int, ...], energies: Tuple[int, ...], index: int) -> Dict[str, Any]:
+    star_id = star_ids[index]
+    return {
+        "index": index,
+        "number": phone_number[2 * index:2 * index + 2],
+        "tinh": STAR_KEYS[star_id] if star_id != NO_STAR else None,
+        "energy": energies[index],
+    }
+
+
+def apply_edit(state: PhoneState, position: int, digit: str) -> Tuple[PhoneState, Dict[str, Any]]:
+    """Áp dụng thao tác sửa một chữ số lên trạng thái
+
+    Args:
+        state: Trạng thái hiện tại
+        position: Vị trí chữ số cần sửa (0-9)
+        digit: Chữ số mới ("0"-"9")
+
+    Returns:
+        Tuple[PhoneState, Dict[str, Any]]: (trạng thái mới, phần thay đổi: cặp số trước/sau,
+            tổ hợp bị loại bỏ/được thêm)
+
+    Raises:
+        ValueError: Nếu vị trí hoặc chữ số không hợp lệ
+    """
+    if not 0 <= position < PHONE_LENGTH:
+        raise ValueError(f"Vị trí phải nằm trong khoảng 0-{PHONE_LENGTH - 1}")
+    if len(digit) != 1 or digit not in "0123456789":
+        raise ValueError("Chữ số mới phải là một chữ số 0-9")
+
+    index = position // 2
+    phone_number = state.phone_number[:position] + digit + state.phone_number[position + 1:]
+    code = int(phone_number[2 * index:2 * index + 2])
+    star_ids = state.star_ids[:index] + (PAIR_STAR[code],) + state.star_ids[index + 1:]
+    energies = state.energies[:index] + (PAIR_ENERGY[code],) + state.energies[index + 1:]
+
+    removed = _link_combinations(state.phone_number, state.star_ids, index)
+    added = _link_combinations(phone_number, star_ids, index)
+    new_state = PhoneState(
+        phone_number=phone_number,
+        star_ids=star_ids,
+        energies=energies,
+        energy_sum=state.energy_sum - state.energies[index] + energies[index],
+        matched_count=(
+            state.matched_count - (state.star_ids[index] != NO_STAR) + (star_ids[index] != NO_STAR)
+        ),
+        combination_count=state.combination_count - len(removed) + len(added),
+    )
+    delta = {
+        "previous_pair": _describe_pair(state.phone_number, state.star_ids, state.energies, index),
+        "pair": _describe_pair(phone_number, star_ids, energies, index),
+        "combinations_removed": removed,
+        "combinations_added": added,
+    }
+    return new_state, delta
+
+
+def what_if(
+    position: int,
+    digit: str,
+    state: Optional[Mapping[str, Any]] = None,
+    phone_number: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Điểm số sau khi sửa một chữ số, dựa trên trạng thái trước (hoặc số điện thoại nếu chưa có trạng thái)
+
+    Returns:
+        Dict[str, Any]: Số điện thoại mới, điểm và cấp độ may mắn trước/sau, phần thay đổi và
+            trạng thái mới (`state`) để gửi kèm lần sửa tiếp theo
+    """
+    if state is not None:
+        previous = PhoneState.from_dict(state)
+    elif phone_number is not None:
+        previous = initial_state(phone_number)
+    else:
+        raise ValueError("Cần cung cấp state hoặc phone_number")
+
+    new_state, delta = apply_edit(previous, position, digit)
+    return {
+        "phone_number": new_state.phone_number,
+        "position": position,
+        "digit": digit,
+        "previous_score": previous.total_score,
+        "total_score": new_state.total_score,
+        "luck_level": new_state.luck_level,
+        **delta,
+        "state": new_state.to_dict(),
+    }